@@ -0,0 +1,118 @@
+"""Pack weather_readings metrics and drop redundant indexes
+
+Revision ID: 3c1e8f2a9d47
+Revises: ba7a4cf7458f
+Create Date: 2026-10-19 10:42:37.915804
+
+Metrics become fixed-point integers (see ScaledInteger), and the
+single-column indexes on id and device_id go: the primary key and the
+(device_id, ...) indexes already serve those lookups.
+
+On PostgreSQL changing the column types rewrites the table under an
+ACCESS EXCLUSIVE lock; on a large table run it in a maintenance window.
+Values are rounded to the column's resolution. Rows that don't fit stop
+the upgrade with a count per column; fix or delete them and run it again.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1e8f2a9d47'
+down_revision: Union[str, Sequence[str], None] = 'ba7a4cf7458f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Column -> units per stored step, as in the model at this revision.
+SCALES = {
+    'temperature': 100,
+    'humidity': 100,
+    'pressure': 10,
+    'wind_speed': 100,
+    'rain_amount': 100,
+}
+# Column -> stored type, and the largest value each type holds.
+TYPES = {
+    'temperature': 'smallint',
+    'humidity': 'smallint',
+    'pressure': 'smallint',
+    'wind_speed': 'integer',
+    'rain_amount': 'integer',
+}
+LIMITS = {'smallint': 32767, 'integer': 2147483647}
+
+
+def _out_of_range() -> dict[str, int]:
+    """Rows per column whose value doesn't fit its new type."""
+    if op.get_context().as_sql:
+        # Offline (--sql) there is nothing to count; PostgreSQL's cast still
+        # fails on a value that doesn't fit.
+        return {}
+    bind = op.get_bind()
+    counts = {}
+    for name, scale in SCALES.items():
+        limit = LIMITS[TYPES[name]]
+        count = bind.execute(sa.text(
+            f'SELECT count(*) FROM weather_readings '
+            f'WHERE round({name} * {scale}) NOT BETWEEN {-limit - 1} AND {limit}'
+        )).scalar_one()
+        if count:
+            counts[name] = count
+    return counts
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    out_of_range = _out_of_range()
+    if out_of_range:
+        raise RuntimeError(
+            'weather_readings has values the packed columns cannot hold: '
+            + ', '.join(f'{name}: {count} rows' for name, count in out_of_range.items())
+        )
+
+    op.drop_index('ix_weather_readings_id', table_name='weather_readings')
+    op.drop_index('ix_weather_readings_device_id', table_name='weather_readings')
+
+    if op.get_context().dialect.name == 'postgresql':
+        # One statement, so the table is rewritten once rather than per column.
+        op.execute(
+            'ALTER TABLE weather_readings '
+            + ', '.join(
+                f'ALTER COLUMN {name} TYPE {TYPES[name]} '
+                f'USING round({name} * {scale})::{TYPES[name]}'
+                for name, scale in SCALES.items()
+            )
+        )
+    else:
+        # SQLite keeps the declared REAL columns: it already writes whole
+        # numbers in them as 1-4 byte integers, and a batch copy cannot
+        # carry the generated recorded_minute column over.
+        op.execute(
+            'UPDATE weather_readings SET '
+            + ', '.join(f'{name} = round({name} * {scale})' for name, scale in SCALES.items())
+        )
+    op.execute('ANALYZE weather_readings')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute(
+            'ALTER TABLE weather_readings '
+            + ', '.join(
+                f'ALTER COLUMN {name} TYPE double precision USING {name} / {scale}.0'
+                for name, scale in SCALES.items()
+            )
+        )
+    else:
+        op.execute(
+            'UPDATE weather_readings SET '
+            + ', '.join(f'{name} = {name} / {scale}.0' for name, scale in SCALES.items())
+        )
+
+    op.create_index(
+        'ix_weather_readings_device_id', 'weather_readings', ['device_id'], unique=False
+    )
+    op.create_index('ix_weather_readings_id', 'weather_readings', ['id'], unique=False)
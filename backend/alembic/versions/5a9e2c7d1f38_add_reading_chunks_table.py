@@ -0,0 +1,42 @@
+"""Add reading_chunks table
+
+Revision ID: 5a9e2c7d1f38
+Revises: d81f4b6c2e05
+Create Date: 2026-10-20 10:21:37.518204
+
+Packed readings of closed days, written by scripts.compact_readings when
+CHUNK_AFTER_DAYS is set. Downgrading drops packed readings: run
+scripts.compact_readings --unpack first.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from app.db.types import UTCDateTime
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9e2c7d1f38'
+down_revision: Union[str, Sequence[str], None] = 'd81f4b6c2e05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reading_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('start_at', UTCDateTime(), nullable=False),
+    sa.Column('end_at', UTCDateTime(), nullable=False),
+    sa.Column('reading_count', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('device_id', 'start_at', name='uq_reading_chunks_device_start')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('reading_chunks')
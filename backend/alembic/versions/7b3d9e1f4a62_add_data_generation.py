@@ -0,0 +1,35 @@
+"""Add data_generation table
+
+Revision ID: 7b3d9e1f4a62
+Revises: e4b7a1c9d052
+Create Date: 2026-10-22 14:03:51.207716
+
+One row counting purges and device edits, which the newest reading id
+does not reflect; it is part of the ETags of the weather read endpoints.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3d9e1f4a62'
+down_revision: Union[str, Sequence[str], None] = 'e4b7a1c9d052'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    table = op.create_table('data_generation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('generation', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(table, [{'id': 1, 'generation': 0}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('data_generation')
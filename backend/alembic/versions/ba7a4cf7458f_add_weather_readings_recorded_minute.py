@@ -0,0 +1,47 @@
+"""Add weather_readings.recorded_minute
+
+Revision ID: ba7a4cf7458f
+Revises: 77dbd20ff606
+Create Date: 2026-10-18 23:05:12.481230
+
+Adding a stored generated column rewrites the table under an ACCESS
+EXCLUSIVE lock; on a large table run it in a maintenance window.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from app.db.functions import epoch_minute
+
+# revision identifiers, used by Alembic.
+revision: str = 'ba7a4cf7458f'
+down_revision: Union[str, Sequence[str], None] = '77dbd20ff606'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'weather_readings',
+        sa.Column(
+            'recorded_minute',
+            sa.BigInteger(),
+            sa.Computed(epoch_minute(sa.column('recorded_at')), persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        'ix_weather_readings_device_minute',
+        'weather_readings',
+        ['device_id', 'recorded_minute'],
+        unique=False,
+    )
+    op.execute('ANALYZE weather_readings')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_weather_readings_device_minute', table_name='weather_readings')
+    op.drop_column('weather_readings', 'recorded_minute')
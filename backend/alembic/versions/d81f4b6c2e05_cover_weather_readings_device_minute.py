@@ -0,0 +1,44 @@
+"""Cover weather_readings metrics in ix_weather_readings_device_minute
+
+Revision ID: d81f4b6c2e05
+Revises: 3c1e8f2a9d47
+Create Date: 2026-10-19 14:08:51.302716
+
+The index gains recorded_at and the metrics as INCLUDE columns, so
+per-device aggregation runs as an index-only scan. SQLite has no INCLUDE;
+there the index is rebuilt as it was.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4b6c2e05'
+down_revision: Union[str, Sequence[str], None] = '3c1e8f2a9d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_weather_readings_device_minute', table_name='weather_readings')
+    op.create_index(
+        'ix_weather_readings_device_minute',
+        'weather_readings',
+        ['device_id', 'recorded_minute'],
+        unique=False,
+        postgresql_include=[
+            'recorded_at', 'temperature', 'humidity', 'pressure', 'wind_speed', 'rain_amount'
+        ],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_weather_readings_device_minute', table_name='weather_readings')
+    op.create_index(
+        'ix_weather_readings_device_minute',
+        'weather_readings',
+        ['device_id', 'recorded_minute'],
+        unique=False,
+    )
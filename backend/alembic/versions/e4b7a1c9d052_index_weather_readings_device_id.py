@@ -0,0 +1,31 @@
+"""Index weather_readings by (device_id, id)
+
+Revision ID: e4b7a1c9d052
+Revises: 5a9e2c7d1f38
+Create Date: 2026-10-21 09:12:40.118305
+
+The newest reading id of a device (the data version behind ETags and
+long polls) becomes one index probe instead of a scan of the device's
+entries in ix_weather_readings_device_recorded.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7a1c9d052'
+down_revision: Union[str, Sequence[str], None] = '5a9e2c7d1f38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_weather_readings_device_id', 'weather_readings', ['device_id', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_weather_readings_device_id', table_name='weather_readings')
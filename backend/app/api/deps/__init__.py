@@ -1,4 +1,13 @@
-from app.api.deps.db import AsyncSessionDep, get_db
+from app.api.deps.db import (
+    AsyncSessionDep,
+    ReadSessionDep,
+    ReadSessionFactoryDep,
+    SessionFactoryDep,
+    get_db,
+    get_read_db,
+    get_read_session_factory,
+    get_session_factory,
+)
 
 from app.api.deps.api_auth import (
     ApiKeyDep,
@@ -23,13 +32,21 @@ from app.api.deps.localhost_only import (
     localhost_only
 )
 
+from app.api.deps.workload import use_workload
+
 __all__ = [
     "AsyncSessionDep",
+    "ReadSessionDep",
+    "ReadSessionFactoryDep",
+    "SessionFactoryDep",
     "ApiKeyDep",
     "AuthenticatedDeviceDep", 
     "SensorDeviceDep",
     "DisplayDeviceDep",
     "get_db",
+    "get_read_db",
+    "get_read_session_factory",
+    "get_session_factory",
     "get_api_key",
     "get_authenticated_device",
     "get_sensor_device",
@@ -39,5 +56,6 @@ __all__ = [
     "AdminDep",
     "AdminOrUserDep",
     "LocalhostDep",
-    "localhost_only"
+    "localhost_only",
+    "use_workload",
 ]
\ No newline at end of file
@@ -1,12 +1,13 @@
 from typing import Annotated
 from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import APIKeyHeader
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from datetime import datetime, timezone
-from app.db.session import get_db
+from app.db.session import get_session_factory
 from app.models.api_key import ApiKey as ApiKeyModel
 from app.models.device import Device as DeviceModel, DeviceFunction
 import app.services.api_key as api_key_service
+from app.utils.cache import orm_snapshot
 
 api_key_header = APIKeyHeader(
     name="X-API-Key",
@@ -15,11 +16,20 @@ api_key_header = APIKeyHeader(
 )
 
 
-async def get_api_key(
-    db: Annotated[AsyncSession, Depends(get_db)],
+async def authenticate_api_key(
+    sessions: Annotated[async_sessionmaker[AsyncSession], Depends(get_session_factory)],
     api_key: Annotated[str | None, Security(api_key_header)],
-) -> ApiKeyModel:
-    """Validate API key from X-API-Key header."""
+) -> tuple[ApiKeyModel, DeviceModel]:
+    """
+    Validate API key from X-API-Key header and load its device.
+
+    Keys validated in the last API_KEY_CACHE_TTL_SECONDS are served from the
+    auth cache without touching the DB (see api_key_service.cache_enabled).
+    A miss looks the key up and updates last_used and last_seen on a short
+    session of its own, committed right away: that releases the row locks
+    and hands the connection back before the handler checks out its own,
+    and leaves the handler's session alone.
+    """
     if not api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,46 +37,59 @@ async def get_api_key(
             headers={"WWW-Authenticate": "ApiKey"},
         )
     
-    key_record = await api_key_service.get_by_key(db, api_key)
-    
-    if not key_record:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid API key",
-            headers={"WWW-Authenticate": "ApiKey"},
-        )
-    
-    if not key_record.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="API key has been revoked",
-            headers={"WWW-Authenticate": "ApiKey"},
-        )
-    
-    # Update API key last_used after successful validation
-    await api_key_service.update_last_used(db, key_record.id)
-    
-    return key_record
+    key_hash = api_key_service.hash_key(api_key)
+    cached = api_key_service.lookup(key_hash)
+    if cached:
+        return cached
+
+    stamp = api_key_service.cache_stamp()
+    async with sessions() as db:
+        key_record = await api_key_service.get_by_key(db, api_key)
+
+        if not key_record:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid API key",
+                headers={"WWW-Authenticate": "ApiKey"},
+            )
+
+        if not key_record.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="API key has been revoked",
+                headers={"WWW-Authenticate": "ApiKey"},
+            )
+
+        device = await db.get(DeviceModel, key_record.device_id)
+
+        if not device:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Device associated with API key not found",
+            )
+
+        # Update API key last_used and device last_seen after successful validation
+        await api_key_service.update_last_used(db, key_record.id)
+        device.last_seen = datetime.now(timezone.utc)
+        entry = (orm_snapshot(key_record), orm_snapshot(device))
+        await db.commit()
+
+    api_key_service.remember(key_hash, entry, stamp)
+    return entry
+
+
+async def get_api_key(
+    auth: Annotated[tuple[ApiKeyModel, DeviceModel], Depends(authenticate_api_key)],
+) -> ApiKeyModel:
+    """Validated API key (read-only snapshot)."""
+    return auth[0]
 
 
 async def get_authenticated_device(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    api_key: Annotated[ApiKeyModel, Depends(get_api_key)],
+    auth: Annotated[tuple[ApiKeyModel, DeviceModel], Depends(authenticate_api_key)],
 ) -> DeviceModel:
-    """Get device associated with API key and update last_seen."""
-    device = await db.get(DeviceModel, api_key.device_id)
-    
-    if not device:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Device associated with API key not found",
-        )
-    
-    # Update device last_seen after successful authentication
-    device.last_seen = datetime.now(timezone.utc)
-    await db.flush()
-    
-    return device
+    """Device associated with the API key (read-only snapshot)."""
+    return auth[1]
 
 
 async def get_sensor_device(
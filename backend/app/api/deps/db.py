@@ -1,8 +1,22 @@
 from typing import Annotated
 from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.db.session import get_db, get_read_db, get_read_session_factory, get_session_factory
 
 AsyncSessionDep = Annotated[AsyncSession, Depends(get_db)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_db)]
+SessionFactoryDep = Annotated[async_sessionmaker[AsyncSession], Depends(get_session_factory)]
+ReadSessionFactoryDep = Annotated[
+    async_sessionmaker[AsyncSession], Depends(get_read_session_factory)
+]
 
-__all__ = ["AsyncSessionDep", "get_db"]
\ No newline at end of file
+__all__ = [
+    "AsyncSessionDep",
+    "ReadSessionDep",
+    "ReadSessionFactoryDep",
+    "SessionFactoryDep",
+    "get_db",
+    "get_read_db",
+    "get_read_session_factory",
+    "get_session_factory",
+]
@@ -6,8 +6,9 @@ from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings  # must provide SECRET_KEY, ALGORITHM
-from app.db.session import get_db
+from app.db.session import get_read_db
 from app.models.user import User as UserModel, UserRole
+import app.services.auth as auth_service
 
 
 oauth2_scheme = OAuth2PasswordBearer(
@@ -16,7 +17,7 @@ oauth2_scheme = OAuth2PasswordBearer(
 )
 
 async def get_current_user(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     token: Annotated[str, Depends(oauth2_scheme)],
 ) -> UserModel:
     credentials_exception = HTTPException(
@@ -38,7 +39,7 @@ async def get_current_user(
     except (JWTError, ValueError):
         raise credentials_exception
 
-    user = await db.get(UserModel, user_id)
+    user = await auth_service.get_user_cached(db, user_id)
     if not user:
         raise credentials_exception
 
@@ -0,0 +1,18 @@
+from typing import Awaitable, Callable
+
+from fastapi import Request
+
+from app.core.config import Workload
+
+
+def use_workload(workload: Workload) -> Callable[[Request], Awaitable[None]]:
+    """
+    Route dependency that tags the request with a workload class.
+
+    Must be declared in the route/router ``dependencies`` so it runs before
+    ``get_db`` picks the connection pool for the request.
+    """
+    async def set_workload(request: Request) -> None:
+        request.state.workload = workload
+
+    return set_workload
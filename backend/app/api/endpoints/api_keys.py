@@ -1,6 +1,6 @@
 from typing import Any
 from fastapi import APIRouter, HTTPException, status
-from app.api.deps import AsyncSessionDep, AdminDep
+from app.api.deps import AsyncSessionDep, ReadSessionDep, AdminDep
 from app.schemas.api_key import ApiKey, ApiKeyCreate, ApiKeyWithSecret, ApiKeyList
 import app.services.api_key as key
 import app.services.device as dvc
@@ -10,7 +10,7 @@ router = APIRouter()
 
 @router.get("/", response_model=ApiKeyList)
 async def get_api_keys(
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _: AdminDep,
     skip: int = 0,
     limit: int = 100
@@ -24,7 +24,7 @@ async def get_api_keys(
 @router.get("/device/{device_id}", response_model=ApiKeyList)
 async def get_device_api_keys(
     device_id: int,
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _: AdminDep
 ) -> Any:
     """Get all API keys for a specific device."""
@@ -1,6 +1,6 @@
 from typing import Any
 from fastapi import APIRouter, HTTPException, status
-from app.api.deps import AsyncSessionDep, AdminDep, AdminOrUserDep
+from app.api.deps import AsyncSessionDep, ReadSessionDep, AdminDep, AdminOrUserDep
 from app.schemas.device import Device, DeviceCreate, DeviceUpdate, DeviceList
 import app.services.device as dvc
 
@@ -9,7 +9,7 @@ router = APIRouter()
 
 @router.get("/", response_model=DeviceList)
 async def get_devices(
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _: AdminOrUserDep,
     skip: int = 0,
     limit: int = 100,
@@ -23,7 +23,7 @@ async def get_devices(
 @router.get("/{device_id}", response_model=Device)
 async def get_device(
     device_id: int, 
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _: AdminOrUserDep
 ) -> Any:
     """Get device by ID."""
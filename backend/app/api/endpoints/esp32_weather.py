@@ -1,33 +1,64 @@
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Any
 from zoneinfo import ZoneInfo
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from app.api.deps import (
     AsyncSessionDep, 
+    ReadSessionDep,
     SensorDeviceDep,
     DisplayDeviceDep, 
-    AuthenticatedDeviceDep
+    AuthenticatedDeviceDep,
+    use_workload,
 )
 from app.schemas.weather_reading import (
+    DisplayFormat,
     WeatherReading,
     WeatherReadingCreate,
     WeatherReadingWithLocation,
     LatestReadings,
 )
 from app.schemas.timestamp import Timestamp
-from app.core.config import settings
+from app.core.config import settings, Workload
+import app.services.data_version as data_version
 import app.services.weather_reading as weather_service
+import app.services.weather_cache as weather_cache
+import app.utils.display_payload as display_payload
+import app.utils.http_cache as http_cache
 
 router = APIRouter()
 
 TZ = ZoneInfo(settings.TIMEZONE_STR)
 
+FIELDS_QUERY = Query(
+    None,
+    description=(
+        "Comma separated reading fields to send, in this order, e.g. "
+        f"device_id,temperature,humidity. Any of: {', '.join(display_payload.TEXT_COLUMNS)}"
+    ),
+)
+FORMAT_QUERY = Query(
+    DisplayFormat.json,
+    alias="format",
+    description="json, or text: fixed-width lines, one per reading, timestamps in epoch seconds",
+)
+
+
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    try:
+        return display_payload.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+
 @router.post(
     "/readings",
     response_model=WeatherReading,
     status_code=status.HTTP_201_CREATED,
     summary="Submit weather reading",
     description="Submit a new weather reading from a sensor board. Requires sensor device API key.",
+    dependencies=[Depends(use_workload(Workload.ingest))],
 )
 async def submit_reading(
     reading_in: WeatherReadingCreate,
@@ -59,20 +90,51 @@ async def submit_reading(
     description="Get the most recent reading from each sensor. Optimized for display boards.",
 )
 async def get_latest_for_display(
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     device: DisplayDeviceDep,
+    since: int | None = Query(
+        None, ge=0,
+        description="Watermark of a previous response: only return what changed after it",
+    ),
+    wait: int = Query(
+        0, ge=0, le=settings.LONG_POLL_MAX_SECONDS,
+        description=(
+            "With since: hold the request up to this many seconds until a newer reading exists"
+        ),
+    ),
+    fields: str | None = FIELDS_QUERY,
+    fmt: DisplayFormat = FORMAT_QUERY,
+    if_none_match: str | None = Header(None),
 ) -> Any:
     """
     Get the latest weather reading from all sensor devices.
     
     Returns one reading per sensor with device location info.
     Optimized endpoint for display boards to show current conditions.
+    Send the last ETag back in If-None-Match to get 304 while nothing changed,
+    and the last watermark as since= to get only sensors with newer readings.
+    Adding wait= turns it into a long poll: the answer comes as soon as a
+    sensor reports, or with no readings when wait runs out.
+    Boards short on memory can ask for fewer fields and format=text.
     
     Requires X-API-Key header with a valid display device API key.
     """
-    return LatestReadings(
-        readings=await weather_service.get_latest_from_all_sensors(db),
-        fetched_at=datetime.now(timezone.utc),
+    selected = parse_fields(fields)
+    if wait and since is not None:
+        version = await data_version.wait_newer(db, since, wait)
+    else:
+        version = await data_version.get(db)
+    generation = await data_version.generation(db)
+    tag = http_cache.etag(version, generation, "latest", since, selected, fmt)
+    if http_cache.matches(if_none_match, tag):
+        return http_cache.not_modified(tag)
+
+    return Response(
+        content=await weather_cache.display_latest(
+            db, version, since, selected, fmt, generation
+        ),
+        media_type=display_payload.MEDIA_TYPES[fmt],
+        headers=http_cache.headers(tag),
     )
 
 
@@ -83,15 +145,29 @@ async def get_latest_for_display(
 )
 async def get_sensor_latest_for_display(
     device_id: int,
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _device: DisplayDeviceDep,
+    fields: str | None = FIELDS_QUERY,
+    fmt: DisplayFormat = FORMAT_QUERY,
+    if_none_match: str | None = Header(None),
 ) -> Any:
     """
     Get the latest weather reading from a specific sensor.
     
     Requires X-API-Key header with a valid display device API key.
     """
-    reading = await weather_service.get_latest_by_device(db, device_id)
+    selected = parse_fields(fields)
+    version = await data_version.get(db, device_id)
+    generation = await data_version.generation(db)
+    tag = http_cache.etag(
+        version, generation, "sensor_latest", device_id, selected, fmt
+    )
+    if http_cache.matches(if_none_match, tag):
+        return http_cache.not_modified(tag)
+
+    reading = await weather_cache.display_sensor_latest(
+        db, device_id, version, selected, fmt, generation
+    )
     
     if not reading:
         raise HTTPException(
@@ -99,7 +175,11 @@ async def get_sensor_latest_for_display(
             detail=f"No readings found for device {device_id}",
         )
     
-    return reading
+    return Response(
+        content=reading,
+        media_type=display_payload.MEDIA_TYPES[fmt],
+        headers=http_cache.headers(tag),
+    )
 
 @router.get(
     "/display/time",
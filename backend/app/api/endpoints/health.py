@@ -1,13 +1,14 @@
 from fastapi import APIRouter
 from sqlalchemy import text
-from app.api.deps import AsyncSessionDep, LocalhostDep
+from app.api.deps import ReadSessionDep, LocalhostDep
+import app.services.weather_cache as weather_cache
 
 router = APIRouter()
 
 
 @router.get("/")
 async def health_check(
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _: LocalhostDep
 ) -> dict[str, str]:
     """Health check endpoint."""
@@ -20,4 +21,10 @@ async def health_check(
     return {
         "status": "healthy",
         "database": db_status,
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/cache")
+async def cache_stats(_: LocalhostDep) -> dict[str, dict[str, int]]:
+    """Request coalescing counters for this worker process."""
+    return weather_cache.stats()
@@ -2,14 +2,14 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.setting import Setting, SettingUpdate
-from app.api.deps import AsyncSessionDep, AdminDep
+from app.api.deps import AsyncSessionDep, ReadSessionDep, AdminDep
 import app.services.setting as sett
 
 router = APIRouter()
 
 @router.get("/", response_model=list[Setting])
 async def get_settings(
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _: AdminDep
 ) -> Any:
     """Get all settings (admin only)."""
@@ -18,7 +18,7 @@ async def get_settings(
 @router.get("/{key}", response_model=Setting)
 async def get_setting(
     key: str,
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _: AdminDep
 ) -> Any:
     """Get a specific setting (admin only)."""
@@ -2,7 +2,7 @@ from typing import Any
 
 from fastapi import APIRouter, HTTPException, status
 
-from app.api.deps import AsyncSessionDep
+from app.api.deps import AsyncSessionDep, ReadSessionDep
 from app.api.deps.jwt_auth import AdminDep, AdminOrUserDep
 from app.schemas.user import User, UserCreate, UserUpdate, UserList
 import app.services.user as user_service
@@ -11,7 +11,7 @@ router = APIRouter()
 
 @router.get("/", response_model=UserList)
 async def get_users(
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _: AdminDep,
     skip: int = 0,
     limit: int = 100,
@@ -29,7 +29,7 @@ async def get_me(current_user: AdminOrUserDep) -> Any:
 @router.get("/{user_id}", response_model=User)
 async def get_user(
     user_id: int,
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _: AdminDep,
 ) -> Any:
     user = await user_service.get_by_id(db, user_id)
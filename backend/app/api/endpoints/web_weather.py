@@ -1,19 +1,51 @@
+import time
 from datetime import datetime, timezone
 from typing import Any
-from fastapi import APIRouter, HTTPException, Query, status
-from app.api.deps import AsyncSessionDep, AdminOrUserDep
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from app.api.deps import ReadSessionDep, ReadSessionFactoryDep, AdminOrUserDep, use_workload
+from app.core.config import Workload
+from app.db.session import run_concurrently
 from app.schemas.weather_reading import (
+    Dashboard,
+    Downsample,
+    DownsampledSeries,
     WeatherReadingList,
+    WeatherSeriesMatrix,
     WeatherReadingWithLocation,
     LatestReadings,
     WeatherSummary,
     WeatherGranularity
 )
-from app.utils.weather_reading import DEFAULT_AGG_LOOKBACK
+from app.utils.weather_reading import (
+    DEFAULT_AGG_LOOKBACK,
+    MAX_SERIES_POINTS,
+    MAX_SUMMARY_SCAN_HOURS,
+    effective_granularity,
+)
+import app.services.dashboard as dashboard_service
+import app.services.data_version as data_version
+import app.services.sliding_summary as summary_service
 import app.services.weather_reading as weather_service
+import app.services.weather_cache as weather_cache
+import app.utils.http_cache as http_cache
 
 router = APIRouter()
 
+
+def _check_summary_hours(hours: int) -> None:
+    """Summaries longer than a week must be one of the running windows, while those are in use."""
+    running = summary_service.window_hours() if summary_service.enabled() else []
+    if hours > MAX_SUMMARY_SCAN_HOURS and hours not in running:
+        windows = ", ".join(str(h) for h in running if h > MAX_SUMMARY_SCAN_HOURS)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=(
+                f"hours must be at most {MAX_SUMMARY_SCAN_HOURS}"
+                + (f" or one of {windows}." if windows else ".")
+            ),
+        )
+
+
 @router.get(
     "/display/latest",
     response_model=LatestReadings,
@@ -21,8 +53,13 @@ router = APIRouter()
     description="Get the most recent reading from each sensor. Optimized for display boards.",
 )
 async def get_latest_for_display(
-    db: AsyncSessionDep,
-    _: AdminOrUserDep
+    db: ReadSessionDep,
+    _: AdminOrUserDep,
+    since: int | None = Query(
+        None, ge=0,
+        description="Watermark of a previous response: only return what changed after it",
+    ),
+    if_none_match: str | None = Header(None),
 ) -> Any:
     """
     Get the latest weather reading from all sensor devices.
@@ -30,9 +67,16 @@ async def get_latest_for_display(
     Returns one reading per sensor with device location info.
     Optimized endpoint for display boards to show current conditions.
     """
-    return LatestReadings(
-        readings=await weather_service.get_latest_from_all_sensors(db),
-        fetched_at=datetime.now(timezone.utc),
+    version = await data_version.get(db)
+    generation = await data_version.generation(db)
+    tag = http_cache.etag(version, generation, "latest", since)
+    if http_cache.matches(if_none_match, tag):
+        return http_cache.not_modified(tag)
+
+    return Response(
+        content=await weather_cache.latest_from_all_sensors_json(db, version, since, generation),
+        media_type="application/json",
+        headers=http_cache.headers(tag),
     )
 
 
@@ -43,13 +87,20 @@ async def get_latest_for_display(
 )
 async def get_sensor_latest_for_display(
     device_id: int,
-    db: AsyncSessionDep,
-    _: AdminOrUserDep
+    db: ReadSessionDep,
+    _: AdminOrUserDep,
+    if_none_match: str | None = Header(None),
 ) -> Any:
     """
     Get the latest weather reading from a specific sensor.
     """
-    reading = await weather_service.get_latest_by_device(db, device_id)
+    version = await data_version.get(db, device_id)
+    generation = await data_version.generation(db)
+    tag = http_cache.etag(version, generation, "sensor_latest", device_id)
+    if http_cache.matches(if_none_match, tag):
+        return http_cache.not_modified(tag)
+
+    reading = await weather_cache.latest_by_device_json(db, device_id, version, generation)
     
     if not reading:
         raise HTTPException(
@@ -57,16 +108,18 @@ async def get_sensor_latest_for_display(
             detail=f"No readings found for device {device_id}",
         )
     
-    return reading
+    return Response(content=reading, media_type="application/json", headers=http_cache.headers(tag))
 
 
 @router.get(
     "/readings",
     response_model=WeatherReadingList,
     summary="Get all weather readings",
+    dependencies=[Depends(use_workload(Workload.export))],
 )
 async def get_all_readings(
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
+    sessions: ReadSessionFactoryDep,
     _: AdminOrUserDep,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=5000),
@@ -83,10 +136,28 @@ async def get_all_readings(
         False,
         description="If true, pick an appropriate granularity based on start_time/end_time.",
     ),
+    stats: bool = Query(
+        False, description="Aggregated modes: add per-bucket min, max, p50 and p95 of every metric",
+    ),
+    since: int | None = Query(
+        None, ge=0,
+        description="Watermark of a previous response: only return what changed after it",
+    ),
+    if_none_match: str | None = Header(None),
 ) -> Any:
     """
     Get all weather readings with pagination and optional time filtering.
     """
+    version = await data_version.get(db)
+    generation = await data_version.generation(db)
+    tag = http_cache.etag(
+        version, generation, "readings", skip, limit, start_time, end_time, granularity,
+        auto_granularity, since, stats,
+    )
+    caching = http_cache.cache_control(end_time)
+    if http_cache.matches(if_none_match, tag):
+        return http_cache.not_modified(tag, caching)
+
     # Aggregation mode: do bucketed aggregation at query-time and enforce max payload size.
     if granularity is not None or auto_granularity:
         if start_time is None or end_time is None:
@@ -99,7 +170,7 @@ async def get_all_readings(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail="start_time must be earlier than end_time.",
             )
-        agg_readings, effective = await weather_service.get_aggregated_all(
+        body = await weather_cache.aggregated_all_json(
             db,
             start_time=start_time,
             end_time=end_time,
@@ -107,34 +178,42 @@ async def get_all_readings(
             auto_granularity=auto_granularity,
             skip=skip,
             limit=limit,
+            version=version,
+            since=since,
+            stats=stats,
         )
-        return WeatherReadingList(
-            readings=agg_readings,
-            total=len(agg_readings),
-            aggregated=True,
-            granularity=effective,
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers=http_cache.headers(tag, caching),
         )
     
-    # Raw mode
-    raw_readings = await weather_service.get_all(
-        db,
-        skip=skip,
-        limit=limit,
-        start_time=start_time,
-        end_time=end_time,
-    )
-    total = await weather_service.count(db, start_time=start_time, end_time=end_time)
+    # Raw mode: page, total and watermark are independent queries
+    watermark, raw_readings, total = await run_concurrently(sessions, [
+        weather_service.get_watermark,
+        lambda s: weather_service.get_all(
+            s, skip=skip, limit=limit, start_time=start_time, end_time=end_time, since=since
+        ),
+        lambda s: weather_service.count(s, start_time=start_time, end_time=end_time, since=since),
+    ])
     
-    return WeatherReadingList(readings=raw_readings, total=total)
+    return Response(
+        content=WeatherReadingList(
+            readings=raw_readings, total=total, watermark=watermark
+        ).model_dump_json(),
+        media_type="application/json",
+        headers=http_cache.headers(tag, caching),
+    )
 
 @router.get(
     "/display/sensor/{device_id}/history",
-    response_model=WeatherReadingList,
+    response_model=WeatherReadingList | DownsampledSeries,
     summary="Get reading history for sensor",
 )
 async def get_sensor_history(
     device_id: int,
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
+    sessions: ReadSessionFactoryDep,
     _: AdminOrUserDep,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=5000),
@@ -148,19 +227,51 @@ async def get_sensor_history(
     auto_granularity: bool = Query(
         True,
         description="If true and granularity is not set, pick an appropriate granularity based on the date range.",),
+    stats: bool = Query(
+        False, description="Aggregated modes: add per-bucket min, max, p50 and p95 of every metric",
+    ),
+    since: int | None = Query(
+        None, ge=0,
+        description="Watermark of a previous response: only return what changed after it",
+    ),
+    downsample: Downsample | None = Query(
+        None,
+        description=(
+            "Instead of averaging into buckets, keep the `points` readings that best preserve "
+            "the shape of each metric (peaks included)"
+        ),
+    ),
+    points: int = Query(
+        500, ge=3, le=MAX_SERIES_POINTS, description="Points per metric with downsample",
+    ),
+    if_none_match: str | None = Header(None),
 ) -> Any:
     """
     Get historical weather readings from a specific sensor.
     
     Supports pagination, time range filtering, and optional query-time aggregation.
+    With downsample=lttb it returns a DownsampledSeries instead.
     """
     # If aggregation is requested but no range is specified, default to last 24h.
-    if (granularity is not None or auto_granularity) and (start_time is None and end_time is None):
-        end_time = datetime.now(timezone.utc)
+    # Whole seconds, so concurrent refreshes of the default window coalesce.
+    aggregating = granularity is not None or auto_granularity or downsample is not None
+    if aggregating and (start_time is None and end_time is None):
+        end_time = datetime.now(timezone.utc).replace(microsecond=0)
         start_time = end_time.replace()  # copy
         start_time = start_time - DEFAULT_AGG_LOOKBACK
+
+    # Resolved window, so the tag of a default window moves with the clock.
+    version = await data_version.get(db, device_id)
+    generation = await data_version.generation(db)
+    tag = http_cache.etag(
+        version, generation, "history", device_id, skip, limit, start_time, end_time,
+        granularity, auto_granularity, since, stats, downsample, points,
+    )
+    caching = http_cache.cache_control(end_time)
+    if http_cache.matches(if_none_match, tag):
+        return http_cache.not_modified(tag, caching)
     
-    if granularity is not None or auto_granularity:
+    if aggregating:
         if start_time is None or end_time is None:
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -171,7 +282,17 @@ async def get_sensor_history(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail="start_time must be earlier than end_time.",
             )
-        agg_readings, effective = await weather_service.get_aggregated_by_device(
+        if downsample is not None:
+            body = await weather_cache.downsampled_json(
+                db, device_id, start_time, end_time, points, version
+            )
+            return Response(
+                content=body,
+                media_type="application/json",
+                headers=http_cache.headers(tag, caching),
+            )
+
+        body = await weather_cache.aggregated_by_device_json(
             db,
             device_id=device_id,
             start_time=start_time,
@@ -180,27 +301,111 @@ async def get_sensor_history(
             auto_granularity=auto_granularity,
             skip=skip,
             limit=limit,
+            version=version,
+            since=since,
+            stats=stats,
         )
-        return WeatherReadingList(
-            readings=agg_readings,
-            total=len(agg_readings),
-            aggregated=True,
-            granularity=effective,
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers=http_cache.headers(tag, caching),
         )
     
-    # Raw mode
-    raw_readings = await weather_service.get_by_device(
-        db,
-        device_id,
-        skip=skip,
-        limit=limit,
-        start_time=start_time,
-        end_time=end_time,
+    # Raw mode: page, total and watermark are independent queries
+    watermark, raw_readings, total = await run_concurrently(sessions, [
+        weather_service.get_watermark,
+        lambda s: weather_service.get_by_device(
+            s,
+            device_id,
+            skip=skip,
+            limit=limit,
+            start_time=start_time,
+            end_time=end_time,
+            since=since,
+        ),
+        lambda s: weather_service.count(
+            s, device_id=device_id, start_time=start_time, end_time=end_time, since=since
+        ),
+    ])
+    return Response(
+        content=WeatherReadingList(
+            readings=raw_readings, total=total, watermark=watermark
+        ).model_dump_json(),
+        media_type="application/json",
+        headers=http_cache.headers(tag, caching),
     )
-    total = await weather_service.count(
-        db, device_id=device_id, start_time=start_time, end_time=end_time
+
+@router.get(
+    "/matrix",
+    response_model=WeatherSeriesMatrix,
+    summary="Aggregated series of several sensors on one time axis",
+)
+async def get_series_matrix(
+    db: ReadSessionDep,
+    _: AdminOrUserDep,
+    device_ids: list[int] = Query(
+        ..., min_length=1, max_length=50, description="Sensors to include (repeat the parameter)",
+    ),
+    start_time: datetime | None = Query(
+        None,
+        description="Series from this time (default: 24h before end_time)",
+    ),
+    end_time: datetime | None = Query(None, description="Series until this time (default: now)"),
+    granularity: WeatherGranularity | None = Query(None, description="Bucket size"),
+    auto_granularity: bool = Query(
+        True,
+        description=(
+            "If true and granularity is not set, pick an appropriate granularity "
+            "based on the date range."
+        ),
+    ),
+    stats: bool = Query(False, description="Add per-bucket min, max, p50 and p95 of every metric"),
+    if_none_match: str | None = Header(None),
+) -> Any:
+    """
+    Aggregated series of several sensors from a single query.
+
+    Returns one shared list of bucket timestamps and, per sensor, one array
+    per metric aligned to it, which is far smaller than a list of
+    aggregate objects per sensor.
+    """
+    # Whole seconds, so concurrent refreshes of the default window coalesce.
+    if end_time is None:
+        end_time = datetime.now(timezone.utc).replace(microsecond=0)
+    if start_time is None:
+        start_time = end_time - DEFAULT_AGG_LOOKBACK
+    if start_time >= end_time:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="start_time must be earlier than end_time.",
+        )
+    try:
+        effective_granularity(start_time, end_time, granularity, auto_granularity)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        )
+    ids = tuple(dict.fromkeys(device_ids))
+
+    version = await data_version.get(db)
+    generation = await data_version.generation(db)
+    tag = http_cache.etag(
+        version, generation, "matrix", ids, start_time, end_time, granularity, auto_granularity,
+        stats,
+    )
+    caching = http_cache.cache_control(end_time)
+    if http_cache.matches(if_none_match, tag):
+        return http_cache.not_modified(tag, caching)
+
+    body = await weather_cache.aggregated_matrix_json(
+        db, ids, start_time, end_time, granularity, auto_granularity, version, stats
+    )
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers=http_cache.headers(tag, caching),
     )
-    return WeatherReadingList(readings=raw_readings, total=total)
 
 @router.get(
     "/display/sensor/{device_id}/summary",
@@ -209,17 +414,37 @@ async def get_sensor_history(
 )
 async def get_sensor_summary(
     device_id: int,
-    db: AsyncSessionDep,
+    db: ReadSessionDep,
     _: AdminOrUserDep,
-    hours: int = Query(24, ge=1, le=168, description="Hours to aggregate (1-168)"),
+    hours: int = Query(
+        24,
+        ge=1,
+        description="Hours to aggregate (1-168, or a longer window of SUMMARY_WINDOWS_HOURS)",
+    ),
+    if_none_match: str | None = Header(None),
 ) -> Any:
     """
     Get aggregated weather summary for a sensor over specified hours.
 
     Includes min/max/avg temperature, average humidity and pressure.
     """
+    _check_summary_hours(hours)
+    # The window ends now, so the tag includes the current second.
+    version = await data_version.get(db, device_id)
+    generation = await data_version.generation(db)
+    tag = http_cache.etag(version, generation, "summary", device_id, hours, int(time.time()))
+    if http_cache.matches(if_none_match, tag):
+        return http_cache.not_modified(tag)
+
     try:
-        return await weather_service.get_summary_by_device(db, device_id, hours)
+        body = await weather_cache.summary_by_device_json(
+            db, device_id, hours, version, generation
+        )
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers=http_cache.headers(tag),
+        )
     except weather_service.DeviceNotFoundError as exc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -229,4 +454,106 @@ async def get_sensor_summary(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(exc),
-        )
\ No newline at end of file
+        )
+
+
+@router.get(
+    "/dashboard",
+    response_model=Dashboard,
+    summary="Latest reading, summary and history of several sensors",
+)
+async def get_dashboard(
+    db: ReadSessionDep,
+    sessions: ReadSessionFactoryDep,
+    _: AdminOrUserDep,
+    device_ids: list[int] | None = Query(
+        None,
+        max_length=50,
+        description="Sensors to include (repeat the parameter); all sensors if omitted",
+    ),
+    hours: int = Query(
+        24,
+        ge=1,
+        description=(
+            "Hours covered by each summary (1-168, or a longer window of SUMMARY_WINDOWS_HOURS)"
+        ),
+    ),
+    start_time: datetime | None = Query(
+        None,
+        description="History from this time (default: 24h before end_time)",
+    ),
+    end_time: datetime | None = Query(None, description="History until this time (default: now)"),
+    granularity: WeatherGranularity | None = Query(None, description="History bucket size"),
+    auto_granularity: bool = Query(
+        True,
+        description=(
+            "If true and granularity is not set, pick an appropriate granularity "
+            "based on the date range."
+        ),
+    ),
+    if_none_match: str | None = Header(None),
+) -> Any:
+    """
+    Everything the dashboard page needs in one request.
+
+    For each sensor: its latest reading, a summary of the last `hours` and
+    its aggregated history. The queries behind them run concurrently, so
+    this takes about as long as the slowest one.
+    """
+    _check_summary_hours(hours)
+    # Whole seconds, so concurrent refreshes of the default window coalesce.
+    if end_time is None:
+        end_time = datetime.now(timezone.utc).replace(microsecond=0)
+    if start_time is None:
+        start_time = end_time - DEFAULT_AGG_LOOKBACK
+    if start_time >= end_time:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="start_time must be earlier than end_time.",
+        )
+    try:
+        effective_granularity(start_time, end_time, granularity, auto_granularity)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        )
+
+    # Summaries end now, so the tag includes the current second.
+    version = await data_version.get(db)
+    generation = await data_version.generation(db)
+    tag = http_cache.etag(
+        version,
+        generation,
+        "dashboard",
+        device_ids,
+        hours,
+        start_time,
+        end_time,
+        granularity,
+        auto_granularity,
+        int(time.time()),
+    )
+    if http_cache.matches(if_none_match, tag):
+        return http_cache.not_modified(tag)
+
+    try:
+        result = await dashboard_service.get_dashboard(
+            sessions,
+            device_ids=device_ids,
+            start_time=start_time,
+            end_time=end_time,
+            granularity=granularity,
+            auto_granularity=auto_granularity,
+            hours=hours,
+        )
+    except weather_service.DeviceNotFoundError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(exc),
+        )
+    return Response(
+        content=result.model_dump_json(),
+        media_type="application/json",
+        headers=http_cache.headers(tag),
+    )
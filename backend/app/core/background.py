@@ -0,0 +1,47 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """
+    Long-running coroutines owned by the app lifespan.
+
+    Every uvicorn worker process runs its own lifespan, so registered tasks
+    run once per worker, not once per deployment.
+    """
+
+    def __init__(self) -> None:
+        self._factories: dict[str, Callable[[], Awaitable[None]]] = {}
+        self._tasks: dict[str, asyncio.Task[None]] = {}
+
+    def register(self, name: str, factory: Callable[[], Awaitable[None]]) -> None:
+        """Register a coroutine function to run for the lifetime of the worker."""
+        self._factories[name] = factory
+
+    async def start(self) -> None:
+        for name, factory in self._factories.items():
+            self._tasks[name] = asyncio.create_task(self._run(name, factory), name=name)
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Cancel every task and wait up to timeout seconds for them to finish."""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    @staticmethod
+    async def _run(name: str, factory: Callable[[], Awaitable[None]]) -> None:
+        try:
+            await factory()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Background task %s crashed", name)
+
+
+background_tasks = BackgroundTasks()
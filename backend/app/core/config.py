@@ -1,8 +1,114 @@
-from typing import Any
-from pydantic import PostgresDsn, field_validator
+from enum import Enum
+from typing import Annotated, Any
+from pydantic import AnyUrl, BaseModel, Field, PostgresDsn, UrlConstraints, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class Workload(str, Enum):
+    """Workload classes that get their own connection pool."""
+    ingest = "ingest"
+    display = "display"
+    dashboard = "dashboard"
+    export = "export"
+    admin = "admin"
+
+
+class WorkloadLimits(BaseModel):
+    """Connection pool and query limits for one workload class."""
+    pool_size: int = Field(..., ge=1)
+    max_overflow: int = Field(0, ge=0)
+    pool_timeout: float = Field(
+        ..., gt=0, description="Seconds to wait in queue for a free connection"
+    )
+    statement_timeout_ms: int = Field(
+        ..., ge=0, description="Server-side statement_timeout, 0 disables it"
+    )
+
+
+DEFAULT_WORKLOAD_LIMITS: dict[Workload, WorkloadLimits] = {
+    # Sensor POSTs: short queries, must never queue behind analytics.
+    Workload.ingest: WorkloadLimits(
+        pool_size=10, max_overflow=10, pool_timeout=2, statement_timeout_ms=2_000
+    ),
+    Workload.display: WorkloadLimits(
+        pool_size=4, max_overflow=4, pool_timeout=5, statement_timeout_ms=3_000
+    ),
+    Workload.dashboard: WorkloadLimits(
+        pool_size=4, max_overflow=4, pool_timeout=10, statement_timeout_ms=15_000
+    ),
+    Workload.export: WorkloadLimits(
+        pool_size=2, max_overflow=0, pool_timeout=30, statement_timeout_ms=120_000
+    ),
+    Workload.admin: WorkloadLimits(
+        pool_size=2, max_overflow=2, pool_timeout=10, statement_timeout_ms=10_000
+    ),
+}
+
+
+SqliteDsn = Annotated[AnyUrl, UrlConstraints(allowed_schemes=["sqlite+aiosqlite"])]
+
+# Applied to every SQLite connection. WAL lets readers run while a sensor
+# POST writes; synchronous=NORMAL is durable across application crashes
+# (not power loss of the last commits) and much cheaper on SD cards.
+DEFAULT_SQLITE_PRAGMAS: dict[str, str | int] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": 5_000,
+    "temp_store": "MEMORY",
+    "cache_size": -16_000,  # KiB
+    "mmap_size": 64 * 1024 * 1024,
+}
+
+
+class EngineProfile(BaseModel):
+    """Engine-wide SQLAlchemy/asyncpg tuning shared by every workload pool."""
+    pool_recycle: int = Field(
+        1800, description="Recycle connections older than this many seconds, -1 disables"
+    )
+    pool_pre_ping: bool = Field(
+        True, description="Round trip on every checkout to detect dead connections"
+    )
+    statement_cache_size: int = Field(
+        100, ge=0, description="asyncpg per-connection prepared statement cache, 0 disables"
+    )
+    prepared_statement_cache_size: int = Field(
+        100, ge=0, description="SQLAlchemy asyncpg adapter prepared statement cache, 0 disables"
+    )
+    jit: bool = Field(
+        False, description="PostgreSQL JIT; usually slower than it saves for short OLTP queries"
+    )
+    startup_settings: bool = Field(
+        True,
+        description="Send jit and the workload's statement_timeout as connection startup "
+        "parameters; PgBouncer refuses those unless listed in its ignore_startup_parameters",
+    )
+    query_cache_size: int = Field(
+        500, ge=0, description="SQLAlchemy compiled statement cache entries per engine"
+    )
+    echo: bool = False
+
+
+ENGINE_PROFILES: dict[str, EngineProfile] = {
+    "default": EngineProfile(),
+    # Behind pgbouncer in transaction mode prepared statements can't be reused,
+    # and startup parameters other than application_name are refused: set
+    # statement_timeout (and jit) on the database role instead.
+    "pgbouncer": EngineProfile(
+        statement_cache_size=0, prepared_statement_cache_size=0, startup_settings=False
+    ),
+    # Stable network to the DB: skip the per-checkout ping, cache more statements.
+    "throughput": EngineProfile(
+        pool_recycle=3600,
+        pool_pre_ping=False,
+        statement_cache_size=500,
+        prepared_statement_cache_size=500,
+        query_cache_size=2000,
+    ),
+    "debug": EngineProfile(echo=True),
+}
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -18,7 +124,98 @@ class Settings(BaseSettings):
     API_KEY_HASH_SECRET: str
     ALGORITHM: str = 'HS256'
     
-    DATABASE_URL: PostgresDsn
+    # PostgreSQL, or SQLite (sqlite+aiosqlite:///path/weather.db) for a
+    # single-process edge node: one uvicorn worker, no INGEST_NOTIFY.
+    DATABASE_URL: PostgresDsn | SqliteDsn
+
+    # Pragma overrides for SQLite, e.g. SQLITE_PRAGMAS='{"synchronous": "FULL"}'
+    SQLITE_PRAGMAS: dict[str, str | int] = DEFAULT_SQLITE_PRAGMAS
+
+    # Per-workload pool limits, e.g.
+    # DB_WORKLOADS='{"ingest": {"pool_size": 20, "pool_timeout": 1, "statement_timeout_ms": 1000}}'
+    # Classes that are not listed keep their defaults.
+    DB_WORKLOADS: dict[Workload, WorkloadLimits] = DEFAULT_WORKLOAD_LIMITS
+
+    # Engine tuning preset (see ENGINE_PROFILES) plus optional field overrides,
+    # e.g. DB_ENGINE_PROFILE=throughput DB_ENGINE='{"pool_recycle": 600}'
+    DB_ENGINE_PROFILE: str = "default"
+    DB_ENGINE: dict[str, Any] = {}
+
+    # Independent queries of one request (composite endpoints) run in
+    # parallel on up to this many connections of the request's pool.
+    PARALLEL_QUERIES_PER_REQUEST: int = 4
+
+    # Auth lookups are cached per worker so polling clients skip the DB.
+    # API key cache TTL is also how often last_used/last_seen get written.
+    # Revocations evict them on every worker through the ingest listener;
+    # on Postgres the caches are only used while that is connected.
+    API_KEY_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_TTL_SECONDS: int = 30
+
+    # Closed aggregation buckets are cached per worker, bounded by size
+    # (0 disables). A bucket counts as closed once it ended this many
+    # seconds ago; later readings that still land in it evict it. Needs the
+    # ingest listener, through which those evictions reach every worker.
+    AGG_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    AGG_CACHE_GRACE_SECONDS: int = 60
+
+    # Raw readings a downsampled series may be computed from; longer windows
+    # are downsampled from the finest aggregation with at most this many buckets.
+    DOWNSAMPLE_MAX_SOURCE_POINTS: int = 50_000
+
+    # Readings of closed UTC days older than this many days are packed into
+    # compressed per-device chunks by scripts.compact_readings (0 disables
+    # packing and chunk lookups). Unpack before setting it back to 0:
+    # uv run -m scripts.compact_readings --unpack
+    CHUNK_AFTER_DAYS: int = 0
+
+    # Readings of UTC days older than ARCHIVE_AFTER_DAYS are moved to Parquet
+    # files in ARCHIVE_DIR by scripts.archive_readings (needs the "archive"
+    # extra) and read from there transparently. Every worker must see the
+    # same directory. Unset disables archiving and archive reads.
+    ARCHIVE_DIR: str | None = None
+    ARCHIVE_AFTER_DAYS: int = 365
+
+    # All-device aggregations over at least ANALYTICS_MIN_RANGE_DAYS run on
+    # an embedded DuckDB over a Parquet export of the readings in
+    # ANALYTICS_DIR, kept in sync by scripts.sync_analytics (needs the
+    # "analytics" extra); the database only aggregates what was written
+    # since the last sync. Unset disables it.
+    ANALYTICS_DIR: str | None = None
+    ANALYTICS_MIN_RANGE_DAYS: int = 31
+
+    # Read whole buckets from TimescaleDB continuous aggregates where
+    # scripts.enable_timescale created them (detected at startup).
+    TIMESCALE_ROLLUPS: bool = True
+
+    # Every worker keeps each device's readings of the last
+    # RECENT_BUFFER_HOURS in memory (about 70 bytes per reading) and answers
+    # latest, summary and aggregation requests within that span from them.
+    # Needs the ingest listener; 0 disables it.
+    RECENT_BUFFER_HOURS: int = 24
+
+    # Summary lengths (hours) kept as running per-device summaries, updated
+    # on ingest, so summaries of these lengths cost no scan; they may exceed
+    # the 168 hours other lengths are limited to. Needs the ingest
+    # listener; empty disables it.
+    SUMMARY_WINDOWS_HOURS: list[int] = [1, 24, 168, 720]
+
+    # Browser max-age for history windows that lie entirely in the past.
+    HTTP_HISTORY_MAX_AGE: int = 24 * 3600
+
+    # since= watermarks trail the newest reading by this many seconds, so
+    # readings whose transaction commits late are sent again, not skipped.
+    DELTA_WATERMARK_LAG_SECONDS: int = 10
+
+    # Upper bound for wait= on long-poll endpoints; keep it below proxy
+    # read timeouts (nginx: 60s).
+    LONG_POLL_MAX_SECONDS: int = 55
+
+    # Ingest notifications between worker processes (Postgres LISTEN/NOTIFY).
+    # LISTEN needs a session-mode connection: behind a transaction pooler
+    # point INGEST_NOTIFY_URL straight at the database.
+    INGEST_NOTIFY: bool = True
+    INGEST_NOTIFY_URL: PostgresDsn | None = None
 
     TIMEZONE_STR: str = "America/Sao_Paulo"
     
@@ -38,6 +235,37 @@ class Settings(BaseSettings):
             return v
         return v
 
+    @field_validator("DB_WORKLOADS", mode="after")
+    @classmethod
+    def fill_workload_defaults(
+        cls, v: dict[Workload, WorkloadLimits]
+    ) -> dict[Workload, WorkloadLimits]:
+        return {**DEFAULT_WORKLOAD_LIMITS, **v}
+
+    @field_validator("SQLITE_PRAGMAS", mode="after")
+    @classmethod
+    def fill_sqlite_pragma_defaults(cls, v: dict[str, str | int]) -> dict[str, str | int]:
+        return {**DEFAULT_SQLITE_PRAGMAS, **v}
+
+    @field_validator("DB_ENGINE_PROFILE")
+    @classmethod
+    def check_engine_profile(cls, v: str) -> str:
+        if v not in ENGINE_PROFILES:
+            raise ValueError(
+                f"Unknown engine profile '{v}', expected one of {list(ENGINE_PROFILES)}"
+            )
+        return v
+
+    @property
+    def engine_profile(self) -> EngineProfile:
+        """Selected engine profile with DB_ENGINE overrides applied."""
+        base = ENGINE_PROFILES[self.DB_ENGINE_PROFILE]
+        return EngineProfile.model_validate({**base.model_dump(), **self.DB_ENGINE})
+
+    @property
+    def is_sqlite(self) -> bool:
+        return self.DATABASE_URL.scheme.startswith("sqlite")
+
     @property
     def is_production(self) -> bool:
         """Check if running in production environment."""
@@ -0,0 +1,299 @@
+"""
+Notifications about new (or removed) weather readings, and about changed
+credentials.
+
+Services publish an IngestEvent (AuthEvent) on the session that wrote the
+change and local subscribers are called once that transaction commits;
+nothing is delivered if it rolls back. On Postgres, with INGEST_NOTIFY
+enabled, the committed event is also queued for the other worker
+processes: IngestBus.listen (registered as a background task) sends the
+queue with pg_notify on its own connection, one statement per batch,
+and receives theirs. Ingest transactions thus pay no extra round trip,
+and don't take Postgres' global notification lock at commit.
+
+Sending after commit means a worker that dies in between loses those
+notifications; the other workers then serve what they derived from the
+database until the device's next change (or their listener reconnects).
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable
+
+import asyncpg
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "weather_ingest"
+AUTH_CHANNEL = "auth_changes"
+_PENDING_KEY = "ingest_events"
+_PENDING_AUTH_KEY = "auth_events"
+_PENDING_NOTIFY_KEY = "notifications"
+# Notifications sent per statement, and kept while the listener is away.
+_NOTIFY_BATCH = 500
+_OUTBOX_LIMIT = 10_000
+_NOTIFY_SQL = (
+    "SELECT pg_notify(n.channel, n.payload) "
+    "FROM unnest($1::text[], $2::text[]) AS n(channel, payload)"
+)
+# Identifies this worker in its own notifications; pids repeat across containers.
+_SENDER = uuid.uuid4().hex
+
+
+@dataclass(frozen=True, slots=True)
+class IngestEvent:
+    """
+    Readings of a device changed.
+
+    recorded_at is the time of the new reading, or None when any part of
+    the device's history may have changed (device deleted, bulk purge).
+    """
+    device_id: int
+    reading_id: int | None = None
+    recorded_at: datetime | None = None
+
+    def to_payload(self, sender: str) -> str:
+        return json.dumps({
+            "s": sender,
+            "d": self.device_id,
+            "r": self.reading_id,
+            "t": self.recorded_at.timestamp() if self.recorded_at else None,
+        })
+
+    @classmethod
+    def from_payload(cls, payload: str) -> tuple[str, "IngestEvent"]:
+        """Parse a notification payload into (sender, event)."""
+        data = json.loads(payload)
+        recorded_at = (
+            datetime.fromtimestamp(data["t"], timezone.utc) if data["t"] is not None else None
+        )
+        return data["s"], cls(data["d"], data["r"], recorded_at)
+
+
+@dataclass(frozen=True, slots=True)
+class AuthEvent:
+    """
+    Credentials changed: an API key (revoked, deleted), every key of a
+    device (device updated or deleted), or a user (updated or deleted).
+    """
+    key_hash: str | None = None
+    device_id: int | None = None
+    user_id: int | None = None
+
+    def to_payload(self, sender: str) -> str:
+        return json.dumps({"s": sender, "k": self.key_hash, "d": self.device_id, "u": self.user_id})
+
+    @classmethod
+    def from_payload(cls, payload: str) -> tuple[str, "AuthEvent"]:
+        """Parse a notification payload into (sender, event)."""
+        data = json.loads(payload)
+        return data["s"], cls(data["k"], data["d"], data["u"])
+
+
+class IngestBus:
+    def __init__(self, channel: str = CHANNEL, auth_channel: str = AUTH_CHANNEL) -> None:
+        self.channel = channel
+        self.auth_channel = auth_channel
+        self._subscribers: list[Callable[[IngestEvent], None]] = []
+        self._auth_subscribers: list[Callable[[AuthEvent], None]] = []
+        self._reset_subscribers: list[Callable[[], None]] = []
+        self._changed: asyncio.Event | None = None
+        # Committed (channel, payload) pairs not sent to the other workers yet.
+        self._outbox: deque[tuple[str, str]] = deque(maxlen=_OUTBOX_LIMIT)
+        self._outbox_ready = asyncio.Event()
+        # True while notifications from other workers are being received.
+        self.listening = False
+
+    def subscribe(
+        self,
+        on_event: Callable[[IngestEvent], None],
+        on_reset: Callable[[], None] | None = None,
+    ) -> None:
+        """
+        Call on_event for every committed change, from this or another worker.
+
+        on_reset is called when notifications from other workers may have
+        been missed (listener reconnected), so derived state should be dropped.
+        """
+        self._subscribers.append(on_event)
+        if on_reset is not None:
+            self._reset_subscribers.append(on_reset)
+
+    def subscribe_auth(
+        self,
+        on_event: Callable[[AuthEvent], None],
+        on_reset: Callable[[], None] | None = None,
+    ) -> None:
+        """Like subscribe, for committed credential changes."""
+        self._auth_subscribers.append(on_event)
+        if on_reset is not None:
+            self._reset_subscribers.append(on_reset)
+
+    async def publish(self, db: AsyncSession, ingest_event: IngestEvent) -> None:
+        """Queue ingest_event for delivery when db's transaction commits."""
+        db.sync_session.info.setdefault(_PENDING_KEY, []).append(ingest_event)
+        self._notify_on_commit(db, self.channel, ingest_event.to_payload(_SENDER))
+
+    async def publish_auth(self, db: AsyncSession, auth_event: AuthEvent) -> None:
+        """Queue auth_event for delivery when db's transaction commits."""
+        db.sync_session.info.setdefault(_PENDING_AUTH_KEY, []).append(auth_event)
+        self._notify_on_commit(db, self.auth_channel, auth_event.to_payload(_SENDER))
+
+    @staticmethod
+    def _notify_on_commit(db: AsyncSession, channel: str, payload: str) -> None:
+        if settings.INGEST_NOTIFY and db.get_bind().dialect.name == "postgresql":
+            db.sync_session.info.setdefault(_PENDING_NOTIFY_KEY, []).append((channel, payload))
+
+    def send_later(self, notifications: Iterable[tuple[str, str]]) -> None:
+        """Queue committed notifications for the listener to send."""
+        full = len(self._outbox) == _OUTBOX_LIMIT
+        self._outbox.extend(notifications)
+        if not full and len(self._outbox) == _OUTBOX_LIMIT:
+            logger.warning("Ingest notification queue is full, dropping the oldest")
+        if self._outbox:
+            self._outbox_ready.set()
+
+    async def _send_pending(self, conn: Any) -> None:
+        """Send the queued notifications on conn, one statement per batch."""
+        while self._outbox:
+            batch = [self._outbox.popleft() for _ in range(min(len(self._outbox), _NOTIFY_BATCH))]
+            try:
+                await conn.execute(_NOTIFY_SQL, [c for c, _ in batch], [p for _, p in batch])
+            except asyncpg.PostgresError:
+                logger.exception("Dropping %d ingest notifications", len(batch))
+            except BaseException:
+                # Connection lost or task cancelled: resend after reconnecting.
+                self._outbox.extendleft(reversed(batch))
+                raise
+
+    async def _send(self, conn: Any) -> None:
+        # Starts with what queued up while the listener was reconnecting.
+        while True:
+            self._outbox_ready.clear()
+            await self._send_pending(conn)
+            await self._outbox_ready.wait()
+
+    def dispatch(self, ingest_event: IngestEvent) -> None:
+        for callback in self._subscribers:
+            try:
+                callback(ingest_event)
+            except Exception:
+                logger.exception("Ingest subscriber %r failed", callback)
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    def dispatch_auth(self, auth_event: AuthEvent) -> None:
+        for callback in self._auth_subscribers:
+            try:
+                callback(auth_event)
+            except Exception:
+                logger.exception("Auth subscriber %r failed", callback)
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for the next dispatched event; False if timeout passed first."""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except TimeoutError:
+            return False
+
+    def reset(self) -> None:
+        for callback in self._reset_subscribers:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Ingest reset subscriber %r failed", callback)
+
+    async def listen(self) -> None:
+        """Relay notifications from other workers to local subscribers, forever."""
+        url = make_url(str(settings.INGEST_NOTIFY_URL or settings.DATABASE_URL))
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+        def on_notify(_conn: Any, _backend_pid: int, _channel: str, payload: str) -> None:
+            try:
+                sender, ingest_event = IngestEvent.from_payload(payload)
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Ignoring malformed ingest notification %r", payload)
+                return
+            if sender != _SENDER:
+                self.dispatch(ingest_event)
+
+        def on_auth_notify(_conn: Any, _backend_pid: int, _channel: str, payload: str) -> None:
+            try:
+                sender, auth_event = AuthEvent.from_payload(payload)
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Ignoring malformed auth notification %r", payload)
+                return
+            if sender != _SENDER:
+                self.dispatch_auth(auth_event)
+
+        delay = 1.0
+        while True:
+            try:
+                conn = await asyncpg.connect(
+                    dsn, server_settings={"application_name": "weather-listener"}
+                )
+            except (OSError, asyncpg.PostgresError) as exc:
+                logger.warning("Ingest listener cannot connect (%s), retrying in %.0fs", exc, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+                continue
+
+            try:
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: closed.set())
+                await conn.add_listener(self.channel, on_notify)
+                await conn.add_listener(self.auth_channel, on_auth_notify)
+                # Whatever was sent while we were not listening is lost.
+                self.reset()
+                self.listening = True
+                delay = 1.0
+                sender = asyncio.create_task(self._send(conn))
+                try:
+                    await closed.wait()
+                finally:
+                    sender.cancel()
+                    # It stops with an error when the connection drops.
+                    with contextlib.suppress(asyncio.CancelledError, Exception):
+                        await sender
+                logger.warning("Ingest listener lost its connection, reconnecting")
+            finally:
+                self.listening = False
+                if not conn.is_closed():
+                    # Shutting down: what this worker committed last still goes out.
+                    with contextlib.suppress(Exception):
+                        await self._send_pending(conn)
+                    await conn.close()
+
+
+ingest_bus = IngestBus()
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_committed(session: Session) -> None:
+    for ingest_event in session.info.pop(_PENDING_KEY, ()):
+        ingest_bus.dispatch(ingest_event)
+    for auth_event in session.info.pop(_PENDING_AUTH_KEY, ()):
+        ingest_bus.dispatch_auth(auth_event)
+    ingest_bus.send_later(session.info.pop(_PENDING_NOTIFY_KEY, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_PENDING_AUTH_KEY, None)
+    session.info.pop(_PENDING_NOTIFY_KEY, None)
@@ -0,0 +1,181 @@
+"""
+SQL functions that are spelled differently per dialect.
+
+PostgreSQL gets native SQL. SQLite gets built-ins where they exist, and
+otherwise Python functions that register_sqlite_functions installs on
+every connection.
+"""
+import json
+import math
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import BigInteger, Float, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.functions import FunctionElement, ReturnTypeFromArgs
+from sqlalchemy.types import TypeEngine
+
+from app.core.config import settings
+from app.db.types import UTCDateTime
+
+# Local-time buckets are counted from this wall time (a Saturday midnight).
+LOCAL_BUCKET_ORIGIN = datetime(2000, 1, 1)
+
+
+class avg(ReturnTypeFromArgs[Any]):
+    """
+    func.avg typed like its argument, as sum, min and max already are, so
+    the average of a ScaledInteger column is scaled back too.
+    """
+    inherit_cache = True
+
+
+class epoch_minute(FunctionElement[int]):
+    """
+    Whole minutes since the epoch of a timestamp.
+
+    Immutable on every dialect, so it can define a generated column.
+    extract(epoch from timestamptz) is only stable in PostgreSQL. Subtracting
+    a constant first gives an interval, and extracting from that is immutable.
+    """
+    type = BigInteger()
+    name = "epoch_minute"
+    inherit_cache = True
+
+
+@compiles(epoch_minute, "postgresql")
+def _epoch_minute_postgresql(element: epoch_minute, compiler: SQLCompiler, **kw: Any) -> str:
+    (ts,) = element.clauses
+    return (
+        "floor(extract(epoch from (%s - timestamptz '1970-01-01 00:00:00+00')) / 60)::bigint"
+        % compiler.process(ts, **kw)
+    )
+
+
+@compiles(epoch_minute, "sqlite")
+def _epoch_minute_sqlite(element: epoch_minute, compiler: SQLCompiler, **kw: Any) -> str:
+    (ts,) = element.clauses
+    return "(CAST(strftime('%%s', %s) AS INTEGER) / 60)" % compiler.process(ts, **kw)
+
+
+class from_epoch(FunctionElement[datetime]):
+    """Timestamp of a number of seconds since the epoch."""
+    type = UTCDateTime()
+    name = "from_epoch"
+    inherit_cache = True
+
+
+@compiles(from_epoch, "postgresql")
+def _from_epoch_postgresql(element: from_epoch, compiler: SQLCompiler, **kw: Any) -> str:
+    (seconds,) = element.clauses
+    return "to_timestamp(%s)" % compiler.process(seconds, **kw)
+
+
+@compiles(from_epoch, "sqlite")
+def _from_epoch_sqlite(element: from_epoch, compiler: SQLCompiler, **kw: Any) -> str:
+    (seconds,) = element.clauses
+    return "datetime(%s, 'unixepoch')" % compiler.process(seconds, **kw)
+
+
+class local_bucket(FunctionElement[datetime]):
+    """
+    Start of the bucket of the TIMEZONE_STR wall clock containing a
+    timestamp; arguments are the timestamp and the bucket length in
+    seconds, which must be a literal.
+    """
+    type = UTCDateTime()
+    name = "local_bucket"
+    inherit_cache = True
+
+
+@compiles(local_bucket, "postgresql")
+def _local_bucket_postgresql(element: local_bucket, compiler: SQLCompiler, **kw: Any) -> str:
+    ts, bucket_seconds = element.clauses
+    zone = compiler.render_literal_value(settings.TIMEZONE_STR, String())
+    # Bin the local wall time, then turn the bin start back into an instant.
+    return "timezone(%s, date_bin(make_interval(secs => %s), timezone(%s, %s), timestamp '%s'))" % (
+        zone,
+        compiler.process(bucket_seconds, **kw),
+        zone,
+        compiler.process(ts, **kw),
+        LOCAL_BUCKET_ORIGIN.isoformat(sep=" "),
+    )
+
+
+@compiles(local_bucket, "sqlite")
+def _local_bucket_sqlite(element: local_bucket, compiler: SQLCompiler, **kw: Any) -> str:
+    ts, bucket_seconds = element.clauses
+    return "datetime(local_bucket_floor(strftime('%%s', %s), %s), 'unixepoch')" % (
+        compiler.process(ts, **kw),
+        compiler.process(bucket_seconds, **kw),
+    )
+
+
+class percentile(FunctionElement[float]):
+    """
+    Continuous percentile of a column within each group, like PostgreSQL's
+    percentile_cont; arguments are the column and the fraction (0..1).
+    """
+    type: TypeEngine[Any] = Float()
+    name = "percentile"
+    inherit_cache = True
+
+    def __init__(self, column: Any, fraction: Any) -> None:
+        super().__init__(column, fraction)
+        # Typed like the column, so scaled columns are scaled back.
+        self.type = self.clauses.clauses[0].type
+
+
+@compiles(percentile, "postgresql")
+def _percentile_postgresql(element: percentile, compiler: SQLCompiler, **kw: Any) -> str:
+    column, fraction = element.clauses
+    return "percentile_cont(%s) WITHIN GROUP (ORDER BY %s)" % (
+        compiler.process(fraction, **kw),
+        compiler.process(column, **kw),
+    )
+
+
+@compiles(percentile, "sqlite")
+def _percentile_sqlite(element: percentile, compiler: SQLCompiler, **kw: Any) -> str:
+    column, fraction = element.clauses
+    return "percentile_cont_json(json_group_array(%s), %s)" % (
+        compiler.process(column, **kw),
+        compiler.process(fraction, **kw),
+    )
+
+
+def _local_bucket_floor(epoch: str | int | None, bucket_seconds: int) -> int | None:
+    # Imported here: the helper lives next to the rest of the bucket logic,
+    # which imports the models and so this module.
+    from app.utils.weather_reading import bucket_floor
+
+    return None if epoch is None else bucket_floor(int(epoch), bucket_seconds)
+
+
+def _percentile_cont_json(values: str | None, fraction: float) -> float | None:
+    """percentile_cont over a JSON array, nulls ignored."""
+    ordered = sorted(v for v in json.loads(values or "[]") if v is not None)
+    if not ordered:
+        return None
+    position = fraction * (len(ordered) - 1)
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return float(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+
+
+def _now() -> str:
+    # Same form as CURRENT_TIMESTAMP, with microseconds.
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def register_sqlite_functions(dbapi_connection: Any) -> None:
+    """Install the Python halves of the functions above on a SQLite connection."""
+    # The migrations' server defaults call now().
+    dbapi_connection.create_function("now", 0, _now)
+    dbapi_connection.create_function(
+        "local_bucket_floor", 2, _local_bucket_floor, deterministic=True
+    )
+    dbapi_connection.create_function(
+        "percentile_cont_json", 2, _percentile_cont_json, deterministic=True
+    )
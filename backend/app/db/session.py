@@ -1,26 +1,147 @@
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from app.core.config import settings
-
-engine = create_async_engine(
-    str(settings.DATABASE_URL),
-    echo=settings.ENVIRONMENT == "development",
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+import asyncio
+from typing import Any, AsyncGenerator, Awaitable, Callable, Sequence, TypeVar
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
 )
+from app.core.config import settings, EngineProfile, Workload, WorkloadLimits
+from app.db.functions import register_sqlite_functions
 
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
+T = TypeVar("T")
+
+
+def configure_sqlite_engine(engine: AsyncEngine, pragmas: dict[str, str | int]) -> None:
+    """Set pragmas and install the Python SQL functions on every new SQLite connection."""
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection: Any, _record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+        register_sqlite_functions(dbapi_connection)
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def create_engine_for(
+    workload: Workload,
+    limits: WorkloadLimits,
+    profile: EngineProfile,
+    url: str | None = None,
+) -> AsyncEngine:
+    """Create the engine (and so the connection pool) for one workload class."""
+    url = url or str(settings.DATABASE_URL)
+    if _is_sqlite(url):
+        # No server settings or statement timeouts, and the dialect's own
+        # pool (StaticPool for :memory:, which takes no size limits).
+        sqlite_engine = create_async_engine(
+            url,
+            echo=profile.echo,
+            pool_pre_ping=profile.pool_pre_ping,
+            pool_recycle=profile.pool_recycle,
+            query_cache_size=profile.query_cache_size,
+        )
+        configure_sqlite_engine(sqlite_engine, settings.SQLITE_PRAGMAS)
+        return sqlite_engine
+
+    server_settings = {"application_name": f"weather-{workload.value}"}
+    if profile.startup_settings:
+        server_settings["jit"] = "on" if profile.jit else "off"
+        if limits.statement_timeout_ms:
+            server_settings["statement_timeout"] = str(limits.statement_timeout_ms)
+
+    return create_async_engine(
+        url,
+        echo=profile.echo,
+        pool_pre_ping=profile.pool_pre_ping,
+        pool_recycle=profile.pool_recycle,
+        pool_size=limits.pool_size,
+        max_overflow=limits.max_overflow,
+        pool_timeout=limits.pool_timeout,
+        query_cache_size=profile.query_cache_size,
+        connect_args={
+            "server_settings": server_settings,
+            # asyncpg's own statement cache
+            "statement_cache_size": profile.statement_cache_size,
+            # SQLAlchemy asyncpg adapter's prepared statement cache
+            "prepared_statement_cache_size": profile.prepared_statement_cache_size,
+        },
+    )
+
+
+def create_engines(
+    workloads: dict[Workload, WorkloadLimits],
+    profile: EngineProfile,
+    url: str | None = None,
+) -> dict[Workload, AsyncEngine]:
+    """
+    One pool per workload class, so long analytics scans can only exhaust
+    their own connections and never make sensor POSTs wait. SQLite takes one
+    writer at a time whatever the pools, so its workloads share one engine.
+    """
+    url = url or str(settings.DATABASE_URL)
+    if _is_sqlite(url):
+        shared = create_engine_for(Workload.admin, workloads[Workload.admin], profile, url)
+        return dict.fromkeys(workloads, shared)
+    return {
+        workload: create_engine_for(workload, limits, profile, url)
+        for workload, limits in workloads.items()
+    }
+
+
+engines: dict[Workload, AsyncEngine] = create_engines(
+    settings.DB_WORKLOADS, settings.engine_profile
 )
 
+session_factories: dict[Workload, async_sessionmaker[AsyncSession]] = {
+    workload: async_sessionmaker(
+        workload_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+    for workload, workload_engine in engines.items()
+}
+
+# Read-only variant: same pools, but transactions are started READ ONLY and
+# never committed. Connections are still only checked out on first query.
+read_session_factories: dict[Workload, async_sessionmaker[AsyncSession]] = {
+    workload: async_sessionmaker(
+        workload_engine.execution_options(postgresql_readonly=True),
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+    for workload, workload_engine in engines.items()
+}
+
+# Default engine/session for scripts, migrations helpers and unclassified routes.
+engine = engines[Workload.admin]
+AsyncSessionLocal = session_factories[Workload.admin]
+
+
+async def dispose_engines() -> None:
+    """Close every workload pool."""
+    for workload_engine in set(engines.values()):
+        await workload_engine.dispose()
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:
+
+def request_workload(request: Request) -> Workload:
+    """Workload class assigned to the current route (see deps.workload)."""
+    return getattr(request.state, "workload", Workload.admin)
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with session_factories[request_workload(request)]() as session:
         try:
             yield session
             await session.commit()
@@ -28,4 +149,61 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for endpoints that only read.
+
+    Skips the commit round trip; closing the session just hands the connection
+    (if one was ever checked out) back to the pool.
+    """
+    async with read_session_factories[request_workload(request)]() as session:
+        yield session
+
+
+def get_session_factory(request: Request) -> async_sessionmaker[AsyncSession]:
+    """
+    Session factory of the route's workload, for short writes that commit
+    on their own instead of with the request's session.
+    """
+    return session_factories[request_workload(request)]
+
+
+def get_read_session_factory(request: Request) -> async_sessionmaker[AsyncSession]:
+    """
+    Read-only session factory of the route's workload, for endpoints that
+    run independent queries concurrently (see run_concurrently).
+    """
+    return read_session_factories[request_workload(request)]
+
+
+async def run_concurrently(
+    session_factory: Callable[[], AsyncSession],
+    jobs: Sequence[Callable[[AsyncSession], Awaitable[T]]],
+    limit: int = settings.PARALLEL_QUERIES_PER_REQUEST,
+) -> list[T]:
+    """
+    Run every job on its own session, at most `limit` at a time, and return
+    their results in order.
+
+    Each session holds its own pooled connection only while its job runs,
+    so a request takes at most `limit` connections from its pool. If a job
+    fails the others are cancelled and the error is raised.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(job: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        async with semaphore:
+            async with session_factory() as session:
+                return await job(session)
+
+    tasks = [asyncio.ensure_future(run(job)) for job in jobs]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,156 @@
+"""
+Optional TimescaleDB support (see scripts.enable_timescale).
+
+scripts.enable_timescale turns weather_readings into a compressed
+hypertable and adds a continuous aggregate per granularity,
+weather_readings_<granularity>: per device and bucket the reading count
+and every metric's sum and count, so averages combine across devices and
+buckets. Each aggregate's comment records its bucket length and time
+zone. detect() runs once per worker at startup and keeps the aggregates
+that match the current settings; aggregations read their whole buckets
+from them, everything else reads the table as before. Without the
+extension (or on SQLite) nothing is found and nothing changes.
+"""
+import json
+import logging
+from typing import Any
+
+from sqlalchemy import Select, column, func, literal_column, select, table, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.sql import TableClause
+
+import app.utils.weather_reading as util
+from app.core.config import settings
+from app.db.types import UTCDateTime
+from app.models.weather_reading import WeatherReading as WeatherReadingModel
+from app.schemas.weather_reading import WeatherGranularity
+
+logger = logging.getLogger(__name__)
+
+# Minute buckets hold about one reading each: an aggregate would be as large as the table.
+ROLLUP_GRANULARITIES = [g for g in WeatherGranularity if g != WeatherGranularity.minute]
+
+_DETECT = text("""
+    SELECT view_name, obj_description(format('%I.%I', view_schema, view_name)::regclass, 'pg_class')
+    FROM timescaledb_information.continuous_aggregates
+    WHERE hypertable_name = 'weather_readings'
+""")
+
+# Bucket length (seconds) -> continuous aggregate, filled by detect().
+_rollups: dict[int, TableClause] = {}
+
+
+def view_name(granularity: WeatherGranularity) -> str:
+    return f"weather_readings_{granularity.value}"
+
+
+def spec(bucket_seconds: int) -> dict[str, Any]:
+    """What an aggregate's comment records; local buckets depend on TIMEZONE_STR."""
+    zone = settings.TIMEZONE_STR if util.is_local_bucket(bucket_seconds) else None
+    return {"bucket_seconds": bucket_seconds, "timezone": zone}
+
+
+def rollup_table(name: str) -> TableClause:
+    columns: list[Any] = [
+        column("device_id"), column("bucket", UTCDateTime()), column("reading_count")
+    ]
+    for metric in util.METRICS:
+        columns += [column(f"{metric}_sum"), column(f"{metric}_count")]
+    return table(name, *columns)
+
+
+def rollup_query(bucket: Any) -> Select[Any]:
+    """The aggregate's definition, for a bucket expression over weather_readings."""
+    metrics = []
+    for name in util.METRICS:
+        metric = getattr(WeatherReadingModel, name)
+        # Sums of the stored fixed-point units; readers scale them back.
+        metrics += [
+            func.sum(metric).label(f"{name}_sum"), func.count(metric).label(f"{name}_count")
+        ]
+    return (
+        select(
+            WeatherReadingModel.device_id,
+            bucket.label("bucket"),
+            func.count().label("reading_count"),
+            *metrics,
+        )
+        .group_by(WeatherReadingModel.device_id, literal_column("bucket"))
+    )
+
+
+def time_bucket(bucket_seconds: int) -> Any:
+    """
+    time_bucket with the bucket boundaries of util.bucket_expr. Every
+    bucket length divides a day, so Timescale's default origin (a local
+    midnight) gives the same boundaries as LOCAL_BUCKET_ORIGIN.
+    """
+    width: Any = literal_column(f"INTERVAL '{bucket_seconds} seconds'")
+    if util.is_local_bucket(bucket_seconds):
+        return func.time_bucket(width, WeatherReadingModel.recorded_at, settings.TIMEZONE_STR)
+    return func.time_bucket(width, WeatherReadingModel.recorded_at)
+
+
+def create_rollup_sql(granularity: WeatherGranularity) -> list[str]:
+    """DDL creating the continuous aggregate of a granularity, empty; refresh it afterwards."""
+    bucket_seconds = util.granularity_seconds(granularity)
+    name = view_name(granularity)
+    query = rollup_query(time_bucket(bucket_seconds)).compile(
+        dialect=postgresql.dialect(),  # type: ignore[no-untyped-call]
+        compile_kwargs={"literal_binds": True},
+    )
+    # Refresh what's older than a bucket every bucket (5 min to 1 h); the
+    # rest is aggregated from the table at query time (materialized_only).
+    every = min(max(bucket_seconds, 300), 3600)
+    comment = json.dumps(spec(bucket_seconds)).replace("'", "''")
+    return [
+        f"CREATE MATERIALIZED VIEW {name} "
+        "WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS "
+        f"{query} WITH NO DATA",
+        f"COMMENT ON VIEW {name} IS '{comment}'",
+        f"SELECT add_continuous_aggregate_policy('{name}', start_offset => NULL, "
+        f"end_offset => INTERVAL '{bucket_seconds} seconds', "
+        f"schedule_interval => INTERVAL '{every} seconds')",
+    ]
+
+
+async def find_rollups(conn: AsyncConnection) -> dict[str, dict[str, Any] | None]:
+    """
+    Continuous aggregates over weather_readings and what their comments
+    record (None: unreadable).
+    """
+    installed = text("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")
+    if (await conn.execute(installed)).first() is None:
+        return {}
+    found: dict[str, dict[str, Any] | None] = {}
+    for name, comment in (await conn.execute(_DETECT)).all():
+        try:
+            recorded = json.loads(comment or "")
+        except ValueError:
+            recorded = None
+        found[name] = recorded if isinstance(recorded, dict) else None
+    return found
+
+
+async def detect(engine: AsyncEngine) -> None:
+    """Find the continuous aggregates usable with the current settings."""
+    _rollups.clear()
+    if settings.is_sqlite or not settings.TIMESCALE_ROLLUPS:
+        return
+    try:
+        async with engine.connect() as conn:
+            found = await find_rollups(conn)
+    except DBAPIError:
+        logger.warning("TimescaleDB detection failed, aggregating from the table", exc_info=True)
+        return
+    for name, recorded in found.items():
+        if recorded is not None and recorded == spec(recorded.get("bucket_seconds", 0)):
+            _rollups[recorded["bucket_seconds"]] = rollup_table(name)
+    if _rollups:
+        logger.info("Aggregating whole buckets from continuous aggregates: %s", sorted(_rollups))
+
+
+def rollup_for(bucket_seconds: int) -> TableClause | None:
+    return _rollups.get(bucket_seconds)
@@ -0,0 +1,64 @@
+"""
+Column types that behave the same on every supported dialect.
+"""
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import DateTime, Integer, SmallInteger
+from sqlalchemy.engine import Dialect
+from sqlalchemy.types import TypeDecorator
+
+
+class UTCDateTime(TypeDecorator[datetime]):
+    """
+    timestamptz on PostgreSQL. SQLite has no time zones, so values are
+    stored as naive UTC (the form strftime('%s') and CURRENT_TIMESTAMP
+    use) and come back as aware UTC datetimes.
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value: datetime | None, dialect: Dialect) -> datetime | None:
+        if value is None or dialect.name != "sqlite":
+            return value
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        else:
+            # Naive values are local time, as asyncpg binds them.
+            value = value.astimezone().astimezone(timezone.utc)
+        return value.replace(tzinfo=None)
+
+    def process_result_value(self, value: Any, dialect: Dialect) -> datetime | None:
+        result: datetime | None = value
+        if result is None or dialect.name != "sqlite":
+            return result
+        return result.replace(tzinfo=timezone.utc)
+
+
+class ScaledInteger(TypeDecorator[float]):
+    """
+    A float stored as an integer in units of 1/scale, e.g. scale=100 keeps
+    hundredths: four bytes instead of eight, for values up to
+    2147483647 / scale.
+
+    Aggregates that return their argument's type (avg, min, max, sum) come
+    back scaled as well.
+    """
+    impl = Integer
+    cache_ok = True
+
+    def __init__(self, scale: int) -> None:
+        super().__init__()
+        self.scale = scale
+
+    def process_bind_param(self, value: float | None, dialect: Dialect) -> int | None:
+        return None if value is None else round(value * self.scale)
+
+    def process_result_value(self, value: Any, dialect: Dialect) -> float | None:
+        return None if value is None else float(value) / self.scale
+
+
+class ScaledSmallInteger(ScaledInteger):
+    """ScaledInteger in a smallint: two bytes, for values up to 32767 / scale."""
+    impl = SmallInteger
+    cache_ok = True
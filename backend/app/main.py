@@ -1,17 +1,46 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import AsyncIterator
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import settings
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from app.api.deps import use_workload
+from app.core.background import background_tasks
+from app.core.config import settings, Workload
+from app.core.events import ingest_bus
+from app.db import timescale
+import app.services.reading_buffer as reading_buffer
+from app.db.session import AsyncSessionLocal, dispose_engines, engine
 from app.api.endpoints import (devices, esp32_weather, 
                                health, api_keys, web_weather,
                                auth, users, settings as settings_router)
 
 
+if settings.INGEST_NOTIFY and not settings.is_sqlite:
+    # Hear about readings written by the other workers (cache invalidation).
+    background_tasks.register("ingest-listener", ingest_bus.listen)
+    background_tasks.register(
+        "reading-buffer-warmup", lambda: reading_buffer.warm(AsyncSessionLocal)
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Runs once per worker process. uvicorn has already drained in-flight
+    # requests (--timeout-graceful-shutdown) when the code after yield runs.
+    await timescale.detect(engine)
+    await background_tasks.start()
+    yield
+    await background_tasks.stop()
+    await dispose_engines()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=settings.openapi_url,
     docs_url=settings.docs_url,
-    redoc_url=settings.redoc_url
+    redoc_url=settings.redoc_url,
+    lifespan=lifespan,
 )
 
 # CORS
@@ -23,40 +52,79 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Database overload: a workload pool is exhausted or a query hit its
+# statement_timeout. Shed the request instead of returning a 500.
+STATEMENT_TIMEOUT_SQLSTATE = "57014"
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database is busy, retry later"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(DBAPIError)
+async def statement_timeout_handler(request: Request, exc: DBAPIError) -> JSONResponse:
+    if getattr(exc.orig, "sqlstate", None) != STATEMENT_TIMEOUT_SQLSTATE:
+        raise exc
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Query took too long, narrow the range or retry later"},
+        headers={"Retry-After": "5"},
+    )
+
+
 # Routers
-app.include_router(health.router, prefix="/health", tags=["health"])
+admin_workload = [Depends(use_workload(Workload.admin))]
+
+app.include_router(
+    health.router,
+    prefix="/health",
+    tags=["health"],
+    dependencies=admin_workload,
+)
 app.include_router(
     devices.router,
     prefix=f"{settings.API_V1_STR}/devices",
     tags=["devices"],
+    dependencies=admin_workload,
 )
 app.include_router(
     api_keys.router, 
     prefix=f"{settings.API_V1_STR}/api-keys", 
-    tags=["api-keys"]
+    tags=["api-keys"],
+    dependencies=admin_workload,
 )
 app.include_router(
     esp32_weather.router,
     prefix=f"{settings.API_V1_STR}/esp32", 
-    tags=["esp32-weather"]
+    tags=["esp32-weather"],
+    dependencies=[Depends(use_workload(Workload.display))],
 )
 app.include_router(
     web_weather.router,
     prefix=f"{settings.API_V1_STR}/weather",
-    tags=["web-weather"]
+    tags=["web-weather"],
+    dependencies=[Depends(use_workload(Workload.dashboard))],
 )
 app.include_router(
     auth.router,
     prefix=f"{settings.API_V1_STR}/auth",
-    tags=["auth"]
+    tags=["auth"],
+    dependencies=admin_workload,
 )
 app.include_router(
     users.router,
     prefix=f"{settings.API_V1_STR}/users",
-    tags=["users"]
+    tags=["users"],
+    dependencies=admin_workload,
 )
 app.include_router(
     settings_router.router,
     prefix=f"{settings.API_V1_STR}/settings",
-    tags=["settings"]
+    tags=["settings"],
+    dependencies=admin_workload,
 )
\ No newline at end of file
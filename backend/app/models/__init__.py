@@ -2,4 +2,6 @@ from .api_key import ApiKey
 from .device import Device
 from .user import User
 from .weather_reading import WeatherReading
-from .setting import Setting
\ No newline at end of file
+from .setting import Setting
+from .reading_chunk import ReadingChunk
+from .data_generation import DataGeneration
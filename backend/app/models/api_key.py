@@ -1,7 +1,8 @@
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime, ForeignKey, Boolean, func
+from sqlalchemy import String, ForeignKey, Boolean, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.db.types import UTCDateTime
 from app.models.device import Device
 
 
@@ -13,9 +14,9 @@ class ApiKey(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     device_id: Mapped[int] = mapped_column(ForeignKey("devices.id", ondelete="CASCADE"), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
-    last_used: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_used: Mapped[datetime | None] = mapped_column(UTCDateTime(), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), 
+        UTCDateTime(),
         server_default=func.now(),
         nullable=False
     )
@@ -0,0 +1,15 @@
+from sqlalchemy import Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class DataGeneration(Base):
+    """
+    A single row counting changes the newest reading id does not show:
+    purges, device edits and deletions (see app.services.data_generation).
+    """
+    __tablename__ = "data_generation"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    generation: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
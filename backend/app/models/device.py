@@ -1,9 +1,10 @@
 from datetime import datetime, timezone
 from enum import Enum
 from typing import TYPE_CHECKING, List
-from sqlalchemy import String, DateTime, Enum as SQLEnum, func
+from sqlalchemy import String, Enum as SQLEnum, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.db.types import UTCDateTime
 
 if TYPE_CHECKING:
     from app.models.api_key import ApiKey
@@ -32,16 +33,16 @@ class Device(Base):
     location: Mapped[str] = mapped_column(String(255), nullable=False)
     function: Mapped[DeviceFunction] = mapped_column(SQLEnum(DeviceFunction), nullable=False)
     last_seen: Mapped[datetime | None] = mapped_column(
-        DateTime(timezone=True), 
+        UTCDateTime(),
         nullable=True
     )
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), 
+        UTCDateTime(),
         server_default=func.now(),
         nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime(),
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, Integer, LargeBinary, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.db.types import UTCDateTime
+
+
+class ReadingChunk(Base):
+    """
+    Readings of one device over one closed window (a UTC day), packed into
+    compressed columns by app.services.reading_chunk.
+    """
+    __tablename__ = "reading_chunks"
+    __table_args__ = (
+        UniqueConstraint("device_id", "start_at", name="uq_reading_chunks_device_start"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    device_id: Mapped[int] = mapped_column(
+        ForeignKey("devices.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    # The window is [start_at, end_at).
+    start_at: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False)
+    end_at: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False)
+    reading_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
@@ -1,10 +1,11 @@
 from datetime import datetime
 from enum import Enum as PyEnum
 
-from sqlalchemy import String, Boolean, DateTime, Enum as SqlEnum, func
+from sqlalchemy import String, Boolean, Enum as SqlEnum, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
+from app.db.types import UTCDateTime
 
 class UserRole(str, PyEnum):
     ADMIN = "admin"
@@ -29,7 +30,7 @@ class User(Base):
         nullable=False,
     )
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime(),
         server_default=func.now(),
         nullable=False,
     )
\ No newline at end of file
@@ -1,8 +1,10 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
-from sqlalchemy import Float, DateTime, ForeignKey, Integer, func, Index
+from sqlalchemy import BigInteger, Computed, ForeignKey, Integer, column, func, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.db.types import ScaledInteger, ScaledSmallInteger, UTCDateTime
+from app.db.functions import epoch_minute
 
 if TYPE_CHECKING:
     from app.models.device import Device
@@ -12,34 +14,60 @@ class WeatherReading(Base):
     __tablename__ = "weather_readings"
     __table_args__ = (
         Index("ix_weather_readings_device_recorded", "device_id", "recorded_at"),
+        # A device's newest id (its data version) without scanning its readings.
+        Index("ix_weather_readings_device_id", "device_id", "id"),
+        # Covering on PostgreSQL: per-device aggregation reads everything it
+        # needs from the index (an index-only scan). SQLite has no INCLUDE.
+        Index(
+            "ix_weather_readings_device_minute",
+            "device_id",
+            "recorded_minute",
+            postgresql_include=[
+                "recorded_at", "temperature", "humidity", "pressure", "wind_speed", "rain_amount"
+            ],
+        ),
     )
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    # The primary key and the composite indexes above already cover lookups
+    # by id and by device_id, so neither gets an index of its own.
+    id: Mapped[int] = mapped_column(primary_key=True)
     device_id: Mapped[int] = mapped_column(
         ForeignKey("devices.id", ondelete="CASCADE"), 
-        nullable=False, 
-        index=True
+        nullable=False
     )
     
-    # Weather metrics
-    temperature: Mapped[float | None] = mapped_column(Float, nullable=True)  # Celsius
-    humidity: Mapped[float | None] = mapped_column(Float, nullable=True)  # Percentage 0-100
-    pressure: Mapped[float | None] = mapped_column(Float, nullable=True)  # hPa
-    wind_speed: Mapped[float | None] = mapped_column(Float, nullable=True)  # m/s
-    rain_amount: Mapped[float | None] = mapped_column(Float, nullable=True)  # mm
+    # Weather metrics, stored as integers in fixed-point units (2 or 4 bytes
+    # each instead of 8); the scale sets the resolution and the schema bounds
+    # keep values within range.
+    # Celsius, 0.01
+    temperature: Mapped[float | None] = mapped_column(ScaledSmallInteger(100), nullable=True)
+    # Percentage 0-100, 0.01
+    humidity: Mapped[float | None] = mapped_column(ScaledSmallInteger(100), nullable=True)
+    # hPa, 0.1
+    pressure: Mapped[float | None] = mapped_column(ScaledSmallInteger(10), nullable=True)
+    # m/s, 0.01; 4 bytes, the API never capped it
+    wind_speed: Mapped[float | None] = mapped_column(ScaledInteger(100), nullable=True)
+    # mm, 0.01; 4 bytes, the API never capped it
+    rain_amount: Mapped[float | None] = mapped_column(ScaledInteger(100), nullable=True)
     
     # Timestamps
     recorded_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime(),
         server_default=func.now(),
         nullable=False,
         index=True
     )
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime(),
         server_default=func.now(),
         nullable=False
     )
+    # Minutes since the epoch of recorded_at, kept by the database. Minute to
+    # hour buckets group on it, which an index can return in order.
+    recorded_minute: Mapped[int] = mapped_column(
+        BigInteger,
+        Computed(epoch_minute(column("recorded_at")), persisted=True),
+    )
     
     # Relationships
     device: Mapped["Device"] = relationship("Device", back_populates="weather_readings")
\ No newline at end of file
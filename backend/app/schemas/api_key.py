@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Sequence
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ApiKeyBase(BaseModel):
@@ -17,7 +17,12 @@ class ApiKeyInDB(ApiKeyBase):
     
     id: int
     is_active: bool
-    last_used: datetime | None
+    last_used: datetime | None = Field(
+        description=(
+            "Last authenticated request. Requests served from the auth cache don't "
+            "update it, so it can lag by up to API_KEY_CACHE_TTL_SECONDS (60 by default)"
+        ),
+    )
     created_at: datetime
 
 
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Sequence
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from app.models.device import DeviceType, DeviceStatus, DeviceFunction
 
 
@@ -23,7 +23,14 @@ class DeviceInDB(DeviceBase):
     model_config = ConfigDict(from_attributes=True)
     
     id: int
-    last_seen: datetime | None
+    last_seen: datetime | None = Field(
+        description=(
+            "Last request authenticated with one of the device's keys. Requests served "
+            "from the auth cache don't update it, so it can lag by up to "
+            "API_KEY_CACHE_TTL_SECONDS (60 by default); keep offline_threshold_seconds "
+            "above that"
+        ),
+    )
     created_at: datetime
     updated_at: datetime
 
@@ -15,11 +15,12 @@ class WeatherReadingBase(BaseModel):
     pressure: float | None = Field(
         None, ge=300, le=1500, description="Atmospheric pressure in hPa"
     )
+    # The most their 4-byte fixed-point columns hold.
     wind_speed: float | None = Field(
-        None, ge=0, description="Wind speed in m/s"
+        None, ge=0, le=21474836.47, description="Wind speed in m/s"
     )
     rain_amount: float | None = Field(
-        None, ge=0, description="Rain amount in mm"
+        None, ge=0, le=21474836.47, description="Rain amount in mm"
     )
 
 class WeatherGranularity(str, Enum):
@@ -33,6 +34,19 @@ class WeatherGranularity(str, Enum):
     six_hour = "6hour"
     day = "day"
 
+class Downsample(str, Enum):
+    """
+    Visual downsampling methods for chart series.
+    """
+    lttb = "lttb"
+
+class DisplayFormat(str, Enum):
+    """
+    Encodings of the display endpoints.
+    """
+    json = "json"
+    text = "text"
+
 class WeatherReadingCreate(WeatherReadingBase):
     """Schema for creating a weather reading from sensor."""
     recorded_at: datetime | None = Field(
@@ -59,6 +73,14 @@ class WeatherReadingWithLocation(WeatherReading):
     """Weather reading with device location info for displays."""
     device_location: str
 
+class MetricStats(BaseModel):
+    """Spread of one metric's readings within a bucket."""
+    min: float | None
+    max: float | None
+    p50: float | None
+    p95: float | None
+
+
 class WeatherReadingAggregate(WeatherReadingBase):
     """
     Query-time aggregated reading (bucketed).
@@ -66,6 +88,11 @@ class WeatherReadingAggregate(WeatherReadingBase):
     device_id: int | None = None
     recorded_at: datetime
     reading_count: int = Field(..., ge=0)
+    stats: dict[str, MetricStats] | None = Field(
+        None,
+        exclude_if=lambda v: v is None,
+        description="Per metric min, max, p50 and p95 (only with stats=true)",
+    )
 
 
 class WeatherReadingList(BaseModel):
@@ -74,12 +101,76 @@ class WeatherReadingList(BaseModel):
     total: int
     aggregated: bool = False
     granularity: WeatherGranularity | None = None
+    watermark: int | None = Field(
+        None, description="Pass as since= to get only what changed after this response"
+    )
 
 
 class LatestReadings(BaseModel):
     """Latest readings from all sensors for display boards."""
     readings: Sequence[WeatherReadingWithLocation]
     fetched_at: datetime
+    watermark: int | None = Field(
+        None, description="Pass as since= to get only sensors with newer readings"
+    )
+
+
+class MetricStatsSeries(BaseModel):
+    """MetricStats of one metric, one value per matrix timestamp."""
+    min: list[float | None]
+    max: list[float | None]
+    p50: list[float | None]
+    p95: list[float | None]
+
+
+class DeviceSeries(BaseModel):
+    """Aggregated metrics of one device, one value per matrix timestamp."""
+    device_id: int
+    temperature: list[float | None]
+    humidity: list[float | None]
+    pressure: list[float | None]
+    wind_speed: list[float | None]
+    rain_amount: list[float | None]
+    reading_count: list[int]
+    stats: dict[str, MetricStatsSeries] | None = Field(
+        None,
+        exclude_if=lambda v: v is None,
+        description="Per metric min, max, p50 and p95 (only with stats=true)",
+    )
+
+
+class WeatherSeriesMatrix(BaseModel):
+    """
+    Aggregated series of several devices on a shared time axis.
+
+    timestamps holds every bucket start with readings from any of the
+    devices; a device without readings in a bucket has null metrics and a
+    reading_count of 0 there.
+    """
+    granularity: WeatherGranularity
+    timestamps: list[datetime]
+    devices: list[DeviceSeries]
+
+
+class MetricPoints(BaseModel):
+    """Points kept for one metric."""
+    timestamps: list[datetime]
+    values: list[float]
+
+
+class DownsampledSeries(BaseModel):
+    """
+    Readings of one device reduced to at most `points` points per metric.
+
+    Each metric is reduced on its own, so their timestamps differ.
+    """
+    device_id: int
+    method: Downsample
+    points: int
+    source: WeatherGranularity | None = Field(
+        None, description="Bucket size of the input; null when it was the raw readings"
+    )
+    series: dict[str, MetricPoints]
 
 
 class WeatherSummary(BaseModel):
@@ -93,4 +184,19 @@ class WeatherSummary(BaseModel):
     avg_pressure: float | None
     reading_count: int
     period_start: datetime
-    period_end: datetime
\ No newline at end of file
+    period_end: datetime
+
+class DashboardSensor(BaseModel):
+    """Everything the dashboard shows for one sensor."""
+    device_id: int
+    latest: WeatherReadingWithLocation | None
+    summary: WeatherSummary | None
+    history: WeatherReadingList
+
+
+class Dashboard(BaseModel):
+    """Latest reading, summary and aggregated history of several sensors."""
+    sensors: Sequence[DashboardSensor]
+    start_time: datetime
+    end_time: datetime
+    summary_hours: int
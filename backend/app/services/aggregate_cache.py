@@ -0,0 +1,310 @@
+"""
+Cache of closed aggregation buckets for the history endpoints.
+
+A bucket that ended more than AGG_CACHE_GRACE_SECONDS ago only changes when
+a late reading lands in it or its device is deleted, and the ingest events
+for those evict exactly the affected buckets. A history request reads every
+closed bucket that lies fully inside its window from here, and fetches the
+rest (the partial bucket at the window start, the still open buckets at the
+end and any cache misses) in a single query.
+
+Entries are keyed by (device_id, or None for all devices; bucket seconds;
+bucket start as epoch seconds). A bucket fetched with stats=True also
+carries the per-metric min/max/percentiles and then serves both kinds of
+request. Least recently used entries are dropped
+once the estimated size passes AGG_CACHE_MAX_BYTES. Each worker process
+keeps its own cache, and only uses it while the ingest listener is
+connected: without it, late readings written through other workers would
+never evict their buckets.
+"""
+import sys
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.weather_reading as weather_service
+import app.utils.weather_reading as util
+from app.core.config import settings
+from app.core.events import IngestEvent, ingest_bus
+from app.schemas.weather_reading import MetricStats, WeatherGranularity, WeatherReadingAggregate
+
+BucketKey = tuple[int | None, int, int]
+# (temperature, humidity, pressure, wind_speed, rain_amount, reading_count),
+# followed by the util.METRICS x util.STATS values when fetched with stats,
+# or () for a closed bucket without readings.
+Bucket = tuple[Any, ...]
+_BASE_SIZE = 6
+
+# Hash table slot plus linked list node of an OrderedDict entry, roughly.
+_ENTRY_OVERHEAD = 100
+
+
+def _entry_bytes(key: BucketKey, value: Bucket) -> int:
+    return (
+        _ENTRY_OVERHEAD
+        + sys.getsizeof(key) + sum(sys.getsizeof(k) for k in key)
+        + sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    )
+
+
+class BucketCache:
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[BucketKey, tuple[Bucket, int]] = OrderedDict()
+        self._bytes = 0
+        self._bucket_sizes: set[int] = set()
+        # Bumped on every invalidation, so a query that raced with an ingest
+        # doesn't store what it read before the new reading was committed.
+        self._generations: defaultdict[int | None, int] = defaultdict(int)
+        self._resets = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and ingest_bus.listening
+
+    def generation(self, device_id: int | None) -> tuple[int, int]:
+        return self._resets, self._generations[device_id]
+
+    def get(
+        self, device_id: int | None, bucket_seconds: int, start: int, stats: bool = False
+    ) -> Bucket | None:
+        entry = self._data.get((device_id, bucket_seconds, start))
+        if entry is None or (stats and 0 < len(entry[0]) <= _BASE_SIZE):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end((device_id, bucket_seconds, start))
+        return entry[0]
+
+    def put(
+        self,
+        device_id: int | None,
+        bucket_seconds: int,
+        start: int,
+        value: Bucket,
+        generation: tuple[int, int],
+    ) -> None:
+        if not self.enabled or self.generation(device_id) != generation:
+            return
+        key = (device_id, bucket_seconds, start)
+        self._pop(key)
+        size = _entry_bytes(key, value)
+        self._data[key] = (value, size)
+        self._bytes += size
+        self._bucket_sizes.add(bucket_seconds)
+        while self._bytes > self.max_bytes and self._data:
+            _, (_, evicted) = self._data.popitem(last=False)
+            self._bytes -= evicted
+            self.evictions += 1
+
+    def invalidate(self, device_id: int, at: datetime | None) -> None:
+        """Drop the buckets of device_id (and of the all-devices series) covering at."""
+        self.invalidations += 1
+        self._generations[device_id] += 1
+        self._generations[None] += 1
+        if at is None:
+            for key in [k for k in self._data if k[0] in (device_id, None)]:
+                self._pop(key)
+            return
+        ts = at.timestamp()
+        for bucket_seconds in self._bucket_sizes:
+            start = util.bucket_floor(ts, bucket_seconds)
+            self._pop((device_id, bucket_seconds, start))
+            self._pop((None, bucket_seconds, start))
+
+    def clear(self) -> None:
+        self._resets += 1
+        self._data.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _pop(self, key: BucketKey) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+bucket_cache = BucketCache(settings.AGG_CACHE_MAX_BYTES)
+
+
+def _on_ingest(ingest_event: IngestEvent) -> None:
+    bucket_cache.invalidate(ingest_event.device_id, ingest_event.recorded_at)
+
+
+ingest_bus.subscribe(_on_ingest, bucket_cache.clear)
+
+
+def _at(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, timezone.utc)
+
+
+def closed_bucket_span(
+    start_time: datetime,
+    end_time: datetime,
+    bucket_seconds: int,
+    closed_before: float,
+) -> tuple[int, int]:
+    """
+    Starts [first, stop) of the buckets that lie fully inside
+    [start_time, end_time] and ended before closed_before (epoch seconds).
+    stop <= first means there are none.
+    """
+    first = util.bucket_floor(start_time.timestamp(), bucket_seconds)
+    if first < start_time.timestamp():
+        first = util.bucket_next(first, bucket_seconds)
+    last_end = min(end_time.timestamp(), closed_before)
+    stop = util.bucket_floor(last_end, bucket_seconds)
+    return first, stop
+
+
+def bucket_starts(first: int, stop: int, bucket_seconds: int) -> Iterator[int]:
+    """Starts of the buckets from first up to (excluding) stop."""
+    start = first
+    while start < stop:
+        yield start
+        start = util.bucket_next(start, bucket_seconds)
+
+
+def query_ranges(
+    start_time: datetime,
+    end_time: datetime,
+    first: int,
+    stop: int,
+    bucket_seconds: int,
+    missing: list[int],
+) -> list[tuple[datetime, datetime]]:
+    """Half-open ranges still to query, with adjacent ones merged."""
+    spans: list[list[datetime]] = []
+
+    def add(lo: datetime, hi: datetime) -> None:
+        if spans and spans[-1][1] == lo:
+            spans[-1][1] = hi
+        elif lo < hi:
+            spans.append([lo, hi])
+
+    add(start_time, _at(first))
+    for start in missing:
+        add(_at(start), _at(util.bucket_next(start, bucket_seconds)))
+    # end_time itself is included, like in the single window queries.
+    add(_at(stop), end_time + timedelta(microseconds=1))
+    return [(lo, hi) for lo, hi in spans]
+
+
+def _pack(aggregate: WeatherReadingAggregate) -> Bucket:
+    base = (
+        aggregate.temperature,
+        aggregate.humidity,
+        aggregate.pressure,
+        aggregate.wind_speed,
+        aggregate.rain_amount,
+        aggregate.reading_count,
+    )
+    if aggregate.stats is None:
+        return base
+    return base + tuple(
+        getattr(aggregate.stats[name], stat) for name in util.METRICS for stat in util.STATS
+    )
+
+
+def _unpack(
+    device_id: int | None, start: int, bucket: Bucket, stats: bool
+) -> WeatherReadingAggregate:
+    temperature, humidity, pressure, wind_speed, rain_amount, reading_count = bucket[:_BASE_SIZE]
+    spread = None
+    if stats:
+        values = iter(bucket[_BASE_SIZE:])
+        spread = {
+            name: MetricStats(**{stat: next(values) for stat in util.STATS})
+            for name in util.METRICS
+        }
+    return WeatherReadingAggregate(
+        device_id=device_id,
+        recorded_at=_at(start),
+        temperature=temperature,
+        humidity=humidity,
+        pressure=pressure,
+        wind_speed=wind_speed,
+        rain_amount=rain_amount,
+        reading_count=reading_count,
+        stats=spread,
+    )
+
+
+async def get_aggregated(
+    db: AsyncSession,
+    device_id: int | None,
+    start_time: datetime,
+    end_time: datetime,
+    granularity: WeatherGranularity | None,
+    auto_granularity: bool,
+    skip: int = 0,
+    limit: int = 100,
+    stats: bool = False,
+) -> tuple[list[WeatherReadingAggregate], WeatherGranularity]:
+    """
+    Same result as weather_service.get_aggregated_by_device (or
+    get_aggregated_all for device_id=None), with closed buckets served
+    from the cache.
+    """
+    start_time, end_time = util.as_aware(start_time), util.as_aware(end_time)
+    effective, bucket_seconds = util.effective_granularity(
+        start_time, end_time, granularity, auto_granularity
+    )
+    first, stop = closed_bucket_span(
+        start_time, end_time, bucket_seconds, time.time() - settings.AGG_CACHE_GRACE_SECONDS
+    )
+
+    if not bucket_cache.enabled or stop <= first:
+        if device_id is None:
+            return await weather_service.get_aggregated_all(
+                db, start_time, end_time, granularity, auto_granularity, skip, limit, stats
+            )
+        return await weather_service.get_aggregated_by_device(
+            db, device_id, start_time, end_time, granularity, auto_granularity, skip, limit, stats
+        )
+
+    generation = bucket_cache.generation(device_id)
+    cached: dict[int, Bucket] = {}
+    missing: list[int] = []
+    for start in bucket_starts(first, stop, bucket_seconds):
+        bucket = bucket_cache.get(device_id, bucket_seconds, start, stats)
+        if bucket is None:
+            missing.append(start)
+        else:
+            cached[start] = bucket
+
+    fetched = await weather_service.get_aggregated_ranges(
+        db,
+        bucket_seconds,
+        query_ranges(start_time, end_time, first, stop, bucket_seconds, missing),
+        device_id=device_id,
+        stats=stats,
+    )
+    by_start = {int(a.recorded_at.timestamp()): a for a in fetched}
+    for start in missing:
+        found = by_start.get(start)
+        bucket_cache.put(
+            device_id, bucket_seconds, start, _pack(found) if found else (), generation
+        )
+
+    series = fetched + [_unpack(device_id, start, b, stats) for start, b in cached.items() if b]
+    series.sort(key=lambda a: a.recorded_at)
+    limit = min(limit, util.MAX_SERIES_POINTS)
+    return series[skip:skip + limit], effective
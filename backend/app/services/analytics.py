@@ -0,0 +1,272 @@
+"""
+Embedded DuckDB engine for long-range aggregations (optional, see
+ANALYTICS_DIR).
+
+scripts.sync_analytics exports readings to Parquet files in ANALYTICS_DIR
+incrementally: each run appends the readings with ids past the last one it
+exported, written more than DELTA_WATERMARK_LAG_SECONDS ago, as new files.
+The first run also exports the packed and archived readings. Files are
+merged by level: MERGE_FANIN files of one level become one file of the
+next, sorted by recorded_at, so frequent syncs still leave few files.
+state.json lists the current files and how far the export got. It is
+replaced atomically, and merged-away files are deleted one run later, so a
+query that already listed them can still read them.
+
+weather_reading.get_aggregated_all hands windows of at least
+ANALYTICS_MIN_RANGE_DAYS to aggregate() up to the last synced bucket; the
+database covers the rest. The export only grows: readings of deleted
+devices are filtered out at query time, other deletions are not seen.
+Needs duckdb and pyarrow (uv sync --extra analytics).
+"""
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.reading_archive as archive_service
+import app.services.reading_chunk as chunk_service
+import app.utils.weather_reading as util
+from app.core.config import settings
+from app.models.reading_chunk import ReadingChunk
+from app.models.weather_reading import WeatherReading as WeatherReadingModel
+from app.services.reading_chunk import Readings, from_micros, to_micros
+
+try:
+    import duckdb
+    import pyarrow.parquet as pq
+except ImportError:  # the "analytics" extra
+    duckdb = pq = None  # type: ignore[assignment]
+
+STATE = "state.json"
+# Files of one level merged into one file of the next.
+MERGE_FANIN = 16
+# Readings per exported file.
+SYNC_BATCH = 200_000
+
+
+@dataclass(frozen=True)
+class State:
+    synced_id: int = 0
+    # Readings written before this, up to synced_id, are exported.
+    synced_at: datetime | None = None
+    files: tuple[str, ...] = ()
+    # Merged away, deleted by the next sync.
+    retired: tuple[str, ...] = ()
+
+
+_loaded: tuple[tuple[str, int], State] | None = None
+
+
+def enabled() -> bool:
+    if settings.ANALYTICS_DIR is None:
+        return False
+    if duckdb is None:
+        raise RuntimeError(
+            "ANALYTICS_DIR is set but duckdb is not installed: uv sync --extra analytics"
+        )
+    return True
+
+
+def _root() -> Path:
+    return Path(settings.ANALYTICS_DIR or "")
+
+
+def read_state() -> State:
+    global _loaded
+    path = _root() / STATE
+    try:
+        key = (str(path), path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return State()
+    if _loaded is None or _loaded[0] != key:
+        data = json.loads(path.read_text())
+        state = State(
+            synced_id=data["synced_id"],
+            synced_at=datetime.fromisoformat(data["synced_at"]) if data["synced_at"] else None,
+            files=tuple(data["files"]),
+            retired=tuple(data["retired"]),
+        )
+        _loaded = (key, state)
+    return _loaded[1]
+
+
+def write_state(state: State) -> None:
+    """Replace the state atomically, so readers see the old or the new one."""
+    path = _root() / STATE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({
+        "synced_id": state.synced_id,
+        "synced_at": state.synced_at.isoformat() if state.synced_at else None,
+        "files": list(state.files),
+        "retired": list(state.retired),
+    }, indent=1))
+    os.replace(tmp, path)
+
+
+def synced_until() -> datetime | None:
+    """Readings recorded before this are in the export, None before the first sync."""
+    state = read_state()
+    return state.synced_at if state.files else None
+
+
+def _quoted(names: Sequence[str]) -> str:
+    paths = (str(_root() / name).replace("'", "''") for name in names)
+    return "[" + ", ".join(f"'{path}'" for path in paths) + "]"
+
+
+def _write(level: int, readings: Readings) -> str:
+    name = f"L{level}-{time.time_ns()}.parquet"
+    tmp = _root() / f"{name}.tmp"
+    pq.write_table(archive_service.to_table(readings.by_time()), tmp, compression="zstd")
+    os.replace(tmp, _root() / name)
+    return name
+
+
+def _merge(files: list[str]) -> tuple[list[str], list[str]]:
+    """Merge full levels; returns the new file list and the files merged away."""
+    retired: list[str] = []
+    level = 0
+    while any(name.startswith(f"L{level}-") for name in files):
+        group = [name for name in files if name.startswith(f"L{level}-")]
+        if len(group) >= MERGE_FANIN:
+            name = f"L{level + 1}-{time.time_ns()}.parquet"
+            tmp = str(_root() / f"{name}.tmp").replace("'", "''")
+            # DuckDB streams the copy, so merging a large level doesn't load it into memory.
+            with duckdb.connect() as con:
+                con.execute(
+                    f"COPY (SELECT * FROM read_parquet({_quoted(group)}) ORDER BY recorded_at) "
+                    f"TO '{tmp}' (FORMAT parquet, COMPRESSION zstd)"
+                )
+            os.replace(_root() / f"{name}.tmp", _root() / name)
+            files = [f for f in files if f not in group] + [name]
+            retired += group
+        level += 1
+    return files, retired
+
+
+async def _cold_readings(db: AsyncSession) -> list[Readings]:
+    """Packed and archived readings, in batches of about SYNC_BATCH."""
+    batches: list[Readings] = []
+    pending: list[Readings] = []
+
+    def add(readings: Readings) -> None:
+        pending.append(readings)
+        if sum(len(r) for r in pending) >= SYNC_BATCH:
+            batches.append(Readings.concat(pending))
+            pending.clear()
+
+    chunk_ids = (
+        await db.execute(select(ReadingChunk.id).order_by(ReadingChunk.id))
+    ).scalars().all()
+    for chunk_id in chunk_ids:
+        chunk = await db.get(ReadingChunk, chunk_id)
+        if chunk is not None:
+            add(chunk_service.unpack(chunk.device_id, chunk.data))
+            db.expunge(chunk)
+    if archive_service.enabled():
+        for part in archive_service.read_manifest().parts:
+            add(archive_service.load([part.device_id], part.start_at, part.end_at)[0])
+    if pending:
+        batches.append(Readings.concat(pending))
+    return batches
+
+
+async def sync(db: AsyncSession) -> int:
+    """Export the readings written since the last sync; returns how many."""
+    _root().mkdir(parents=True, exist_ok=True)
+    state = read_state()
+    for name in state.retired:
+        (_root() / name).unlink(missing_ok=True)
+
+    files = list(state.files)
+    exported = 0
+    if state.synced_at is None:
+        for readings in await _cold_readings(db):
+            files.append(_write(0, readings))
+            exported += len(readings)
+
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.DELTA_WATERMARK_LAG_SECONDS)
+    synced_id = state.synced_id
+    while True:
+        stmt = (
+            select(*chunk_service.RAW_COLUMNS)
+            .where(WeatherReadingModel.id > synced_id, WeatherReadingModel.created_at < cutoff)
+            .order_by(WeatherReadingModel.id)
+            .limit(SYNC_BATCH)
+        )
+        readings = Readings.from_rows((await db.execute(stmt)).all())
+        if not len(readings):
+            break
+        files.append(_write(0, readings))
+        synced_id = int(np.max(readings.id))
+        exported += len(readings)
+
+    files, retired = _merge(files)
+    write_state(State(
+        synced_id=synced_id, synced_at=cutoff, files=tuple(files), retired=tuple(retired)
+    ))
+    return exported
+
+
+def aggregate(
+    bucket_seconds: int,
+    start: datetime,
+    end: datetime,
+    device_ids: Sequence[int],
+    stats: bool = False,
+) -> list[Any]:
+    """
+    Aggregate rows of the export over [start, end) and the given devices,
+    with the attributes and order of weather_reading._aggregate_stmt's rows.
+    Blocking: run it in a thread.
+    """
+    files = read_state().files
+    if not files:
+        return []
+    columns = [
+        *(f"avg({name}) AS {name}" for name in util.METRICS if name != "rain_amount"),
+        "coalesce(sum(rain_amount), 0.0) AS rain_amount",
+        "count(*) AS reading_count",
+    ]
+    if stats:
+        for name in util.METRICS:
+            columns += [
+                f"min({name}) AS {name}_min",
+                f"max({name}) AS {name}_max",
+                f"quantile_cont({name}, 0.5) AS {name}_p50",
+                f"quantile_cont({name}, 0.95) AS {name}_p95",
+            ]
+
+    with duckdb.connect() as con:
+        source = f"read_parquet({_quoted(files)}) r"
+        if util.is_local_bucket(bucket_seconds):
+            # Local buckets vary in length: match every reading to the last start before it.
+            starts = util.bucket_starts(start.timestamp(), end.timestamp(), bucket_seconds)
+            con.execute("CREATE TEMP TABLE buckets AS SELECT unnest(?::BIGINT[]) AS bucket", [
+                [s * 1_000_000 for s in starts]
+            ])
+            source += " ASOF JOIN buckets b ON epoch_us(r.recorded_at) >= b.bucket"
+            bucket = "b.bucket"
+        else:
+            step = bucket_seconds * 1_000_000
+            bucket = f"epoch_us(r.recorded_at) // {step} * {step}"
+        result = con.execute(
+            f"SELECT {bucket} AS bucket, {', '.join(columns)} FROM {source} "
+            "WHERE epoch_us(r.recorded_at) >= ? AND epoch_us(r.recorded_at) < ? "
+            "AND list_contains(?, r.device_id) GROUP BY 1 ORDER BY 1",
+            [to_micros(start), to_micros(end), list(device_ids)],
+        )
+        names = [d[0] for d in result.description]
+        rows = result.fetchall()
+
+    return [
+        SimpleNamespace(**{**dict(zip(names, row)), "bucket": from_micros(row[0])}) for row in rows
+    ]
@@ -6,11 +6,22 @@ from typing import Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from app.core.config import settings
+from app.core.events import AuthEvent, ingest_bus
 from app.models.api_key import ApiKey as ApiKeyModel
+from app.models.device import Device as DeviceModel
 from app.schemas.api_key import ApiKeyCreate, ApiKeyWithSecret
+from app.utils.cache import TTLCache
 
 API_KEY_HASH_SECRET = settings.API_KEY_HASH_SECRET
 
+# key_hash -> (validated key, its device) as transient read-only snapshots
+auth_cache: TTLCache[str, tuple[ApiKeyModel, DeviceModel]] = TTLCache(
+    ttl_seconds=settings.API_KEY_CACHE_TTL_SECONDS,
+    maxsize=4096,
+)
+# Bumped on every eviction (and reset), so a lookup that raced with one isn't cached.
+_evictions = 0
+
 def hash_key(key: str) -> str:
     return hmac.new(
         API_KEY_HASH_SECRET.encode("utf-8"),
@@ -84,6 +95,7 @@ async def revoke(db: AsyncSession, key_id: int) -> ApiKeyModel | None:
     
     api_key.is_active = False
     await db.flush()
+    await forget_key(db, api_key.key_hash)
     await db.refresh(api_key)
     return api_key
 
@@ -93,8 +105,10 @@ async def delete(db: AsyncSession, key_id: int) -> bool:
     if not api_key:
         return False
     
+    key_hash = api_key.key_hash
     await db.delete(api_key)
     await db.flush()
+    await forget_key(db, key_hash)
     return True
 
 async def update_last_used(db: AsyncSession, key_id: int) -> None:
@@ -104,6 +118,47 @@ async def update_last_used(db: AsyncSession, key_id: int) -> None:
         api_key.last_used = datetime.now(timezone.utc)
         await db.flush()
 
+def cache_enabled() -> bool:
+    """
+    Cached keys are only trusted while evictions reach this worker: through
+    the ingest listener, or on SQLite, which runs a single worker.
+    """
+    return settings.is_sqlite or ingest_bus.listening
+
+def cache_stamp() -> int:
+    return _evictions
+
+def lookup(key_hash: str) -> tuple[ApiKeyModel, DeviceModel] | None:
+    return auth_cache.get(key_hash) if cache_enabled() else None
+
+def remember(key_hash: str, entry: tuple[ApiKeyModel, DeviceModel], stamp: int) -> None:
+    """Cache a validated key unless an eviction happened since cache_stamp() returned stamp."""
+    if cache_enabled() and stamp == _evictions:
+        auth_cache.set(key_hash, entry)
+
+async def forget_key(db: AsyncSession, key_hash: str) -> None:
+    """Drop a key from every worker's auth cache once db's transaction commits."""
+    await ingest_bus.publish_auth(db, AuthEvent(key_hash=key_hash))
+
+async def forget_device(db: AsyncSession, device_id: int) -> None:
+    """Drop every cached key of a device, on every worker, once db's transaction commits."""
+    await ingest_bus.publish_auth(db, AuthEvent(device_id=device_id))
+
+def _on_auth(auth_event: AuthEvent) -> None:
+    global _evictions
+    _evictions += 1
+    if auth_event.key_hash is not None:
+        auth_cache.pop(auth_event.key_hash)
+    if auth_event.device_id is not None:
+        auth_cache.pop_where(lambda entry: entry[1].id == auth_event.device_id)
+
+def clear() -> None:
+    global _evictions
+    _evictions += 1
+    auth_cache.clear()
+
+ingest_bus.subscribe_auth(_on_auth, clear)
+
 async def count(db: AsyncSession) -> int:
     """Count total API keys."""
     stmt = select(func.count()).select_from(ApiKeyModel)
@@ -7,7 +7,17 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings  # you must define SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.events import AuthEvent, ingest_bus
 from app.models.user import User as UserModel
+from app.utils.cache import TTLCache, orm_snapshot
+
+# user id -> user loaded by a previous request (transient, read-only snapshot)
+user_cache: TTLCache[int, UserModel] = TTLCache(
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    maxsize=1024,
+)
+# Bumped on every eviction (and reset), so a lookup that raced with one isn't cached.
+_evictions = 0
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
@@ -44,6 +54,49 @@ async def authenticate_user(
     return user
 
 
+async def get_user_cached(db: AsyncSession, user_id: int) -> UserModel | None:
+    """
+    Load a user for token validation, reusing recent lookups.
+
+    Returns a snapshot, and ends the lookup transaction so the connection is
+    back in the pool before the endpoint opens its own session. Like the
+    API key cache, it is only used while evictions reach this worker.
+    """
+    enabled = settings.is_sqlite or ingest_bus.listening
+    user = user_cache.get(user_id) if enabled else None
+    if user is None:
+        stamp = _evictions
+        loaded = await db.get(UserModel, user_id)
+        if loaded is None:
+            return None
+        user = orm_snapshot(loaded)
+        await db.rollback()
+        if enabled and stamp == _evictions:
+            user_cache.set(user_id, user)
+    return user
+
+
+async def forget_user(db: AsyncSession, user_id: int) -> None:
+    """Drop a user from every worker's token validation cache once db's transaction commits."""
+    await ingest_bus.publish_auth(db, AuthEvent(user_id=user_id))
+
+
+def _on_auth(auth_event: AuthEvent) -> None:
+    global _evictions
+    if auth_event.user_id is not None:
+        _evictions += 1
+        user_cache.pop(auth_event.user_id)
+
+
+def clear() -> None:
+    global _evictions
+    _evictions += 1
+    user_cache.clear()
+
+
+ingest_bus.subscribe_auth(_on_auth, clear)
+
+
 def create_access_token(
     subject: str | int,
     expires_delta: Optional[timedelta] = None,
@@ -0,0 +1,107 @@
+"""
+Composite dashboard: latest reading, summary and aggregated history of
+several sensors in one response.
+
+The sub-queries don't depend on each other, so they run concurrently on
+separate pooled sessions (app.db.session.run_concurrently) and the response
+takes about as long as the slowest of them rather than their sum.
+"""
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.aggregate_cache as aggregate_cache
+import app.services.weather_reading as weather_service
+from app.db.session import run_concurrently
+from app.schemas.weather_reading import (
+    Dashboard,
+    DashboardSensor,
+    WeatherGranularity,
+    WeatherReadingList,
+    WeatherSummary,
+)
+from app.utils.weather_reading import MAX_SERIES_POINTS
+
+Job = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def _latest(device_id: int) -> Job:
+    return lambda db: weather_service.get_latest_by_device(db, device_id)
+
+
+def _summary(device_id: int, hours: int) -> Job:
+    async def job(db: AsyncSession) -> WeatherSummary | None:
+        try:
+            return await weather_service.get_summary_by_device(db, device_id, hours)
+        except weather_service.NoReadingsFoundError:
+            return None
+
+    return job
+
+
+def _history(
+    device_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    granularity: WeatherGranularity | None,
+    auto_granularity: bool,
+) -> Job:
+    async def job(db: AsyncSession) -> WeatherReadingList:
+        readings, effective = await aggregate_cache.get_aggregated(
+            db,
+            device_id=device_id,
+            start_time=start_time,
+            end_time=end_time,
+            granularity=granularity,
+            auto_granularity=auto_granularity,
+            limit=MAX_SERIES_POINTS,
+        )
+        return WeatherReadingList(
+            readings=readings, total=len(readings), aggregated=True, granularity=effective
+        )
+
+    return job
+
+
+async def get_dashboard(
+    session_factory: Callable[[], AsyncSession],
+    device_ids: Sequence[int] | None,
+    start_time: datetime,
+    end_time: datetime,
+    granularity: WeatherGranularity | None,
+    auto_granularity: bool,
+    hours: int = 24,
+) -> Dashboard:
+    """
+    Dashboard for device_ids, or for every sensor device when None.
+
+    Raises weather_service.DeviceNotFoundError for an unknown device.
+    """
+    if device_ids is None:
+        async with session_factory() as db:
+            device_ids = [d.id for d in await weather_service.get_sensor_devices(db)]
+
+    jobs: list[Job] = []
+    for device_id in device_ids:
+        jobs += [
+            _latest(device_id),
+            _summary(device_id, hours),
+            _history(device_id, start_time, end_time, granularity, auto_granularity),
+        ]
+    results = await run_concurrently(session_factory, jobs)
+
+    return Dashboard(
+        sensors=[
+            DashboardSensor(
+                device_id=device_id,
+                latest=results[3 * i],
+                summary=results[3 * i + 1],
+                history=results[3 * i + 2],
+            )
+            for i, device_id in enumerate(device_ids)
+        ],
+        start_time=start_time,
+        end_time=end_time,
+        summary_hours=hours,
+    )
@@ -0,0 +1,39 @@
+"""
+The data generation: a counter in the database bumped by every change the
+newest reading id does not reflect (a purge, a device edited or deleted).
+app.services.data_version caches it next to the reading versions.
+"""
+from typing import Iterable
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.events import IngestEvent, ingest_bus
+from app.models.data_generation import DataGeneration
+
+_ROW_ID = 1
+
+
+async def get(db: AsyncSession) -> int:
+    """Current generation, 0 before the first bump."""
+    stmt = select(DataGeneration.generation).where(DataGeneration.id == _ROW_ID)
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none() or 0
+
+
+async def bump(db: AsyncSession, device_ids: Iterable[int]) -> None:
+    """
+    Count a change to the given devices in db's transaction, and queue the
+    removal events that make every worker drop what it derived from them.
+    """
+    stmt = (
+        update(DataGeneration)
+        .where(DataGeneration.id == _ROW_ID)
+        .values(generation=DataGeneration.generation + 1)
+    )
+    result = await db.execute(stmt)
+    if result.rowcount == 0:  # type: ignore[attr-defined]
+        db.add(DataGeneration(id=_ROW_ID, generation=1))
+        await db.flush()
+    for device_id in device_ids:
+        await ingest_bus.publish(db, IngestEvent(device_id))
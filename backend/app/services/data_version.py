@@ -0,0 +1,102 @@
+"""
+Data versions behind the ETags of the weather read endpoints.
+
+A device's version is the id of its newest reading, and the all-devices
+version is the newest reading id overall. Every worker therefore derives
+the same value, and ETags stay valid across workers and restarts. Versions
+are read from the database on first use and then kept current by ingest
+events, so checking one usually costs no query. That relies on the
+ingest listener, through which this worker hears about readings written
+by the others; while it is not connected every lookup reads the database.
+
+Purges and device edits or deletions don't move these versions, so they
+bump the data generation (app.services.data_generation) instead, which
+endpoints fold into their ETags and cache keys. It is cached the same way;
+the removal events that come with every bump make the next lookup read it
+(and the versions) from the database again.
+"""
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.data_generation as generation_service
+import app.services.weather_reading as weather_service
+from app.core.events import IngestEvent, ingest_bus
+
+_versions: dict[int | None, int] = {}
+_generation: int | None = None
+# Bumped on every event, so a lookup that raced with one isn't stored.
+_changes = 0
+
+
+def _on_ingest(ingest_event: IngestEvent) -> None:
+    global _changes, _generation
+    _changes += 1
+    if ingest_event.reading_id is None:
+        _generation = None
+    for key in (ingest_event.device_id, None):
+        if ingest_event.reading_id is None:
+            _versions.pop(key, None)
+        elif key in _versions:
+            _versions[key] = max(_versions[key], ingest_event.reading_id)
+
+
+def clear() -> None:
+    global _changes, _generation
+    _changes += 1
+    _versions.clear()
+    _generation = None
+
+
+ingest_bus.subscribe(_on_ingest, clear)
+
+
+async def get(db: AsyncSession, device_id: int | None = None) -> int:
+    """Current data version of a device, or of all devices for None."""
+    version = _versions.get(device_id)
+    if version is not None:
+        return version
+    changes = _changes
+    version = await weather_service.get_latest_id(db, device_id)
+    if changes == _changes and ingest_bus.listening:
+        _versions[device_id] = version
+    return version
+
+
+async def generation(db: AsyncSession) -> int:
+    """Current data generation, for ETags and cache keys next to a version."""
+    global _generation
+    if _generation is not None:
+        return _generation
+    changes = _changes
+    current = await generation_service.get(db)
+    if changes == _changes and ingest_bus.listening:
+        _generation = current
+    return current
+
+
+async def wait_newer(
+    db: AsyncSession,
+    than: int,
+    timeout: float,
+    device_id: int | None = None,
+) -> int:
+    """
+    Wait until the version passes `than` or timeout seconds have gone by,
+    and return the current version.
+
+    The session's connection is handed back to the pool while waiting.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    version = await get(db, device_id)
+    while version <= than:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        await db.close()
+        # Without the listener, readings from other workers never wake us:
+        # look at the database every second instead.
+        await ingest_bus.wait(remaining if ingest_bus.listening else min(remaining, 1.0))
+        version = await get(db, device_id)
+    return version
@@ -5,6 +5,8 @@ from sqlalchemy import select, func
 from app.models.device import Device as DeviceModel, DeviceStatus
 from app.models.setting import Setting as SettingModel
 from app.schemas.device import DeviceCreate, DeviceUpdate, Device as DeviceSchema
+import app.services.api_key as api_key_service
+import app.services.data_generation as generation_service
 
 DEFAULT_OFFLINE_THRESHOLD_SECONDS = 300
 
@@ -89,6 +91,9 @@ async def update(
         setattr(device, field, value)
     
     await db.flush()
+    await api_key_service.forget_device(db, device_id)
+    # Readings are served with the device's location
+    await generation_service.bump(db, [device_id])
     await db.refresh(device)
     return await to_response(db, device)
 
@@ -111,6 +116,9 @@ async def delete(db: AsyncSession, device_id: int) -> bool:
     
     await db.delete(device)
     await db.flush()
+    await api_key_service.forget_device(db, device_id)
+    # Its readings go with it (ON DELETE CASCADE)
+    await generation_service.bump(db, [device_id])
     return True
 
 async def count(db: AsyncSession) -> int:
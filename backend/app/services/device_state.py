@@ -0,0 +1,147 @@
+"""
+Per-device in-memory state kept current by ingest events, shared by
+app.services.reading_buffer and app.services.sliding_summary.
+
+A device's state is built from the database on first use and then fed
+as readings arrive: readings written through this worker are added when
+their transaction commits (see stage), readings written by the others are
+marked pending by their ingest event and fetched by id on the next read,
+and removals drop the state. States are only used while the ingest
+listener is connected, since otherwise other workers' readings would go
+unseen.
+"""
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Generic, Protocol, Sequence, TypeVar
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.events import IngestEvent, ingest_bus
+from app.models.weather_reading import WeatherReading as WeatherReadingModel
+from app.schemas.weather_reading import WeatherReading as WeatherReadingSchema
+from app.services.reading_chunk import to_micros
+
+_STAGED_KEY = "committed_readings"
+
+
+class DeviceState(Protocol):
+    # Ids of readings other workers wrote that are not fetched yet.
+    pending: set[int]
+
+    def __len__(self) -> int: ...
+
+    def holds(self, recorded_at: int) -> bool:
+        """Whether a reading recorded then (µs) belongs in the state."""
+        ...
+
+    def add_rows(self, rows: Sequence[Any]) -> bool:
+        """Add readings (rows of the tracker's columns); False drops the state."""
+        ...
+
+
+_State = TypeVar("_State", bound=DeviceState)
+
+
+class DeviceStates(Generic[_State]):
+    """The states of every device this worker has one for, and their counters."""
+
+    def __init__(self, columns: Sequence[Any]) -> None:
+        # What add_rows gets for readings fetched by id.
+        self.columns = columns
+        self._states: dict[int, _State] = {}
+        # Bumped on every event (and reset), so a load that raced with one isn't kept.
+        self._generations: defaultdict[int, int] = defaultdict(int)
+        self._resets = 0
+        self.counters = {"hits": 0, "misses": 0, "loads": 0, "fetched": 0}
+        _trackers.append(self)
+        ingest_bus.subscribe(self._on_ingest, self.clear)
+
+    def get(self, device_id: int) -> _State | None:
+        return self._states.get(device_id)
+
+    def discard(self, device_id: int) -> None:
+        self._states.pop(device_id, None)
+
+    def stamp(self, device_id: int) -> tuple[int, int]:
+        return self._resets, self._generations[device_id]
+
+    def put(self, device_id: int, state: _State, stamp: tuple[int, int]) -> None:
+        """Keep a state loaded as of stamp, unless an event came in since."""
+        if stamp == self.stamp(device_id):
+            self._states[device_id] = state
+
+    async def load(self, device_id: int, build: Callable[[], Awaitable[_State]]) -> _State:
+        stamp = self.stamp(device_id)
+        state = await build()
+        self.counters["loads"] += 1
+        self.put(device_id, state, stamp)
+        return state
+
+    async def catch_up(self, db: AsyncSession, device_id: int, state: _State) -> _State | None:
+        """
+        Add the readings other workers wrote since the state was last read;
+        None if that dropped it.
+        """
+        ids = list(state.pending)
+        state.pending.difference_update(ids)
+        self.counters["fetched"] += len(ids)
+        stmt = select(*self.columns).where(WeatherReadingModel.id.in_(ids))
+        if state.add_rows((await db.execute(stmt)).all()):
+            return state
+        self.discard(device_id)
+        return None
+
+    def clear(self) -> None:
+        self._resets += 1
+        self._states.clear()
+
+    def stats(self) -> dict[str, int]:
+        readings = sum(len(s) for s in self._states.values())
+        return self.counters | {"devices": len(self._states), "readings": readings}
+
+    def _on_ingest(self, ingest_event: IngestEvent) -> None:
+        self._generations[ingest_event.device_id] += 1
+        state = self._states.get(ingest_event.device_id)
+        if state is None:
+            return
+        if ingest_event.reading_id is None:
+            del self._states[ingest_event.device_id]
+        elif ingest_event.recorded_at is None or state.holds(to_micros(ingest_event.recorded_at)):
+            state.pending.add(ingest_event.reading_id)
+
+    def _add_committed(self, staged: Sequence[WeatherReadingSchema]) -> None:
+        # Runs after the ingest events of these readings were dispatched, which
+        # marked them pending for the devices that have state; a state loaded
+        # since already holds them.
+        for device_id in {r.device_id for r in staged}:
+            state = self._states.get(device_id)
+            if state is None:
+                continue
+            rows = [r for r in staged if r.device_id == device_id and r.id in state.pending]
+            if not rows:
+                continue
+            state.pending.difference_update(r.id for r in rows)
+            if not state.add_rows(rows):
+                del self._states[device_id]
+
+
+_trackers: list[DeviceStates[Any]] = []
+
+
+def stage(db: AsyncSession, reading: WeatherReadingSchema) -> None:
+    """Add a reading written in db's transaction to the device states once that commits."""
+    db.sync_session.info.setdefault(_STAGED_KEY, []).append(reading)
+
+
+@event.listens_for(Session, "after_commit")
+def _add_committed(session: Session) -> None:
+    staged = session.info.pop(_STAGED_KEY, ())
+    if staged:
+        for tracker in _trackers:
+            tracker._add_committed(staged)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_STAGED_KEY, None)
@@ -0,0 +1,83 @@
+"""
+Chart series reduced to a fixed number of points with LTTB (app.utils.lttb).
+
+The input is the raw readings of the window when there are at most
+DOWNSAMPLE_MAX_SOURCE_POINTS of them, otherwise the finest aggregation
+that stays within that many buckets.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Any, Sequence
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.weather_reading as weather_service
+import app.utils.weather_reading as util
+from app.core.config import settings
+from app.schemas.weather_reading import (
+    Downsample,
+    DownsampledSeries,
+    MetricPoints,
+    WeatherGranularity,
+)
+from app.utils.lttb import lttb
+
+
+async def _source_rows(
+    db: AsyncSession,
+    device_id: int,
+    start_time: datetime,
+    end_time: datetime,
+) -> tuple[Sequence[Any], WeatherGranularity | None]:
+    """Rows with recorded_at and one attribute per metric, by time."""
+    raw_count = await weather_service.count(
+        db, device_id=device_id, start_time=start_time, end_time=end_time
+    )
+    if raw_count <= settings.DOWNSAMPLE_MAX_SOURCE_POINTS:
+        rows = await weather_service.get_window_rows(db, device_id, start_time, end_time)
+        return rows, None
+
+    range_seconds = (end_time - start_time).total_seconds()
+    source, bucket_seconds = util.pick_supported_bucket_seconds(
+        math.ceil(range_seconds / settings.DOWNSAMPLE_MAX_SOURCE_POINTS)
+    )
+    # end_time is inclusive; timestamps have microsecond resolution.
+    window_end = end_time + timedelta(microseconds=1)
+    aggregates = await weather_service.get_aggregated_ranges(
+        db, bucket_seconds, [(start_time, window_end)], device_id=device_id
+    )
+    return aggregates, source
+
+
+def _reduce(rows: Sequence[Any], name: str, points: int) -> MetricPoints:
+    present = [
+        (row.recorded_at, value) for row in rows if (value := getattr(row, name)) is not None
+    ]
+    if not present:
+        return MetricPoints(timestamps=[], values=[])
+    x = np.fromiter((t.timestamp() for t, _ in present), dtype=np.float64, count=len(present))
+    y = np.fromiter((v for _, v in present), dtype=np.float64, count=len(present))
+    keep = lttb(x, y, points)
+    return MetricPoints(
+        timestamps=[present[i][0] for i in keep],
+        values=y[keep].tolist(),
+    )
+
+
+async def get_downsampled(
+    db: AsyncSession,
+    device_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    points: int,
+) -> DownsampledSeries:
+    """Every metric of a device over the window, reduced to at most `points` points."""
+    rows, source = await _source_rows(db, device_id, start_time, end_time)
+    return DownsampledSeries(
+        device_id=device_id,
+        method=Downsample.lttb,
+        points=points,
+        source=source,
+        series={name: _reduce(rows, name, points) for name in util.METRICS},
+    )
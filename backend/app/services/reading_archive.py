@@ -0,0 +1,272 @@
+"""
+Cold archive of old readings in Parquet files (optional, see ARCHIVE_DIR).
+
+scripts.archive_readings moves the readings of every UTC day older than
+ARCHIVE_AFTER_DAYS out of the database, raw rows and chunks alike, into
+ARCHIVE_DIR/device_id=<id>/month=<YYYY-MM>/<part>.parquet: one part per
+device and month a run moved readings for. manifest.json lists every part
+with its device, time range and row count, and archived_before, the end of
+what has been archived. Readers open only the parts overlapping a query,
+memory-mapped, and push the time range down to the row groups.
+
+A reading that arrives for an archived day stays in the database until
+the next run moves it. Needs pyarrow (uv sync --extra archive).
+"""
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.reading_chunk as chunk_service
+import app.utils.weather_reading as util
+from app.core.config import settings
+from app.models.reading_chunk import ReadingChunk
+from app.services.reading_chunk import Readings, from_micros
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # the "archive" extra
+    pa = pq = None
+
+MANIFEST = "manifest.json"
+
+
+@dataclass(frozen=True)
+class Part:
+    """One Parquet file: readings of a device with start_at <= recorded_at < end_at."""
+    path: str
+    device_id: int
+    start_at: datetime
+    end_at: datetime
+    rows: int
+
+
+@dataclass(frozen=True)
+class Manifest:
+    archived_before: datetime | None
+    parts: tuple[Part, ...]
+
+
+_EMPTY = Manifest(archived_before=None, parts=())
+# Manifest as last read, by (path, mtime): the archive job replaces it atomically.
+_loaded: tuple[tuple[str, int], Manifest] | None = None
+
+
+def enabled() -> bool:
+    if settings.ARCHIVE_DIR is None:
+        return False
+    if pq is None:
+        raise RuntimeError(
+            "ARCHIVE_DIR is set but pyarrow is not installed: uv sync --extra archive"
+        )
+    return True
+
+
+def _root() -> Path:
+    return Path(settings.ARCHIVE_DIR or "")
+
+
+def read_manifest() -> Manifest:
+    global _loaded
+    path = _root() / MANIFEST
+    try:
+        key = (str(path), path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return _EMPTY
+    if _loaded is None or _loaded[0] != key:
+        data = json.loads(path.read_text())
+        archived_before = data["archived_before"]
+        manifest = Manifest(
+            archived_before=datetime.fromisoformat(archived_before) if archived_before else None,
+            parts=tuple(
+                Part(
+                    path=p["path"],
+                    device_id=p["device_id"],
+                    start_at=datetime.fromisoformat(p["start_at"]),
+                    end_at=datetime.fromisoformat(p["end_at"]),
+                    rows=p["rows"],
+                )
+                for p in data["parts"]
+            ),
+        )
+        _loaded = (key, manifest)
+    return _loaded[1]
+
+
+def write_manifest(manifest: Manifest) -> None:
+    """Replace the manifest atomically, so readers see the old or the new one."""
+    def encode(value: Any) -> Any:
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    data = {
+        "archived_before": encode(manifest.archived_before),
+        "parts": [{k: encode(v) for k, v in asdict(part).items()} for part in manifest.parts],
+    }
+    path = _root() / MANIFEST
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, indent=1))
+    os.replace(tmp, path)
+
+
+def _overlapping(device_ids: Sequence[int] | None, start: datetime, end: datetime) -> list[Part]:
+    return [
+        part for part in read_manifest().parts
+        if part.start_at < end and part.end_at > start
+        and (device_ids is None or part.device_id in device_ids)
+    ]
+
+
+def to_table(readings: Readings) -> Any:
+    """Readings as an Arrow table in the archive's schema; NaN metrics become nulls."""
+    timestamp = pa.timestamp("us", tz="UTC")
+    return pa.table({
+        "id": pa.array(readings.id, pa.int64()),
+        "device_id": pa.array(readings.device_id, pa.int32()),
+        "recorded_at": pa.array(readings.recorded_at, pa.int64()).cast(timestamp),
+        "created_at": pa.array(readings.created_at, pa.int64()).cast(timestamp),
+        **{
+            name: pa.array(readings.metrics[name], pa.float64(), from_pandas=True)
+            for name in util.METRICS
+        },
+    })
+
+
+def from_table(table: Any) -> Readings:
+    def micros(name: str) -> Any:
+        return table[name].cast(pa.int64()).to_numpy()
+
+    return Readings(
+        device_id=table["device_id"].to_numpy().astype(np.int64),
+        id=table["id"].to_numpy(),
+        recorded_at=micros("recorded_at"),
+        created_at=micros("created_at"),
+        # Nulls come back as NaN.
+        metrics={name: table[name].to_numpy(zero_copy_only=False) for name in util.METRICS},
+    )
+
+
+def _read(part: Part, start: datetime, end: datetime) -> Readings:
+    return from_table(pq.read_table(
+        _root() / part.path,
+        memory_map=True,
+        filters=[("recorded_at", ">=", start), ("recorded_at", "<", end)],
+    ))
+
+
+def load(
+    device_ids: Sequence[int] | None,
+    start: datetime,
+    end: datetime,
+) -> tuple[Readings, datetime | None]:
+    """
+    Archived readings of the devices (None: all) with start <= recorded_at
+    < end, and archived_before (None when no part overlaps the range).
+    """
+    parts = _overlapping(device_ids, start, end)
+    if not parts:
+        return Readings.empty(), None
+    readings = Readings.concat([_read(part, start, end) for part in parts])
+    return readings, read_manifest().archived_before
+
+
+def count(
+    device_ids: Sequence[int] | None, start: datetime, end: datetime, since: int | None = None
+) -> int:
+    """How many archived readings load would return, plus the since filter (id > since)."""
+    total = 0
+    for part in _overlapping(device_ids, start, end):
+        if since is None and part.start_at >= start and part.end_at <= end:
+            total += part.rows
+        else:
+            ids = _read(part, start, end).id
+            total += len(ids) if since is None else int((ids > since).sum())
+    return total
+
+
+def latest(device_id: int) -> dict[str, Any] | None:
+    """Newest archived reading of a device, keyed like the weather_readings columns."""
+    parts = [part for part in read_manifest().parts if part.device_id == device_id]
+    if not parts:
+        return None
+    newest = max(parts, key=lambda part: part.end_at)
+    readings = _read(newest, newest.start_at, newest.end_at).by_time()
+    return readings.take(np.array([len(readings) - 1])).to_dicts()[0]
+
+
+def month_start(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value: datetime) -> datetime:
+    return month_start(month_start(value) + timedelta(days=32))
+
+
+def write_part(device_id: int, readings: Readings) -> Part:
+    """Write the readings of one device and month as a new part; not yet in the manifest."""
+    readings = readings.by_time()
+    first = from_micros(readings.recorded_at[0])
+    relative = Path(f"device_id={device_id}", f"month={first:%Y-%m}", f"{time.time_ns()}.parquet")
+    path = _root() / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(to_table(readings), tmp, compression="zstd")
+    os.replace(tmp, path)
+    return Part(
+        path=relative.as_posix(),
+        device_id=device_id,
+        start_at=first,
+        end_at=from_micros(readings.recorded_at[-1] + 1),
+        rows=len(readings),
+    )
+
+
+def remove_part(part: Part) -> None:
+    (_root() / part.path).unlink(missing_ok=True)
+
+
+async def months_before(db: AsyncSession, cutoff: datetime) -> list[tuple[int, datetime]]:
+    """
+    (device_id, month start) of every month with readings recorded before
+    cutoff, a UTC midnight, still in the database as raw rows or chunks.
+    """
+    days = await chunk_service.closed_windows(db, cutoff)
+    chunks = (await db.execute(
+        select(ReadingChunk.device_id, ReadingChunk.start_at).where(ReadingChunk.start_at < cutoff)
+    )).all()
+    return sorted({(device_id, month_start(start)) for device_id, start in [*days, *chunks]})
+
+
+async def move_month(
+    db: AsyncSession, device_id: int, month: datetime, cutoff: datetime
+) -> Part | None:
+    """
+    Delete a device's readings of a month (up to cutoff) from the database
+    and write them as a new part. The caller adds the part to the manifest
+    and commits.
+    """
+    end = min(next_month(month), cutoff)
+    raw = await chunk_service.take_raw(db, device_id, month, end)
+    chunks = (await db.execute(
+        select(ReadingChunk).where(
+            ReadingChunk.device_id == device_id,
+            ReadingChunk.start_at >= month,
+            ReadingChunk.start_at < end,
+        )
+    )).scalars().all()
+    packed = [chunk_service.unpack(device_id, chunk.data) for chunk in chunks]
+    for chunk in chunks:
+        await db.delete(chunk)
+    await db.flush()
+
+    readings = Readings.concat([raw, *packed])
+    if not len(readings):
+        return None
+    return write_part(device_id, readings)
@@ -0,0 +1,225 @@
+"""
+Recent readings of every device in memory (see RECENT_BUFFER_HOURS).
+
+Each worker keeps, per device, the readings of the last
+RECENT_BUFFER_HOURS in a ring of NumPy columns. The latest reading,
+summaries and aggregations within that span are computed from it with
+app.services.reading_chunk instead of the database; older ranges read the
+database as before.
+
+A device's ring is loaded from the database on first use (and for every
+sensor by warm() at startup) and kept current as app.services.device_state
+describes.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Sequence, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.utils.weather_reading as util
+from app.core.config import settings
+from app.core.events import ingest_bus
+from app.models.device import Device as DeviceModel
+from app.models.device import DeviceFunction
+from app.models.weather_reading import WeatherReading as WeatherReadingModel
+from app.schemas.weather_reading import WeatherReading as WeatherReadingSchema
+from app.services.device_state import DeviceStates
+from app.services.reading_chunk import RAW_COLUMNS, Readings, from_micros, to_micros
+
+logger = logging.getLogger(__name__)
+
+_MIN_CAPACITY = 64
+_INT_COLUMNS = ("id", "recorded_at", "created_at")
+_Scalar = TypeVar("_Scalar", bound=np.generic)
+
+
+class Ring:
+    """
+    One device's readings since `since` (µs) in arrival order, as circular
+    NumPy columns that double in size when full. Readings other workers
+    wrote that are not fetched yet are in `pending` (ids).
+    """
+
+    def __init__(self, device_id: int, since: int, readings: Readings) -> None:
+        self.device_id = device_id
+        self.since = since
+        self.pending: set[int] = set()
+        self._start = 0
+        self._size = 0
+        self._ints = {name: np.empty(_MIN_CAPACITY, np.int64) for name in _INT_COLUMNS}
+        self._metrics = {name: np.empty(_MIN_CAPACITY, np.float64) for name in util.METRICS}
+        self.extend(readings)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def _capacity(self) -> int:
+        return len(self._ints["id"])
+
+    def _order(self) -> npt.NDArray[np.int64]:
+        """Positions of the held readings, oldest arrival first."""
+        return (self._start + np.arange(self._size)) % self._capacity
+
+    def _resize(self, capacity: int) -> None:
+        order = self._order()
+
+        def grown(values: npt.NDArray[_Scalar]) -> npt.NDArray[_Scalar]:
+            column = np.empty(capacity, values.dtype)
+            column[:self._size] = values[order]
+            return column
+
+        self._ints = {name: grown(values) for name, values in self._ints.items()}
+        self._metrics = {name: grown(values) for name, values in self._metrics.items()}
+        self._start = 0
+
+    def extend(self, readings: Readings) -> None:
+        """Append readings of this device, skipping old ones and ones already held."""
+        keep = readings.recorded_at >= self.since
+        if self._size:
+            keep &= ~np.isin(readings.id, self._ints["id"][self._order()])
+        readings = readings.take(keep)
+        if not len(readings):
+            return
+        needed = self._size + len(readings)
+        if needed > self._capacity:
+            self._resize(max(_MIN_CAPACITY, 1 << (needed - 1).bit_length()))
+        positions = (self._start + self._size + np.arange(len(readings))) % self._capacity
+        for name in _INT_COLUMNS:
+            self._ints[name][positions] = getattr(readings, name)
+        for name in util.METRICS:
+            self._metrics[name][positions] = readings.metrics[name]
+        self._size = needed
+
+    def expire(self, since: int) -> None:
+        """Move the start of the ring to `since`, dropping what arrived first and is older."""
+        self.since = max(self.since, since)
+        # Readings arrive roughly in time order; a late old one further in
+        # is left to the window filters and goes once it reaches the front.
+        fresh = self._ints["recorded_at"][self._order()] >= self.since
+        expired = int(np.argmax(fresh)) if fresh.any() else self._size
+        self._start = (self._start + expired) % self._capacity
+        self._size -= expired
+
+    def holds(self, recorded_at: int) -> bool:
+        return recorded_at >= self.since
+
+    def add_rows(self, rows: Sequence[Any]) -> bool:
+        self.extend(Readings.from_rows(rows))
+        return True
+
+    def covers(self, start: datetime) -> bool:
+        return to_micros(util.as_aware(start)) >= self.since
+
+    def readings(self, start: datetime | None = None) -> Readings:
+        """The held readings at or after `since` (and start), in arrival order."""
+        lower = self.since if start is None else max(self.since, to_micros(util.as_aware(start)))
+        order = self._order()
+        readings = Readings(
+            device_id=np.full(self._size, self.device_id, dtype=np.int64),
+            id=self._ints["id"][order],
+            recorded_at=self._ints["recorded_at"][order],
+            created_at=self._ints["created_at"][order],
+            metrics={name: values[order] for name, values in self._metrics.items()},
+        )
+        return readings.take(readings.recorded_at >= lower)
+
+    def latest(self) -> WeatherReadingSchema | None:
+        readings = self.readings()
+        if not len(readings):
+            return None
+        return readings.take(np.lexsort((readings.id, readings.recorded_at))[-1:]).to_schemas()[0]
+
+
+_rings: DeviceStates[Ring] = DeviceStates(RAW_COLUMNS)
+clear = _rings.clear
+stats = _rings.stats
+
+
+def span() -> timedelta:
+    """How far back rings reach: never past what the table they load from holds."""
+    hours = settings.RECENT_BUFFER_HOURS
+    if (raw_hours := util.raw_table_hours()) is not None:
+        hours = min(hours, raw_hours)
+    return timedelta(hours=hours)
+
+
+def enabled() -> bool:
+    return settings.RECENT_BUFFER_HOURS > 0 and ingest_bus.listening
+
+
+def _window_start() -> int:
+    return to_micros(datetime.now(timezone.utc) - span())
+
+
+async def _load(db: AsyncSession, device_id: int) -> Ring:
+    since = _window_start()
+    stmt = select(*RAW_COLUMNS).where(
+        WeatherReadingModel.device_id == device_id,
+        WeatherReadingModel.recorded_at >= from_micros(since),
+    )
+    return Ring(device_id, since, Readings.from_rows((await db.execute(stmt)).all()))
+
+
+async def get(db: AsyncSession, device_id: int, start: datetime | None = None) -> Ring | None:
+    """
+    The device's ring, current as of now, if buffers are in use and it
+    reaches back to start (when given); None means read the database.
+    """
+    too_old = start is not None and datetime.now(timezone.utc) - util.as_aware(start) > span()
+    if not enabled() or too_old:
+        _rings.counters["misses"] += 1
+        return None
+    ring = _rings.get(device_id)
+    if ring is not None and ring.pending:
+        ring = await _rings.catch_up(db, device_id, ring)
+    if ring is None:
+        ring = await _rings.load(device_id, lambda: _load(db, device_id))
+    ring.expire(_window_start())
+    if start is not None and not ring.covers(start):
+        _rings.counters["misses"] += 1
+        return None
+    _rings.counters["hits"] += 1
+    return ring
+
+
+async def get_many(
+    db: AsyncSession, device_ids: Sequence[int], start: datetime
+) -> list[Ring] | None:
+    """The rings of several devices, or None unless every one reaches back to start."""
+    rings = []
+    for device_id in device_ids:
+        ring = await get(db, device_id, start)
+        if ring is None:
+            return None
+        rings.append(ring)
+    return rings
+
+
+async def warm(factory: async_sessionmaker[AsyncSession]) -> None:
+    """Load the rings of every sensor in one query once buffers are in use."""
+    if settings.RECENT_BUFFER_HOURS <= 0:
+        return
+    while not enabled():
+        await asyncio.sleep(1)
+    async with factory() as db:
+        sensors = (await db.execute(
+            select(DeviceModel.id).where(DeviceModel.function == DeviceFunction.SENSOR)
+        )).scalars().all()
+        stamps = {device_id: _rings.stamp(device_id) for device_id in sensors}
+        since = _window_start()
+        stmt = select(*RAW_COLUMNS).where(
+            WeatherReadingModel.device_id.in_(sensors),
+            WeatherReadingModel.recorded_at >= from_micros(since),
+        )
+        readings = Readings.from_rows((await db.execute(stmt)).all())
+    for device_id, stamp in stamps.items():
+        if _rings.get(device_id) is None:
+            own = readings.take(readings.device_id == device_id)
+            _rings.put(device_id, Ring(device_id, since, own), stamp)
+    logger.info("Buffered %d recent readings of %d sensors", len(readings), len(sensors))
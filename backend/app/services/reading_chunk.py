@@ -0,0 +1,457 @@
+"""
+Packed storage for old readings (optional, see CHUNK_AFTER_DAYS).
+
+scripts.compact_readings moves the raw readings of every closed UTC day
+older than CHUNK_AFTER_DAYS into one reading_chunks row per device and
+day. Every column of a reading is kept, id and created_at included, and
+compressed with app.utils.chunk_codec: ids and metrics as deltas,
+recorded_at as delta-of-delta, created_at as its lag behind recorded_at.
+
+weather_reading reads the chunks overlapping a window and merges them with
+the raw rows there. A reading that arrives for a day after it was packed
+stays a raw row until the next compaction folds it into the chunk.
+"""
+import struct
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Sequence
+
+import numpy as np
+import numpy.typing as npt
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.utils.weather_reading as util
+from app.models.reading_chunk import ReadingChunk
+from app.models.weather_reading import WeatherReading as WeatherReadingModel
+from app.schemas.weather_reading import WeatherReading as WeatherReadingSchema
+from app.utils import chunk_codec
+
+# One chunk per device and UTC day.
+CHUNK_SECONDS = 86400
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_FORMAT = 1
+_HEADER = struct.Struct("<BI")  # format, reading count
+# How much of a metric column is present; a bitmap follows for _SOME_PRESENT.
+_ALL_PRESENT, _SOME_PRESENT, _NONE_PRESENT = 0, 1, 2
+# Metrics are packed in their stored fixed-point units (ScaledInteger).
+_SCALES = util.METRIC_SCALES
+
+RAW_COLUMNS = (
+    WeatherReadingModel.id,
+    WeatherReadingModel.device_id,
+    WeatherReadingModel.recorded_at,
+    WeatherReadingModel.created_at,
+    *(getattr(WeatherReadingModel, name) for name in util.METRICS),
+)
+
+Int64Array = npt.NDArray[np.int64]
+
+
+def to_micros(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+def _or_none(value: float) -> float | None:
+    return None if np.isnan(value) else float(value)
+
+
+@dataclass
+class Readings:
+    """
+    Readings as columns: times in microseconds since the epoch, missing
+    metrics as NaN.
+    """
+    device_id: Int64Array
+    id: Int64Array
+    recorded_at: Int64Array
+    created_at: Int64Array
+    metrics: dict[str, npt.NDArray[np.float64]]
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    @classmethod
+    def empty(cls) -> "Readings":
+        return cls.from_rows([])
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Any]) -> "Readings":
+        """From rows with the attributes of RAW_COLUMNS."""
+        def ints(values: Any) -> Int64Array:
+            return np.fromiter(values, np.int64, len(rows))
+
+        return cls(
+            device_id=ints(r.device_id for r in rows),
+            id=ints(r.id for r in rows),
+            recorded_at=ints(to_micros(r.recorded_at) for r in rows),
+            created_at=ints(to_micros(r.created_at) for r in rows),
+            metrics={
+                name: np.array([getattr(r, name) for r in rows], dtype=np.float64).reshape(-1)
+                for name in util.METRICS
+            },
+        )
+
+    @classmethod
+    def concat(cls, parts: Sequence["Readings"]) -> "Readings":
+        if not parts:
+            return cls.empty()
+        return cls(
+            device_id=np.concatenate([p.device_id for p in parts]),
+            id=np.concatenate([p.id for p in parts]),
+            recorded_at=np.concatenate([p.recorded_at for p in parts]),
+            created_at=np.concatenate([p.created_at for p in parts]),
+            metrics={
+                name: np.concatenate([p.metrics[name] for p in parts]) for name in util.METRICS
+            },
+        )
+
+    def take(self, index: npt.NDArray[Any]) -> "Readings":
+        """The readings at an index array or boolean mask."""
+        return Readings(
+            device_id=self.device_id[index],
+            id=self.id[index],
+            recorded_at=self.recorded_at[index],
+            created_at=self.created_at[index],
+            metrics={name: values[index] for name, values in self.metrics.items()},
+        )
+
+    def within(self, start: datetime, end: datetime) -> "Readings":
+        """The readings with start <= recorded_at < end."""
+        recorded_at = self.recorded_at
+        return self.take((recorded_at >= to_micros(start)) & (recorded_at < to_micros(end)))
+
+    def by_time(self) -> "Readings":
+        return self.take(np.lexsort((self.id, self.recorded_at)))
+
+    def to_schemas(self) -> list[WeatherReadingSchema]:
+        return [WeatherReadingSchema(**row) for row in self.to_dicts()]
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        """One dict per reading, keyed like the weather_readings columns."""
+        return [
+            {
+                "id": int(self.id[i]),
+                "device_id": int(self.device_id[i]),
+                "recorded_at": from_micros(self.recorded_at[i]),
+                "created_at": from_micros(self.created_at[i]),
+                **{name: _or_none(values[i]) for name, values in self.metrics.items()},
+            }
+            for i in range(len(self))
+        ]
+
+
+def pack(readings: Readings) -> bytes:
+    """Compress the readings of one device."""
+    parts = [
+        _HEADER.pack(_FORMAT, len(readings)),
+        chunk_codec.encode(readings.id, 1),
+        chunk_codec.encode(readings.recorded_at, 2),
+        chunk_codec.encode(readings.created_at - readings.recorded_at, 1),
+    ]
+    for name in util.METRICS:
+        values = readings.metrics[name]
+        present = ~np.isnan(values)
+        if present.all():
+            parts.append(bytes([_ALL_PRESENT]))
+        elif not present.any():
+            parts.append(bytes([_NONE_PRESENT]))
+            continue
+        else:
+            parts.append(bytes([_SOME_PRESENT]) + np.packbits(present).tobytes())
+        stored = np.round(values[present] * _SCALES[name]).astype(np.int64)
+        parts.append(chunk_codec.encode(stored, 1))
+    return b"".join(parts)
+
+
+def unpack(device_id: int, data: bytes) -> Readings:
+    """Readings of a chunk written by pack."""
+    view = memoryview(data)
+    _, count = _HEADER.unpack_from(view, 0)
+    ids, offset = chunk_codec.decode(view, _HEADER.size, count, 1)
+    recorded_at, offset = chunk_codec.decode(view, offset, count, 2)
+    lag, offset = chunk_codec.decode(view, offset, count, 1)
+    metrics = {}
+    for name in util.METRICS:
+        presence = view[offset]
+        offset += 1
+        values = np.full(count, np.nan)
+        if presence != _NONE_PRESENT:
+            present = np.ones(count, dtype=bool)
+            if presence == _SOME_PRESENT:
+                size = (count + 7) // 8
+                bits = np.frombuffer(view, np.uint8, size, offset)
+                present = np.unpackbits(bits, count=count).astype(bool)
+                offset += size
+            stored, offset = chunk_codec.decode(view, offset, int(present.sum()), 1)
+            values[present] = stored / _SCALES[name]
+        metrics[name] = values
+    return Readings(
+        device_id=np.full(count, device_id, dtype=np.int64),
+        id=ids,
+        recorded_at=recorded_at,
+        created_at=recorded_at + lag,
+        metrics=metrics,
+    )
+
+
+async def load(
+    db: AsyncSession,
+    device_ids: Sequence[int] | None,
+    start: datetime,
+    end: datetime,
+) -> tuple[Readings, datetime | None]:
+    """
+    Packed readings of the devices (None: all) with start <= recorded_at <
+    end, and the end of the last chunk overlapping that range (None when
+    no chunk does).
+    """
+    stmt = select(ReadingChunk.device_id, ReadingChunk.end_at, ReadingChunk.data).where(
+        ReadingChunk.start_at < end, ReadingChunk.end_at > start
+    )
+    if device_ids is not None:
+        stmt = stmt.where(ReadingChunk.device_id.in_(device_ids))
+    chunks = (await db.execute(stmt)).all()
+    if not chunks:
+        return Readings.empty(), None
+    readings = Readings.concat([unpack(c.device_id, c.data) for c in chunks]).within(start, end)
+    return readings, max(c.end_at for c in chunks)
+
+
+async def count(
+    db: AsyncSession,
+    device_ids: Sequence[int] | None,
+    start: datetime,
+    end: datetime,
+    since: int | None = None,
+) -> int:
+    """
+    How many packed readings load would return, plus the since filter (id >
+    since). Only chunks that straddle start or end are decoded, unless
+    since is given.
+    """
+    stmt = select(
+        ReadingChunk.id, ReadingChunk.start_at, ReadingChunk.end_at, ReadingChunk.reading_count
+    ).where(ReadingChunk.start_at < end, ReadingChunk.end_at > start)
+    if device_ids is not None:
+        stmt = stmt.where(ReadingChunk.device_id.in_(device_ids))
+    total = 0
+    partial = []
+    for chunk in (await db.execute(stmt)).all():
+        if since is None and chunk.start_at >= start and chunk.end_at <= end:
+            total += chunk.reading_count
+        else:
+            partial.append(chunk.id)
+    if partial:
+        chunks = (await db.execute(
+            select(ReadingChunk.device_id, ReadingChunk.data).where(ReadingChunk.id.in_(partial))
+        )).all()
+        readings = Readings.concat([unpack(c.device_id, c.data) for c in chunks]).within(start, end)
+        total += len(readings) if since is None else int((readings.id > since).sum())
+    return total
+
+
+async def latest(db: AsyncSession, device_id: int) -> WeatherReadingSchema | None:
+    """Newest packed reading of a device."""
+    stmt = (
+        select(ReadingChunk.data)
+        .where(ReadingChunk.device_id == device_id)
+        .order_by(ReadingChunk.start_at.desc())
+        .limit(1)
+    )
+    data = (await db.execute(stmt)).scalar_one_or_none()
+    if data is None:
+        return None
+    readings = unpack(device_id, data).by_time()
+    return readings.take(np.array([len(readings) - 1])).to_schemas()[0]
+
+
+def window_start(value: datetime) -> datetime:
+    """Start of the chunk window containing value."""
+    return from_micros(to_micros(value) // (CHUNK_SECONDS * 10**6) * CHUNK_SECONDS * 10**6)
+
+
+async def closed_windows(db: AsyncSession, before: datetime) -> list[tuple[int, datetime]]:
+    """(device_id, window start) of every window ending by before that has raw readings."""
+    minutes_per_window = CHUNK_SECONDS // 60
+    window = WeatherReadingModel.recorded_minute // minutes_per_window
+    stmt = (
+        select(WeatherReadingModel.device_id, window)
+        .where(WeatherReadingModel.recorded_at < window_start(before))
+        .distinct()
+        .order_by(WeatherReadingModel.device_id, window)
+    )
+    return [
+        (device_id, from_micros(int(index) * CHUNK_SECONDS * 10**6))
+        for device_id, index in (await db.execute(stmt)).all()
+    ]
+
+
+async def take_raw(db: AsyncSession, device_id: int, start: datetime, end: datetime) -> Readings:
+    """Delete the raw readings of a device in [start, end), whole minutes, and return them."""
+    removed = (await db.execute(
+        delete(WeatherReadingModel)
+        .where(
+            WeatherReadingModel.device_id == device_id,
+            WeatherReadingModel.recorded_minute >= to_micros(start) // 60_000_000,
+            WeatherReadingModel.recorded_minute < to_micros(end) // 60_000_000,
+        )
+        .returning(*RAW_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )).all()
+    return Readings.from_rows(removed)
+
+
+async def compact(db: AsyncSession, device_id: int, start: datetime) -> int:
+    """
+    Fold the raw readings of a device in the window starting at start into
+    its chunk; returns how many were moved.
+    """
+    readings = await take_raw(db, device_id, start, start + timedelta(seconds=CHUNK_SECONDS))
+    moved = len(readings)
+    if not moved:
+        return 0
+
+    chunk = (await db.execute(
+        select(ReadingChunk).where(
+            ReadingChunk.device_id == device_id, ReadingChunk.start_at == start
+        )
+    )).scalar_one_or_none()
+    if chunk is not None:
+        readings = Readings.concat([unpack(device_id, chunk.data), readings])
+    readings = readings.by_time()
+
+    if chunk is None:
+        chunk = ReadingChunk(
+            device_id=device_id,
+            start_at=start,
+            end_at=start + timedelta(seconds=CHUNK_SECONDS),
+            reading_count=0,
+            data=b"",
+        )
+        db.add(chunk)
+    chunk.reading_count = len(readings)
+    chunk.data = pack(readings)
+    await db.flush()
+    return moved
+
+
+async def expand(db: AsyncSession, chunk: ReadingChunk) -> int:
+    """Write the readings of a chunk back as raw rows and drop it; returns how many."""
+    rows = unpack(chunk.device_id, chunk.data).to_dicts()
+    if rows:
+        await db.execute(insert(WeatherReadingModel), rows)
+    await db.delete(chunk)
+    await db.flush()
+    return len(rows)
+
+
+async def delete_before(db: AsyncSession, cutoff: datetime) -> tuple[int, set[int]]:
+    """
+    Drop packed readings recorded before cutoff; returns how many, and the
+    devices they belonged to.
+    """
+    chunks = (
+        await db.execute(select(ReadingChunk).where(ReadingChunk.start_at < cutoff))
+    ).scalars().all()
+    deleted = 0
+    for chunk in chunks:
+        if chunk.end_at <= cutoff:
+            deleted += chunk.reading_count
+            await db.delete(chunk)
+            continue
+        readings = unpack(chunk.device_id, chunk.data)
+        kept = readings.take(readings.recorded_at >= to_micros(cutoff))
+        deleted += len(readings) - len(kept)
+        chunk.reading_count = len(kept)
+        chunk.data = pack(kept)
+    await db.flush()
+    return deleted, {chunk.device_id for chunk in chunks}
+
+
+def _bucket_starts(seconds: Int64Array, bucket_seconds: int) -> Int64Array:
+    """Bucket start (epoch seconds) of every reading, as util.bucket_floor computes it."""
+    if not util.is_local_bucket(bucket_seconds):
+        return seconds // bucket_seconds * bucket_seconds
+    # Local buckets vary in length; find them between the first and last reading.
+    starts = util.bucket_starts(int(np.min(seconds)), int(np.max(seconds)), bucket_seconds)
+    bounds = np.array(starts, dtype=np.int64)
+    return bounds[np.searchsorted(bounds, seconds, side="right") - 1]
+
+
+def summarize(readings: Readings) -> Any:
+    """The row of weather_reading.get_summary_by_device's statement over readings."""
+    def mean(values: npt.NDArray[np.float64]) -> float | None:
+        present = values[~np.isnan(values)]
+        return float(present.mean()) if len(present) else None
+
+    temperature = readings.metrics["temperature"]
+    has_temperature = not np.isnan(temperature).all()
+    return SimpleNamespace(
+        avg_temperature=mean(temperature),
+        min_temperature=float(np.nanmin(temperature)) if has_temperature else None,
+        max_temperature=float(np.nanmax(temperature)) if has_temperature else None,
+        avg_humidity=mean(readings.metrics["humidity"]),
+        avg_pressure=mean(readings.metrics["pressure"]),
+        reading_count=len(readings),
+        period_start=from_micros(int(np.min(readings.recorded_at))) if len(readings) else None,
+        period_end=from_micros(int(np.max(readings.recorded_at))) if len(readings) else None,
+    )
+
+
+def aggregate(
+    readings: Readings, bucket_seconds: int, by_device: bool = False, stats: bool = False
+) -> list[Any]:
+    """
+    Per-bucket aggregate rows with the attributes and order of
+    weather_reading._aggregate_stmt's rows.
+    """
+    if not len(readings):
+        return []
+    keys = _bucket_starts(readings.recorded_at // 1_000_000, bucket_seconds)
+    devices = readings.device_id if by_device else np.zeros_like(keys)
+    order = np.lexsort((devices, keys))
+    keys, devices = keys[order], devices[order]
+    starts = np.flatnonzero(np.r_[True, (np.diff(keys) != 0) | (np.diff(devices) != 0)])
+    counts = np.diff(np.r_[starts, len(keys)])
+
+    columns: dict[str, list[float | None]] = {}
+    for name in util.METRICS:
+        values = readings.metrics[name][order]
+        present = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(present, values, 0.0), starts)
+        if name == "rain_amount":
+            columns[name] = sums.tolist()
+        else:
+            present_counts = np.add.reduceat(present, starts)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                columns[name] = [_or_none(v) for v in sums / present_counts]
+        if not stats:
+            continue
+        columns[f"{name}_min"] = [_or_none(v) for v in np.fmin.reduceat(values, starts)]
+        columns[f"{name}_max"] = [_or_none(v) for v in np.fmax.reduceat(values, starts)]
+        p50: list[float | None] = []
+        p95: list[float | None] = []
+        for lo, hi in zip(starts, np.r_[starts[1:], len(values)]):
+            group = values[lo:hi][present[lo:hi]]
+            low, high = np.percentile(group, [50, 95]).tolist() if len(group) else (None, None)
+            p50.append(low)
+            p95.append(high)
+        columns[f"{name}_p50"], columns[f"{name}_p95"] = p50, p95
+
+    return [
+        SimpleNamespace(
+            bucket=datetime.fromtimestamp(int(keys[lo]), timezone.utc),
+            device_id=int(devices[lo]) if by_device else None,
+            reading_count=int(count),
+            **{name: column[i] for name, column in columns.items()},
+        )
+        for i, (lo, count) in enumerate(zip(starts, counts))
+    ]
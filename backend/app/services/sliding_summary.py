@@ -0,0 +1,256 @@
+"""
+Running summaries of every device over fixed windows (see SUMMARY_WINDOWS_HOURS).
+
+Summaries over a configured window length are answered from per-device
+state that is updated as readings arrive instead of scanning them: running
+sums and counts for the averages, monotonic deques for the minimum and
+maximum temperature. Adding a reading and dropping one that left a window
+are both amortized O(1), whatever the window length. The readings of the
+longest window are kept per device in compact arrays (metrics in their
+stored fixed-point units, so the sums are exact) to know what leaves when.
+
+A device's state is built from the database on its first summary and then
+kept current as app.services.device_state describes. A reading older than
+the device's newest one (late, or the newest is ahead of the clock) is
+inserted in place, updating the deques from its position on; one more
+than _MAX_LATE readings back drops the state and the next summary
+rebuilds it.
+"""
+from array import array
+from bisect import bisect_right
+from collections import deque
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.utils.weather_reading as util
+from app.core.config import settings
+from app.core.events import ingest_bus
+from app.models.weather_reading import WeatherReading as WeatherReadingModel
+from app.services.device_state import DeviceStates
+from app.services.reading_chunk import from_micros, to_micros
+
+_HOUR = 3600 * 1_000_000
+# How many readings back a late one is still inserted.
+_MAX_LATE = 1024
+# What get_summary_by_device reports on.
+_METRICS = ("temperature", "humidity", "pressure")
+_SCALES = util.METRIC_SCALES
+_MISSING = -(1 << 62)
+_COLUMNS = (
+    WeatherReadingModel.id,
+    WeatherReadingModel.recorded_at,
+    *(getattr(WeatherReadingModel, name) for name in _METRICS),
+)
+
+
+class _Window:
+    """Running aggregates of the readings from position `start` on."""
+    __slots__ = ("hours", "start", "sums", "counts", "mins", "maxs")
+
+    def __init__(self, hours: int) -> None:
+        self.hours = hours
+        self.start = 0
+        self.sums = dict.fromkeys(_METRICS, 0)
+        self.counts = dict.fromkeys(_METRICS, 0)
+        # Positions of the temperatures that can still become the minimum
+        # (maximum) as older ones leave: ascending (descending) values.
+        self.mins: deque[int] = deque()
+        self.maxs: deque[int] = deque()
+
+
+class Summaries:
+    """
+    One device's readings, in time order, and a _Window per length.
+    Positions count every reading ever added; `base` is that of the
+    oldest one still held.
+    """
+
+    def __init__(self, hours: Sequence[int]) -> None:
+        self.base = 0
+        self.recorded_at = array("q")
+        self.values = {name: array("q") for name in _METRICS}
+        self.windows = {h: _Window(h) for h in hours}
+        self.pending: set[int] = set()
+
+    def horizon(self) -> int:
+        """Where the longest window starts (µs); older readings won't be in any."""
+        now = to_micros(datetime.now(timezone.utc))
+        return now - max(self.windows) * _HOUR
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.recorded_at)
+
+    def __len__(self) -> int:
+        return len(self.recorded_at)
+
+    def _temperature(self, position: int) -> int:
+        return self.values["temperature"][position - self.base]
+
+    def _place(self, positions: deque[int], position: int, temperature: int, sign: int) -> None:
+        """
+        Enter the reading just inserted at position into a deque of
+        ascending (sign=1) or descending (sign=-1) temperatures, moving the
+        positions after it.
+        """
+        later: list[int] = []
+        while positions and positions[-1] >= position:
+            later.append(positions.pop() + 1)
+        later.reverse()
+        # It is only a candidate while nothing after it is as low (high).
+        candidate = temperature != _MISSING and (
+            not later or sign * temperature < sign * self._temperature(later[0])
+        )
+        if candidate:
+            while positions and sign * self._temperature(positions[-1]) >= sign * temperature:
+                positions.pop()
+            positions.append(position)
+        positions.extend(later)
+
+    def add(self, recorded_at: int, values: dict[str, float | None]) -> bool:
+        """
+        Add a reading (µs, metric values) in time order; False if it is
+        more than _MAX_LATE readings older than the newest one.
+        """
+        index = len(self.recorded_at)
+        if self.recorded_at and recorded_at < self.recorded_at[-1]:
+            index = bisect_right(self.recorded_at, recorded_at)
+            if len(self.recorded_at) - index > _MAX_LATE:
+                return False
+        position = self.base + index
+        self.recorded_at.insert(index, recorded_at)
+        scaled = {}
+        for name in _METRICS:
+            value = values[name]
+            scaled[name] = _MISSING if value is None else round(value * _SCALES[name])
+            self.values[name].insert(index, scaled[name])
+        temperature = scaled["temperature"]
+        for window in self.windows.values():
+            if position < window.start:
+                # Older than what the window holds: only the positions move.
+                window.start += 1
+                window.mins = deque(p + 1 for p in window.mins)
+                window.maxs = deque(p + 1 for p in window.maxs)
+                continue
+            for name, value in scaled.items():
+                if value != _MISSING:
+                    window.sums[name] += value
+                    window.counts[name] += 1
+            self._place(window.mins, position, temperature, 1)
+            self._place(window.maxs, position, temperature, -1)
+        return True
+
+    def expire(self, now: int) -> None:
+        """Drop the readings recorded before each window's start as of now (µs)."""
+        for window in self.windows.values():
+            cutoff = now - window.hours * _HOUR
+            while window.start < self.end and self.recorded_at[window.start - self.base] < cutoff:
+                index = window.start - self.base
+                for name in _METRICS:
+                    value = self.values[name][index]
+                    if value != _MISSING:
+                        window.sums[name] -= value
+                        window.counts[name] -= 1
+                window.start += 1
+            while window.mins and window.mins[0] < window.start:
+                window.mins.popleft()
+            while window.maxs and window.maxs[0] < window.start:
+                window.maxs.popleft()
+        # Free what every window has left, once that is half the arrays.
+        drop = min(w.start for w in self.windows.values()) - self.base
+        if drop and drop >= len(self.recorded_at) // 2:
+            del self.recorded_at[:drop]
+            for values in self.values.values():
+                del values[:drop]
+            self.base += drop
+
+    def summary(self, hours: int) -> Any:
+        """The row of weather_reading.get_summary_by_device's statement for a window."""
+        window = self.windows[hours]
+        count = self.end - window.start
+
+        def mean(name: str) -> float | None:
+            if not window.counts[name]:
+                return None
+            return window.sums[name] / window.counts[name] / _SCALES[name]
+
+        def temperature(positions: deque[int]) -> float | None:
+            return self._temperature(positions[0]) / _SCALES["temperature"] if positions else None
+
+        return SimpleNamespace(
+            avg_temperature=mean("temperature"),
+            min_temperature=temperature(window.mins),
+            max_temperature=temperature(window.maxs),
+            avg_humidity=mean("humidity"),
+            avg_pressure=mean("pressure"),
+            reading_count=count,
+            period_start=from_micros(self.recorded_at[window.start - self.base]) if count else None,
+            period_end=from_micros(self.recorded_at[-1]) if count else None,
+        )
+
+    def holds(self, recorded_at: int) -> bool:
+        return recorded_at >= self.horizon()
+
+    def add_rows(self, rows: Sequence[Any]) -> bool:
+        """Add rows with recorded_at and the metrics; False if one is too late to insert."""
+        ordered = sorted(rows, key=lambda r: (r.recorded_at, r.id))
+        return all(
+            self.add(to_micros(r.recorded_at), {name: getattr(r, name) for name in _METRICS})
+            for r in ordered
+        )
+
+
+_states: DeviceStates[Summaries] = DeviceStates(_COLUMNS)
+clear = _states.clear
+stats = _states.stats
+
+
+def window_hours() -> list[int]:
+    """The configured windows that the table holds every reading of."""
+    raw_hours = util.raw_table_hours()
+    return sorted({
+        h for h in settings.SUMMARY_WINDOWS_HOURS if raw_hours is None or h <= raw_hours
+    })
+
+
+def enabled() -> bool:
+    return bool(settings.SUMMARY_WINDOWS_HOURS) and ingest_bus.listening
+
+
+async def _load(db: AsyncSession, device_id: int, hours: list[int], now: datetime) -> Summaries:
+    stmt = (
+        select(*_COLUMNS)
+        .where(
+            WeatherReadingModel.device_id == device_id,
+            WeatherReadingModel.recorded_at >= from_micros(to_micros(now) - hours[-1] * _HOUR),
+        )
+    )
+    state = Summaries(hours)
+    state.add_rows((await db.execute(stmt)).all())
+    return state
+
+
+async def get(db: AsyncSession, device_id: int, hours: int) -> Any | None:
+    """
+    The summary row of the device's last `hours` if that is a window in
+    use, else None: read the database.
+    """
+    windows = window_hours()
+    if not enabled() or hours not in windows:
+        _states.counters["misses"] += 1
+        return None
+    now = datetime.now(timezone.utc)
+    state = _states.get(device_id)
+    if state is not None and list(state.windows) != windows:
+        state = None
+    if state is not None and state.pending:
+        state = await _states.catch_up(db, device_id, state)
+    if state is None:
+        state = await _states.load(device_id, lambda: _load(db, device_id, windows, now))
+    state.expire(to_micros(now))
+    _states.counters["hits"] += 1
+    return state.summary(hours)
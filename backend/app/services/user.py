@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User as UserModel, UserRole
 from app.schemas.user import UserCreate, UserUpdate
-from app.services.auth import get_password_hash
+from app.services.auth import get_password_hash, forget_user
 
 
 async def get_all(
@@ -64,13 +64,16 @@ async def update(
         setattr(user, field, value)
 
     await db.flush()
+    await forget_user(db, user.id)
     await db.refresh(user)
     return user
 
 
 async def delete(db: AsyncSession, user: UserModel) -> None:
+    user_id = user.id
     await db.delete(user)
     await db.flush()
+    await forget_user(db, user_id)
 
 
 async def count(db: AsyncSession) -> int:
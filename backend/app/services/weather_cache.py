@@ -0,0 +1,289 @@
+"""
+Read path in front of app.services.weather_reading for the hot endpoints.
+
+Concurrent identical requests (fifty display boards polling at the same
+second, several dashboard tabs on the same window) share one DB query and
+one serialized JSON body. Only the leader's session touches the pool.
+
+Callers pass the data version (app.services.data_version) they read
+before calling; it is part of every key, so a request that already saw a
+new reading never joins a query that started before it was committed.
+Bodies that show device locations are keyed by the data generation too,
+which device edits bump.
+
+Display board bodies are also kept after the query: each encoding is
+rendered once per data version and then served from memory until the
+next reading arrives.
+"""
+from datetime import datetime, timezone
+from typing import Hashable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.aggregate_cache as aggregate_cache
+import app.services.downsample as downsample_service
+import app.services.reading_buffer as buffer_service
+import app.services.sliding_summary as summary_service
+import app.services.weather_reading as weather_service
+import app.utils.display_payload as display_payload
+from app.schemas.weather_reading import (
+    DisplayFormat,
+    LatestReadings,
+    WeatherGranularity,
+    WeatherReadingList,
+)
+from app.utils.cache import VersionCache
+from app.utils.singleflight import SingleFlight
+from app.utils.weather_reading import MAX_SERIES_POINTS
+
+latest_flight: SingleFlight[bytes] = SingleFlight("latest")
+sensor_latest_flight: SingleFlight[bytes | None] = SingleFlight("sensor_latest")
+history_flight: SingleFlight[bytes] = SingleFlight("history")
+summary_flight: SingleFlight[bytes] = SingleFlight("summary")
+display_bodies: VersionCache[Hashable, bytes] = VersionCache()
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """Counters for every coalescing point, the bucket cache and the in-memory readings."""
+    flights = (latest_flight, sensor_latest_flight, history_flight, summary_flight)
+    return {f.name: f.stats() for f in flights} | {
+        "buckets": aggregate_cache.bucket_cache.stats(),
+        "display": display_bodies.stats(),
+        "buffer": buffer_service.stats(),
+        "summaries": summary_service.stats(),
+    }
+
+
+async def latest_from_all_sensors_json(
+    db: AsyncSession, version: int = 0, since: int | None = None, generation: int = 0
+) -> bytes:
+    """
+    LatestReadings for all sensors (or those changed after since), serialized.
+
+    The watermark is the data version itself. A reading that commits after
+    a newer one can be skipped by a delta, but the next reading of that
+    sensor supersedes it anyway, which history deltas can't rely on.
+    """
+    async def load() -> bytes:
+        readings = await weather_service.get_latest_from_all_sensors(db, since=since)
+        return LatestReadings(
+            readings=readings,
+            fetched_at=datetime.now(timezone.utc),
+            watermark=version,
+        ).model_dump_json().encode()
+
+    return await latest_flight.do((version, generation, since), load)
+
+
+async def latest_by_device_json(
+    db: AsyncSession, device_id: int, version: int = 0, generation: int = 0
+) -> bytes | None:
+    """Latest reading of one sensor, serialized, or None if it has none."""
+    async def load() -> bytes | None:
+        reading = await weather_service.get_latest_by_device(db, device_id)
+        return reading.model_dump_json().encode() if reading else None
+
+    return await sensor_latest_flight.do((device_id, version, generation), load)
+
+
+async def display_latest(
+    db: AsyncSession,
+    version: int,
+    since: int | None = None,
+    fields: tuple[str, ...] | None = None,
+    fmt: DisplayFormat = DisplayFormat.json,
+    generation: int = 0,
+) -> bytes:
+    """
+    Latest readings for display boards (see app.utils.display_payload).
+
+    fetched_at is when the body was rendered, which may be well before the
+    request while no new reading arrives.
+    """
+    key = ("latest", generation, since, fields, fmt)
+    body = display_bodies.get(key, version)
+    if body is not None:
+        return body
+
+    async def load() -> bytes:
+        readings = await weather_service.get_latest_from_all_sensors(db, since=since)
+        return display_payload.render(readings, fields, fmt, version, datetime.now(timezone.utc))
+
+    body = await latest_flight.do((version, generation, since, fields, fmt), load)
+    display_bodies.set(key, version, body)
+    return body
+
+
+async def display_sensor_latest(
+    db: AsyncSession,
+    device_id: int,
+    version: int,
+    fields: tuple[str, ...] | None = None,
+    fmt: DisplayFormat = DisplayFormat.json,
+    generation: int = 0,
+) -> bytes | None:
+    """Latest reading of one sensor for display boards, or None if it has none."""
+    key = ("sensor_latest", device_id, generation, fields, fmt)
+    body = display_bodies.get(key, version)
+    if body is not None:
+        return body
+
+    async def load() -> bytes | None:
+        reading = await weather_service.get_latest_by_device(db, device_id)
+        return display_payload.render_one(reading, fields, fmt) if reading else None
+
+    body = await sensor_latest_flight.do((device_id, version, generation, fields, fmt), load)
+    if body is not None:
+        display_bodies.set(key, version, body)
+    return body
+
+
+async def aggregated_by_device_json(
+    db: AsyncSession,
+    device_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    granularity: WeatherGranularity | None,
+    auto_granularity: bool,
+    skip: int,
+    limit: int,
+    version: int = 0,
+    since: int | None = None,
+    stats: bool = False,
+) -> bytes:
+    """Aggregated WeatherReadingList for one device, serialized."""
+    async def load() -> bytes:
+        return await _aggregated_json(
+            db, device_id, start_time, end_time, granularity, auto_granularity,
+            skip, limit, since, stats,
+        )
+
+    key = (
+        device_id, start_time, end_time, granularity, auto_granularity,
+        skip, limit, version, since, stats,
+    )
+    return await history_flight.do(key, load)
+
+
+async def aggregated_all_json(
+    db: AsyncSession,
+    start_time: datetime,
+    end_time: datetime,
+    granularity: WeatherGranularity | None,
+    auto_granularity: bool,
+    skip: int,
+    limit: int,
+    version: int = 0,
+    since: int | None = None,
+    stats: bool = False,
+) -> bytes:
+    """Aggregated WeatherReadingList across all devices, serialized."""
+    async def load() -> bytes:
+        return await _aggregated_json(
+            db, None, start_time, end_time, granularity, auto_granularity, skip, limit, since, stats
+        )
+
+    key = (
+        None, start_time, end_time, granularity, auto_granularity,
+        skip, limit, version, since, stats,
+    )
+    return await history_flight.do(key, load)
+
+
+async def aggregated_matrix_json(
+    db: AsyncSession,
+    device_ids: tuple[int, ...],
+    start_time: datetime,
+    end_time: datetime,
+    granularity: WeatherGranularity | None,
+    auto_granularity: bool,
+    version: int = 0,
+    stats: bool = False,
+) -> bytes:
+    """WeatherSeriesMatrix for several devices, serialized."""
+    async def load() -> bytes:
+        matrix = await weather_service.get_aggregated_matrix(
+            db, device_ids, start_time, end_time, granularity, auto_granularity, stats
+        )
+        return matrix.model_dump_json().encode()
+
+    key = (
+        "matrix", device_ids, start_time, end_time, granularity, auto_granularity, version, stats
+    )
+    return await history_flight.do(key, load)
+
+
+async def downsampled_json(
+    db: AsyncSession,
+    device_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    points: int,
+    version: int = 0,
+) -> bytes:
+    """DownsampledSeries for one device, serialized."""
+    async def load() -> bytes:
+        series = await downsample_service.get_downsampled(
+            db, device_id, start_time, end_time, points
+        )
+        return series.model_dump_json().encode()
+
+    key = ("lttb", device_id, start_time, end_time, points, version)
+    return await history_flight.do(key, load)
+
+
+async def _aggregated_json(
+    db: AsyncSession,
+    device_id: int | None,
+    start_time: datetime,
+    end_time: datetime,
+    granularity: WeatherGranularity | None,
+    auto_granularity: bool,
+    skip: int,
+    limit: int,
+    since: int | None,
+    stats: bool,
+) -> bytes:
+    watermark = await weather_service.get_watermark(db)
+    if since is None:
+        readings, effective = await aggregate_cache.get_aggregated(
+            db,
+            device_id=device_id,
+            start_time=start_time,
+            end_time=end_time,
+            granularity=granularity,
+            auto_granularity=auto_granularity,
+            skip=skip,
+            limit=limit,
+            stats=stats,
+        )
+    else:
+        changed, effective = await weather_service.get_aggregated_since(
+            db,
+            device_id=device_id,
+            start_time=start_time,
+            end_time=end_time,
+            granularity=granularity,
+            auto_granularity=auto_granularity,
+            since=since,
+            stats=stats,
+        )
+        readings = changed[skip:skip + min(limit, MAX_SERIES_POINTS)]
+    return WeatherReadingList(
+        readings=readings,
+        total=len(readings),
+        aggregated=True,
+        granularity=effective,
+        watermark=watermark,
+    ).model_dump_json().encode()
+
+
+async def summary_by_device_json(
+    db: AsyncSession, device_id: int, hours: int, version: int = 0, generation: int = 0
+) -> bytes:
+    """WeatherSummary for one device, serialized."""
+    async def load() -> bytes:
+        summary = await weather_service.get_summary_by_device(db, device_id, hours)
+        return summary.model_dump_json().encode()
+
+    return await summary_flight.do((device_id, hours, version, generation), load)
@@ -1,7 +1,13 @@
+import asyncio
 from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
 from typing import Any, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import Integer, cast, select, func, desc, and_
+from sqlalchemy import (
+    BigInteger, Float, Integer, Select, cast, false, literal_column, select, func, desc, and_, or_,
+    type_coerce, union_all,
+)
+from sqlalchemy.sql import ColumnElement, TableClause
 from sqlalchemy.orm import joinedload, selectinload
 from app.models.weather_reading import WeatherReading as WeatherReadingModel
 from app.models.device import Device as DeviceModel, DeviceFunction
@@ -9,10 +15,22 @@ from app.schemas.weather_reading import (
     WeatherGranularity,
     WeatherReadingAggregate,
     WeatherReadingCreate, 
+    WeatherSeriesMatrix,
     WeatherSummary,
     WeatherReading as WeatherReadingSchema,
     WeatherReadingWithLocation
 )
+from app.core.config import settings
+from app.core.events import IngestEvent, ingest_bus
+from app.db.functions import percentile
+from app.db import timescale
+import app.services.analytics as analytics_service
+import app.services.data_generation as generation_service
+import app.services.device_state as device_state
+import app.services.reading_archive as archive_service
+import app.services.reading_buffer as buffer_service
+import app.services.reading_chunk as chunk_service
+import app.services.sliding_summary as summary_service
 import app.utils.weather_reading as util
 
 class DeviceNotFoundError(Exception):
@@ -25,6 +43,157 @@ class NoReadingsFoundError(Exception):
     pass
 
 
+# ---- Cold readings: packed (app.services.reading_chunk) and archived
+# (app.services.reading_archive) ----
+# Queries read the cold readings overlapping their window together with
+# the raw rows there up to where the cold ones end, and SQL covers the rest
+# as before. Nothing cold is read while neither tier is enabled.
+
+def _packing_enabled() -> bool:
+    return settings.CHUNK_AFTER_DAYS > 0
+
+
+def _cold_enabled() -> bool:
+    return _packing_enabled() or archive_service.enabled()
+
+
+def _possibly_cold(recorded_at: datetime) -> bool:
+    """Whether readings recorded at or before this time may have been packed or archived."""
+    days = [settings.CHUNK_AFTER_DAYS] if _packing_enabled() else []
+    if archive_service.enabled():
+        days.append(settings.ARCHIVE_AFTER_DAYS)
+    return bool(days) and recorded_at < datetime.now(timezone.utc) - timedelta(days=min(days))
+
+
+async def _load_cold(
+    db: AsyncSession,
+    device_ids: Sequence[int] | None,
+    start: datetime,
+    end: datetime,
+) -> tuple[chunk_service.Readings, datetime | None]:
+    """Packed and archived readings in [start, end), and where the last tier overlapping it ends."""
+    parts = []
+    ends = []
+    if _packing_enabled():
+        packed, packed_until = await chunk_service.load(db, device_ids, start, end)
+        parts.append(packed)
+        ends.append(packed_until)
+    if archive_service.enabled():
+        # Parquet reads block: keep them off the event loop.
+        archived, archived_until = await asyncio.to_thread(
+            archive_service.load, device_ids, start, end
+        )
+        parts.append(archived)
+        ends.append(archived_until)
+    covered = [until for until in ends if until is not None]
+    return chunk_service.Readings.concat(parts), max(covered) if covered else None
+
+
+async def _cold_head(
+    db: AsyncSession,
+    device_ids: Sequence[int] | None,
+    start: datetime,
+    end: datetime,
+    bucket_seconds: int | None = None,
+) -> tuple[chunk_service.Readings, datetime]:
+    """
+    Readings of the devices (None: all) in [start, end) from chunks and raw
+    rows, up to a split point: where the last overlapping chunk ends,
+    rounded up to a bucket boundary with bucket_seconds. Returns them and
+    the split point; start when no chunk overlaps, so SQL covers [split, end).
+    """
+    start, end = util.as_aware(start), util.as_aware(end)
+    if not _cold_enabled():
+        return chunk_service.Readings.empty(), start
+    cold, covered_until = await _load_cold(db, device_ids, start, end)
+    if covered_until is None:
+        return cold, start
+
+    split = min(covered_until, end)
+    at = split.timestamp()
+    if bucket_seconds is not None and util.bucket_floor(at, bucket_seconds) != at:
+        bucket_end = datetime.fromtimestamp(util.bucket_next(at, bucket_seconds), timezone.utc)
+        split = min(bucket_end, end)
+    stmt = select(*chunk_service.RAW_COLUMNS).where(
+        WeatherReadingModel.recorded_at >= start, WeatherReadingModel.recorded_at < split
+    )
+    if device_ids is not None:
+        stmt = stmt.where(WeatherReadingModel.device_id.in_(device_ids))
+    raw = chunk_service.Readings.from_rows((await db.execute(stmt)).all())
+    head = cold.take(cold.recorded_at < chunk_service.to_micros(split))
+    return chunk_service.Readings.concat([head, raw]), split
+
+
+# ---- Long ranges: DuckDB over the analytics export (app.services.analytics) ----
+
+async def _analytics_head(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    bucket_seconds: int,
+    stats: bool,
+) -> tuple[list[Any], datetime]:
+    """
+    All-device aggregate rows of [start, split) from the analytics export,
+    split being the last bucket boundary the export is complete up to, and
+    the split point; no rows and start for ranges shorter than
+    ANALYTICS_MIN_RANGE_DAYS or before the first sync.
+    """
+    start, end = util.as_aware(start), util.as_aware(end)
+    short = end - start < timedelta(days=settings.ANALYTICS_MIN_RANGE_DAYS)
+    if short or not analytics_service.enabled():
+        return [], start
+    synced_until = analytics_service.synced_until()
+    if synced_until is None:
+        return [], start
+    synced = min(synced_until, end).timestamp()
+    split = datetime.fromtimestamp(util.bucket_floor(synced, bucket_seconds), timezone.utc)
+    if split <= start:
+        return [], start
+    # The export keeps readings of deleted devices; only aggregate current ones.
+    device_ids = (await db.execute(select(DeviceModel.id))).scalars().all()
+    rows = await asyncio.to_thread(
+        analytics_service.aggregate, bucket_seconds, start, split, device_ids, stats
+    )
+    return rows, split
+
+
+async def _with_cold_page(
+    db: AsyncSession,
+    stmt: Select[Any],
+    device_ids: Sequence[int] | None,
+    skip: int,
+    limit: int,
+    start_time: datetime | None,
+    end_time: datetime | None,
+    since: int | None,
+) -> list[WeatherReadingSchema]:
+    """
+    A newest-first page of raw readings (stmt, filtered but not ordered),
+    merged with the cold readings that belong on it.
+    """
+    stmt = stmt.order_by(desc(WeatherReadingModel.recorded_at))
+    if not _cold_enabled():
+        readings = (await db.execute(stmt.offset(skip).limit(limit))).scalars().all()
+        return [util.to_response(r) for r in readings]
+
+    page = (await db.execute(stmt.limit(skip + limit))).scalars().all()
+    raw = [util.to_response(r) for r in page]
+    lower = util.as_aware(start_time) if start_time else chunk_service.from_micros(0)
+    if len(raw) == skip + limit:
+        # Cold readings older than the last raw one can't make the page.
+        lower = max(lower, raw[-1].recorded_at)
+    upper = (
+        util.as_aware(end_time) + timedelta(microseconds=1)
+        if end_time else datetime.now(timezone.utc)
+    )
+    cold, _ = await _load_cold(db, device_ids, lower, upper)
+    if since is not None:
+        cold = cold.take(cold.id > since)
+    merged = sorted(raw + cold.to_schemas(), key=lambda r: r.recorded_at, reverse=True)
+    return merged[skip:skip + limit]
+
+
 async def create(
     db: AsyncSession,
     device_id: int,
@@ -43,7 +212,10 @@ async def create(
     db.add(reading)
     await db.flush()
     await db.refresh(reading)
-    return util.to_response(reading)
+    await ingest_bus.publish(db, IngestEvent(device_id, reading.id, reading.recorded_at))
+    response = util.to_response(reading)
+    device_state.stage(db, response)
+    return response
 
 
 async def get_by_id(
@@ -60,6 +232,14 @@ async def get_latest_by_device(
     device_id: int,
 ) -> WeatherReadingWithLocation | None:
     """Get the most recent weather reading for a specific device."""
+    # Locations aren't buffered: device updates publish no event.
+    if buffer_service.enabled() and (device := await db.get(DeviceModel, device_id)) is not None:
+        ring = await buffer_service.get(db, device_id)
+        if ring is not None and (newest := ring.latest()) is not None:
+            return WeatherReadingWithLocation(
+                **newest.model_dump(), device_location=device.location
+            )
+
     stmt = (
         select(WeatherReadingModel)
         .options(selectinload(WeatherReadingModel.device))
@@ -69,25 +249,74 @@ async def get_latest_by_device(
     )
     result = await db.execute(stmt)
     reading = result.scalar_one_or_none()
+    if reading is None or _possibly_cold(reading.recorded_at):
+        candidates = [util.to_response(reading)] if reading else []
+        if _packing_enabled() and (packed := await chunk_service.latest(db, device_id)):
+            candidates.append(packed)
+        if archive_service.enabled():
+            archived = await asyncio.to_thread(archive_service.latest, device_id)
+            if archived:
+                candidates.append(WeatherReadingSchema(**archived))
+        newest = max(candidates, key=lambda r: r.recorded_at, default=None)
+        if newest is not None and (reading is None or newest.recorded_at > reading.recorded_at):
+            device = await db.get(DeviceModel, device_id)
+            if device is not None:
+                return WeatherReadingWithLocation(
+                    **newest.model_dump(), device_location=device.location
+                )
     return util.to_response_with_loc(reading) if reading else None
 
 
+async def get_latest_id(
+    db: AsyncSession,
+    device_id: int | None = None,
+) -> int:
+    """Id of the newest reading of a device (or of any device), 0 if none."""
+    # One probe into the primary key or ix_weather_readings_device_id.
+    stmt = select(WeatherReadingModel.id).order_by(WeatherReadingModel.id.desc()).limit(1)
+    if device_id is not None:
+        stmt = stmt.where(WeatherReadingModel.device_id == device_id)
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none() or 0
+
+
+async def get_watermark(db: AsyncSession) -> int:
+    """
+    Watermark for since= deltas: id of the newest reading written more than
+    DELTA_WATERMARK_LAG_SECONDS ago, 0 if none.
+
+    Ids are taken at insert but become visible at commit, so the newest id
+    can be visible while a smaller one is still uncommitted; trailing
+    behind makes clients receive such readings again instead of never.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.DELTA_WATERMARK_LAG_SECONDS)
+    stmt = select(func.max(WeatherReadingModel.id)).where(WeatherReadingModel.created_at < cutoff)
+    result = await db.execute(stmt)
+    return result.scalar_one() or 0
+
+
 async def get_latest_from_all_sensors(
     db: AsyncSession,
+    since: int | None = None,
 ) -> list[WeatherReadingWithLocation]:
     """
     Get the latest weather reading from each sensor device.
     Uses a window function for efficient retrieval.
+
+    With since, only sensors that have readings newer than that watermark.
     """
     # Subquery to get max recorded_at for each device
-    subquery = (
+    latest_times = (
         select(
             WeatherReadingModel.device_id,
             func.max(WeatherReadingModel.recorded_at).label("max_recorded")
         )
         .group_by(WeatherReadingModel.device_id)
-        .subquery()
     )
+    if since is not None:
+        changed = select(WeatherReadingModel.device_id).where(WeatherReadingModel.id > since)
+        latest_times = latest_times.where(WeatherReadingModel.device_id.in_(changed))
+    subquery = latest_times.subquery()
     
     # Main query joining with subquery
     stmt = (
@@ -116,6 +345,7 @@ async def get_by_device(
     limit: int = 100,
     start_time: datetime | None = None,
     end_time: datetime | None = None,
+    since: int | None = None,
 ) -> list[WeatherReadingSchema]:
     """Get weather readings for a device with optional time range filter."""
     stmt = (
@@ -123,21 +353,14 @@ async def get_by_device(
         .where(WeatherReadingModel.device_id == device_id)
     )
     
+    if since is not None:
+        stmt = stmt.where(WeatherReadingModel.id > since)
     if start_time:
         stmt = stmt.where(WeatherReadingModel.recorded_at >= start_time)
     if end_time:
         stmt = stmt.where(WeatherReadingModel.recorded_at <= end_time)
     
-    stmt = (
-        stmt
-        .order_by(desc(WeatherReadingModel.recorded_at))
-        .offset(skip)
-        .limit(limit)
-    )
-    
-    result = await db.execute(stmt)
-    readings = result.scalars().all()
-    return [util.to_response(r) for r in readings]
+    return await _with_cold_page(db, stmt, [device_id], skip, limit, start_time, end_time, since)
 
 
 async def get_all(
@@ -147,10 +370,13 @@ async def get_all(
     start_time: datetime | None = None,
     end_time: datetime | None = None,
     device_ids: list[int] | None = None,
+    since: int | None = None,
 ) -> list[WeatherReadingSchema]:
     """Get all weather readings with optional filters."""
     stmt = select(WeatherReadingModel)
     
+    if since is not None:
+        stmt = stmt.where(WeatherReadingModel.id > since)
     if device_ids:
         stmt = stmt.where(WeatherReadingModel.device_id.in_(device_ids))
     if start_time:
@@ -158,31 +384,54 @@ async def get_all(
     if end_time:
         stmt = stmt.where(WeatherReadingModel.recorded_at <= end_time)
     
-    stmt = (
-        stmt
-        .order_by(desc(WeatherReadingModel.recorded_at))
-        .offset(skip)
-        .limit(limit)
+    return await _with_cold_page(
+        db, stmt, device_ids or None, skip, limit, start_time, end_time, since
     )
-    
-    result = await db.execute(stmt)
-    readings = result.scalars().all()
-    return [util.to_response(r) for r in readings]
 
 
-async def get_summary_by_device(
+async def get_window_rows(
     db: AsyncSession,
     device_id: int,
-    hours: int = 24,
-) -> WeatherSummary:
-    """Get aggregated weather summary for a device over specified hours."""
-    # 1) Load device (for location and existence check)
-    device = await db.get(DeviceModel, device_id)
-    if not device:
-        raise DeviceNotFoundError(f"Device {device_id} not found")
-
-    # 2) Aggregate readings
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+    start_time: datetime,
+    end_time: datetime,
+) -> list[Any]:
+    """
+    Every reading of a device in [start_time, end_time], raw and cold, by
+    time, as rows with recorded_at and one attribute per metric.
+    """
+    # end_time is inclusive; timestamps have microsecond resolution.
+    head, split = await _cold_head(
+        db, [device_id], start_time, end_time + timedelta(microseconds=1)
+    )
+    stmt = (
+        select(
+            WeatherReadingModel.recorded_at,
+            *(getattr(WeatherReadingModel, name) for name in util.METRICS),
+        )
+        .where(
+            WeatherReadingModel.device_id == device_id,
+            WeatherReadingModel.recorded_at >= split,
+            WeatherReadingModel.recorded_at <= end_time,
+        )
+        .order_by(WeatherReadingModel.recorded_at)
+    )
+    rows = list((await db.execute(stmt)).all())
+    if not len(head):
+        return rows
+    # head holds the cold readings and the raw rows before split.
+    return [SimpleNamespace(**r) for r in head.by_time().to_dicts()] + rows
+
+
+async def _summary_row(db: AsyncSession, device_id: int, cutoff: datetime, now: datetime) -> Any:
+    """The summary aggregates of a device's readings since cutoff, from the database."""
+    head, split = await _cold_head(db, [device_id], cutoff, now)
+    if len(head):
+        # Part of the window is cold: summarize it and the raw rest together.
+        tail = select(*chunk_service.RAW_COLUMNS).where(
+            WeatherReadingModel.device_id == device_id, WeatherReadingModel.recorded_at >= split
+        )
+        rest = chunk_service.Readings.from_rows((await db.execute(tail)).all())
+        return chunk_service.summarize(chunk_service.Readings.concat([head, rest]))
 
     stmt = (
         select(
@@ -202,9 +451,32 @@ async def get_summary_by_device(
             )
         )
     )
-
     result = await db.execute(stmt)
-    row = result.one_or_none()
+    return result.one_or_none()
+
+
+async def get_summary_by_device(
+    db: AsyncSession,
+    device_id: int,
+    hours: int = 24,
+) -> WeatherSummary:
+    """Get aggregated weather summary for a device over specified hours."""
+    # 1) Load device (for location and existence check)
+    device = await db.get(DeviceModel, device_id)
+    if not device:
+        raise DeviceNotFoundError(f"Device {device_id} not found")
+
+    # 2) Aggregate readings
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(hours=hours)
+
+    row = await summary_service.get(db, device_id, hours)
+    if row is None:
+        ring = await buffer_service.get(db, device_id, cutoff)
+        if ring is not None:
+            row = chunk_service.summarize(ring.readings(cutoff))
+        else:
+            row = await _summary_row(db, device_id, cutoff, now)
 
     if not row or row.reading_count == 0:
         raise NoReadingsFoundError(
@@ -231,10 +503,13 @@ async def count(
     device_id: int | None = None,
     start_time: datetime | None = None,
     end_time: datetime | None = None,
+    since: int | None = None,
 ) -> int:
     """Count weather readings with optional filters."""
     stmt = select(func.count()).select_from(WeatherReadingModel)
     
+    if since is not None:
+        stmt = stmt.where(WeatherReadingModel.id > since)
     if device_id:
         stmt = stmt.where(WeatherReadingModel.device_id == device_id)
     if start_time:
@@ -243,7 +518,19 @@ async def count(
         stmt = stmt.where(WeatherReadingModel.recorded_at <= end_time)
     
     result = await db.execute(stmt)
-    return result.scalar_one()
+    total = result.scalar_one()
+    if _cold_enabled():
+        device_ids = [device_id] if device_id else None
+        lower = util.as_aware(start_time) if start_time else chunk_service.from_micros(0)
+        upper = (
+            util.as_aware(end_time) + timedelta(microseconds=1)
+            if end_time else datetime.now(timezone.utc)
+        )
+        if _packing_enabled():
+            total += await chunk_service.count(db, device_ids, lower, upper, since)
+        if archive_service.enabled():
+            total += await asyncio.to_thread(archive_service.count, device_ids, lower, upper, since)
+    return total
 
 
 async def delete_old_readings(
@@ -264,8 +551,158 @@ async def delete_old_readings(
         await db.delete(reading)
     
     await db.flush()
+    packed_count, packed_devices = await chunk_service.delete_before(db, cutoff)
+    deleted_count += packed_count
+    if deleted_count:
+        await generation_service.bump(db, {r.device_id for r in readings} | packed_devices)
     return deleted_count
 
+def _aggregate_stmt(
+    bucket_seconds: int, by_device: bool = False, stats: bool = False
+) -> Select[Any]:
+    """
+    Per-bucket aggregates, ordered by bucket; callers add the filters.
+    by_device groups by (device_id, bucket) and adds a device_id column,
+    stats adds min, max, p50 and p95 of every metric (see util.STATS).
+    """
+    key = util.bucket_key(bucket_seconds)
+    bucket = util.bucket_start(key, bucket_seconds).label("bucket")
+    stmt = (
+        select(
+            bucket,
+            func.avg(WeatherReadingModel.temperature).label("temperature"),
+            func.avg(WeatherReadingModel.humidity).label("humidity"),
+            func.avg(WeatherReadingModel.pressure).label("pressure"),
+            func.avg(WeatherReadingModel.wind_speed).label("wind_speed"),
+            func.coalesce(func.sum(WeatherReadingModel.rain_amount), 0.0).label("rain_amount"),
+            # count(*) rather than count(id): id is not in the covering index.
+            func.count().label("reading_count"),
+        )
+        .group_by(key)
+        .order_by(key.asc())
+    )
+    if by_device:
+        stmt = (
+            stmt.add_columns(WeatherReadingModel.device_id)
+            .group_by(WeatherReadingModel.device_id)
+            .order_by(WeatherReadingModel.device_id)
+        )
+    if stats:
+        for name in util.METRICS:
+            column = getattr(WeatherReadingModel, name)
+            stmt = stmt.add_columns(
+                func.min(column).label(f"{name}_min"),
+                func.max(column).label(f"{name}_max"),
+                percentile(column, literal_column("0.5")).label(f"{name}_p50"),
+                percentile(column, literal_column("0.95")).label(f"{name}_p95"),
+            )
+    return stmt
+
+def _rollup_stmt(
+    rollup: TableClause,
+    ranges: Sequence[tuple[datetime, datetime]],
+    device_ids: Sequence[int] | None,
+    by_device: bool,
+) -> Select[Any]:
+    """
+    _aggregate_stmt's rows (without stats) of the whole buckets starting in
+    the ranges, from a continuous aggregate (app.db.timescale).
+    """
+    bucket = rollup.c.bucket
+    columns = []
+    for name in util.METRICS:
+        # Sums and averages of the stored units, typed like the column to scale them back.
+        scaled = getattr(WeatherReadingModel, name).type
+        value: ColumnElement[Any]
+        if name == "rain_amount":
+            value = func.coalesce(func.sum(rollup.c[f"{name}_sum"]), 0.0)
+        else:
+            counted = func.nullif(func.sum(rollup.c[f"{name}_count"]), 0)
+            value = cast(func.sum(rollup.c[f"{name}_sum"]), Float) / counted
+        columns.append(type_coerce(value, scaled).label(name))
+    stmt = (
+        select(
+            bucket.label("bucket"),
+            *columns,
+            cast(func.sum(rollup.c.reading_count), BigInteger).label("reading_count"),
+        )
+        .where(or_(*(and_(bucket >= start, bucket < end) for start, end in ranges)))
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+    if device_ids is not None:
+        stmt = stmt.where(rollup.c.device_id.in_(device_ids))
+    if by_device:
+        stmt = (
+            stmt.add_columns(rollup.c.device_id)
+            .group_by(rollup.c.device_id)
+            .order_by(rollup.c.device_id)
+        )
+    return stmt
+
+def _aggregate_between(
+    bucket_seconds: int,
+    ranges: Sequence[tuple[datetime, datetime]],
+    device_ids: Sequence[int] | None = None,
+    by_device: bool = False,
+    stats: bool = False,
+) -> Select[Any]:
+    """
+    _aggregate_stmt over the readings of the devices (None: all) recorded
+    in the half-open ranges. With a continuous aggregate for the bucket
+    length and no stats (it has no percentiles), whole buckets come from
+    the aggregate and only the partial ones at the range edges from the
+    table.
+    """
+    rollup = timescale.rollup_for(bucket_seconds) if not stats else None
+    whole: list[tuple[datetime, datetime]] = []
+    partial: list[tuple[datetime, datetime]] = []
+    for start, end in ranges:
+        start, end = util.as_aware(start), util.as_aware(end)
+        first = datetime.fromtimestamp(
+            util.bucket_floor(start.timestamp(), bucket_seconds), timezone.utc
+        )
+        if first < start:
+            first = util.bucket_end(first, bucket_seconds)
+        last = datetime.fromtimestamp(
+            util.bucket_floor(end.timestamp(), bucket_seconds), timezone.utc
+        )
+        if rollup is None or first >= last:
+            partial.append((start, end))
+            continue
+        whole.append((first, last))
+        partial += [
+            (edge_start, edge_end)
+            for edge_start, edge_end in [(start, first), (last, end)]
+            if edge_start < edge_end
+        ]
+
+    if device_ids is None:
+        # No index leads with recorded_minute; the recorded_at one serves all devices.
+        in_range = [
+            and_(WeatherReadingModel.recorded_at >= start, WeatherReadingModel.recorded_at < end)
+            for start, end in partial
+        ]
+    else:
+        in_range = [util.recorded_range(start, end, end_inclusive=False) for start, end in partial]
+    stmt = _aggregate_stmt(bucket_seconds, by_device=by_device, stats=stats).where(
+        or_(false(), *in_range)
+    )
+    if device_ids is not None:
+        stmt = stmt.where(
+            WeatherReadingModel.device_id == device_ids[0] if len(device_ids) == 1
+            else WeatherReadingModel.device_id.in_(device_ids)
+        )
+    if rollup is None or not whole:
+        return stmt
+
+    rolled = _rollup_stmt(rollup, whole, device_ids, by_device)
+    if not partial:
+        return rolled
+    both = union_all(stmt.order_by(None), rolled.order_by(None)).subquery()
+    order = [both.c.bucket, both.c.device_id] if by_device else [both.c.bucket]
+    return select(both).order_by(*order)
+
 async def get_aggregated_by_device(
     db: AsyncSession,
     device_id: int,
@@ -275,38 +712,37 @@ async def get_aggregated_by_device(
     auto_granularity: bool,
     skip: int = 0,
     limit: int = 100,
+    stats: bool = False,
 ) -> Tuple[list[WeatherReadingAggregate], WeatherGranularity]:
     effective, bucket_seconds = util.effective_granularity(start_time, end_time, granularity, auto_granularity)
 
     if limit > util.MAX_SERIES_POINTS:
         limit = util.MAX_SERIES_POINTS
 
-    bucket = util.bucket_expr(bucket_seconds).label("bucket")
+    end = end_time + timedelta(microseconds=1)
+    ring = await buffer_service.get(db, device_id, start_time)
+    if ring is not None:
+        window = ring.readings().within(util.as_aware(start_time), util.as_aware(end))
+        rows = chunk_service.aggregate(window, bucket_seconds, stats=stats)[skip:skip + limit]
+        return ([util.row_to_aggregate(r, device_id=device_id) for r in rows], effective)
+
+    head, split = await _cold_head(db, [device_id], start_time, end, bucket_seconds)
+    head_rows = chunk_service.aggregate(head, bucket_seconds, stats=stats)
+    rows = head_rows[skip:skip + limit]
+
     stmt = (
-        select(
-            bucket,
-            func.avg(WeatherReadingModel.temperature).label("temperature"),
-            func.avg(WeatherReadingModel.humidity).label("humidity"),
-            func.avg(WeatherReadingModel.pressure).label("pressure"),
-            func.avg(WeatherReadingModel.wind_speed).label("wind_speed"),
-            func.coalesce(func.sum(WeatherReadingModel.rain_amount), 0.0).label("rain_amount"),
-            func.count(WeatherReadingModel.id).label("reading_count"),
+        _aggregate_between(
+            bucket_seconds,
+            [(max(util.as_aware(start_time), split), end)],
+            [device_id],
+            stats=stats,
         )
-        .where(
-            and_(
-                WeatherReadingModel.device_id == device_id,
-                WeatherReadingModel.recorded_at >= start_time,
-                WeatherReadingModel.recorded_at <= end_time,
-            )
-        )
-        .group_by(bucket)
-        .order_by(bucket.asc())
-        .offset(skip)
-        .limit(limit)
+        .offset(max(skip - len(head_rows), 0))
+        .limit(limit - len(rows))
     )
 
     result = await db.execute(stmt)
-    rows = result.all()
+    rows += result.all()
     return ([util.row_to_aggregate(r, device_id=device_id) for r in rows], effective)
 
 async def get_aggregated_all(
@@ -317,37 +753,161 @@ async def get_aggregated_all(
     auto_granularity: bool,
     skip: int = 0,
     limit: int = 100,
+    stats: bool = False,
 ) -> Tuple[list[WeatherReadingAggregate], WeatherGranularity]:
     effective, bucket_seconds = util.effective_granularity(start_time, end_time, granularity, auto_granularity)
 
     if limit > util.MAX_SERIES_POINTS:
         limit = util.MAX_SERIES_POINTS
 
-    bucket = util.bucket_expr(bucket_seconds).label("bucket")
+    end = end_time + timedelta(microseconds=1)
+    head_rows, start = await _analytics_head(db, start_time, end, bucket_seconds, stats)
+    head, split = await _cold_head(db, None, start, end, bucket_seconds)
+    head_rows += chunk_service.aggregate(head, bucket_seconds, stats=stats)
+    rows = head_rows[skip:skip + limit]
+
     stmt = (
-        select(
-            bucket,
-            func.avg(WeatherReadingModel.temperature).label("temperature"),
-            func.avg(WeatherReadingModel.humidity).label("humidity"),
-            func.avg(WeatherReadingModel.pressure).label("pressure"),
-            func.avg(WeatherReadingModel.wind_speed).label("wind_speed"),
-            func.coalesce(func.sum(WeatherReadingModel.rain_amount), 0.0).label("rain_amount"),
-            func.count(WeatherReadingModel.id).label("reading_count"),
+        _aggregate_between(bucket_seconds, [(max(start, split), end)], stats=stats)
+        .offset(max(skip - len(head_rows), 0))
+        .limit(limit - len(rows))
+    )
+    result = await db.execute(stmt)
+    rows += result.all()
+    return ([util.row_to_aggregate(r, device_id=None) for r in rows], effective)
+
+async def get_aggregated_ranges(
+    db: AsyncSession,
+    bucket_seconds: int,
+    ranges: Sequence[tuple[datetime, datetime]],
+    device_id: int | None = None,
+    stats: bool = False,
+) -> list[WeatherReadingAggregate]:
+    """
+    Bucketed aggregates over several half-open [start, end) time ranges in
+    one query. device_id=None aggregates across all devices.
+    """
+    if device_id is not None and ranges:
+        ring = await buffer_service.get(db, device_id, min(start for start, _ in ranges))
+        if ring is not None:
+            readings = ring.readings()
+            window = chunk_service.Readings.concat([
+                readings.within(util.as_aware(start), util.as_aware(end)) for start, end in ranges
+            ])
+            rows = chunk_service.aggregate(window, bucket_seconds, stats=stats)
+            return [util.row_to_aggregate(r, device_id=device_id) for r in rows]
+
+    device_ids = None if device_id is None else [device_id]
+    heads = []
+    tails = []
+    rows = []
+    for start, end in ranges:
+        if device_id is None:
+            head_rows, start = await _analytics_head(db, start, end, bucket_seconds, stats)
+            rows += head_rows
+        head, split = await _cold_head(db, device_ids, start, end, bucket_seconds)
+        heads.append(head)
+        if split < util.as_aware(end):
+            tails.append((max(util.as_aware(start), split), end))
+    rows += chunk_service.aggregate(
+        chunk_service.Readings.concat(heads), bucket_seconds, stats=stats
+    )
+    rows.sort(key=lambda r: r.bucket)
+
+    if tails:
+        result = await db.execute(
+            _aggregate_between(bucket_seconds, tails, device_ids, stats=stats)
         )
+        rows = sorted([*rows, *result.all()], key=lambda r: r.bucket) if rows else result.all()
+    return [util.row_to_aggregate(r, device_id=device_id) for r in rows]
+
+async def get_aggregated_since(
+    db: AsyncSession,
+    device_id: int | None,
+    start_time: datetime,
+    end_time: datetime,
+    granularity: WeatherGranularity | None,
+    auto_granularity: bool,
+    since: int,
+    stats: bool = False,
+) -> Tuple[list[WeatherReadingAggregate], WeatherGranularity]:
+    """
+    Only the buckets of the window that got readings after the since
+    watermark, fully recomputed. device_id=None aggregates all devices.
+    """
+    start_time, end_time = util.as_aware(start_time), util.as_aware(end_time)
+    effective, bucket_seconds = util.effective_granularity(
+        start_time, end_time, granularity, auto_granularity
+    )
+
+    # Readings past the watermark are a short primary key range.
+    bucket = util.bucket_expr(bucket_seconds)
+    touched = (
+        select(bucket)
         .where(
             and_(
+                WeatherReadingModel.id > since,
                 WeatherReadingModel.recorded_at >= start_time,
                 WeatherReadingModel.recorded_at <= end_time,
             )
         )
-        .group_by(bucket)
-        .order_by(bucket.asc())
-        .offset(skip)
-        .limit(limit)
+        .distinct()
+    )
+    if device_id is not None:
+        touched = touched.where(WeatherReadingModel.device_id == device_id)
+    starts = sorted((await db.execute(touched)).scalars().all())
+    if not starts:
+        return [], effective
+
+    # end_time is inclusive; timestamps have microsecond resolution.
+    window_end = end_time + timedelta(microseconds=1)
+    ranges = [
+        (max(start, start_time), min(util.bucket_end(start, bucket_seconds), window_end))
+        for start in starts
+    ]
+    rows = await get_aggregated_ranges(
+        db, bucket_seconds, ranges, device_id=device_id, stats=stats
+    )
+    return rows, effective
+
+async def get_aggregated_matrix(
+    db: AsyncSession,
+    device_ids: Sequence[int],
+    start_time: datetime,
+    end_time: datetime,
+    granularity: WeatherGranularity | None,
+    auto_granularity: bool,
+    stats: bool = False,
+) -> WeatherSeriesMatrix:
+    """
+    Bucketed aggregates of several devices in one query, grouped by
+    (device_id, bucket) and aligned on a shared time axis.
+    """
+    effective, bucket_seconds = util.effective_granularity(
+        start_time, end_time, granularity, auto_granularity
+    )
+
+    end = end_time + timedelta(microseconds=1)
+    rings = await buffer_service.get_many(db, device_ids, start_time)
+    if rings is not None:
+        window = chunk_service.Readings.concat([
+            ring.readings().within(util.as_aware(start_time), util.as_aware(end)) for ring in rings
+        ])
+        rows = chunk_service.aggregate(window, bucket_seconds, by_device=True, stats=stats)
+        return util.rows_to_matrix(rows, device_ids, effective, stats)
+
+    head, split = await _cold_head(db, device_ids, start_time, end, bucket_seconds)
+    stmt = _aggregate_between(
+        bucket_seconds,
+        [(max(util.as_aware(start_time), split), end)],
+        device_ids,
+        by_device=True,
+        stats=stats,
     )
     result = await db.execute(stmt)
-    rows = result.all()
-    return ([util.row_to_aggregate(r, device_id=None) for r in rows], effective)
+    rows = [
+        *chunk_service.aggregate(head, bucket_seconds, by_device=True, stats=stats), *result.all()
+    ]
+    return util.rows_to_matrix(rows, device_ids, effective, stats)
 
 async def get_sensor_devices(db: AsyncSession) -> Sequence[DeviceModel]:
     """Get all devices configured as sensors."""
@@ -0,0 +1,101 @@
+"""
+Compression of integer columns, Gorilla style (Pelkonen et al., 2015).
+
+A column is stored as its first value(s) and the residuals of its
+successive differences: delta-of-delta (order 2) for timestamps taken at
+a steady rate, plain deltas (order 1) for slowly changing values. Gorilla
+XORs float bits; the metrics here are already fixed-point integers (see
+ScaledInteger), so their deltas are small integers to begin with.
+
+Residuals are zigzag encoded (small magnitudes of either sign become
+small unsigned numbers) and bit-packed at one width per column. The width
+minimises the packed size; values that do not fit are stored separately
+as exceptions, so one late reading doesn't widen the whole column. Both
+directions are vectorised with numpy.
+"""
+import struct
+
+import numpy as np
+import numpy.typing as npt
+
+Int64Array = npt.NDArray[np.int64]
+
+# Bytes per exception: its uint32 index and uint64 value.
+_EXCEPTION_BYTES = 12
+_POWERS_OF_TWO = np.left_shift(np.uint64(1), np.arange(64, dtype=np.uint64))
+_HEADER = struct.Struct("<BII")  # width, exception count, packed bytes
+
+
+def _zigzag(values: Int64Array) -> npt.NDArray[np.uint64]:
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def _unzigzag(values: npt.NDArray[np.uint64]) -> Int64Array:
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+
+def _best_width(values: npt.NDArray[np.uint64]) -> int:
+    """Bit width with the smallest packed size plus exceptions."""
+    widths = np.searchsorted(_POWERS_OF_TWO, values, side="right")
+    # Values that need more than w bits, for every w in 0..64.
+    exceeding = len(values) - np.cumsum(np.bincount(widths, minlength=65))
+    w = np.arange(65)
+    return int(np.argmin((len(values) * w + 7) // 8 + exceeding * _EXCEPTION_BYTES))
+
+
+def _pack(values: npt.NDArray[np.uint64]) -> bytes:
+    if len(values) == 0:
+        return _HEADER.pack(0, 0, 0)
+    width = _best_width(values)
+    limit = np.uint64(2**width - 1) if width < 64 else np.uint64(2**64 - 1)
+    exceptions = np.flatnonzero(values > limit).astype(np.uint32)
+    packed = b""
+    if width:
+        fitting = values.copy()
+        fitting[exceptions] = 0
+        shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+        bits = ((fitting[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+        packed = np.packbits(bits.ravel()).tobytes()
+    return b"".join((
+        _HEADER.pack(width, len(exceptions), len(packed)),
+        packed,
+        exceptions.tobytes(),
+        values[exceptions].tobytes(),
+    ))
+
+
+def _unpack(data: memoryview, offset: int, count: int) -> tuple[npt.NDArray[np.uint64], int]:
+    width, exception_count, packed_bytes = _HEADER.unpack_from(data, offset)
+    offset += _HEADER.size
+    values = np.zeros(count, dtype=np.uint64)
+    if width:
+        packed = np.frombuffer(data, np.uint8, packed_bytes, offset)
+        bits = np.unpackbits(packed, count=count * width)
+        # Left-pad every value to 64 bits and read the rows as big-endian words.
+        words = np.zeros((count, 64), dtype=np.uint8)
+        words[:, 64 - width:] = bits.reshape(count, width)
+        values = np.packbits(words, axis=1).view(">u8").ravel().astype(np.uint64)
+    offset += packed_bytes
+    indices = np.frombuffer(data, np.uint32, exception_count, offset)
+    offset += indices.nbytes
+    values[indices] = np.frombuffer(data, np.uint64, exception_count, offset)
+    return values, offset + exception_count * 8
+
+
+def encode(values: Int64Array, order: int) -> bytes:
+    """Encode an int64 column with differences of the given order (1 or 2)."""
+    heads = [np.diff(values[:order], n=level)[0] for level in range(min(order, len(values)))]
+    residuals = np.diff(values, n=order) if len(values) > order else np.empty(0, np.int64)
+    return np.asarray(heads, np.int64).tobytes() + _pack(_zigzag(residuals))
+
+
+def decode(data: memoryview, offset: int, count: int, order: int) -> tuple[Int64Array, int]:
+    """A column of count values written by encode at offset, and the offset after it."""
+    known = min(order, count)
+    heads = np.frombuffer(data, np.int64, known, offset)
+    residuals, offset = _unpack(data, offset + heads.nbytes, count - known)
+    values = _unzigzag(residuals)
+    # Every cumulative sum undoes one order of differencing.
+    for level in range(known - 1, -1, -1):
+        values = heads[level] + np.concatenate([[0], np.cumsum(values)])
+    return values.astype(np.int64), offset
@@ -0,0 +1,112 @@
+"""
+Payloads for display boards with little RAM.
+
+fields= picks which reading fields are sent, in the order given. Besides
+JSON there is a fixed-width text encoding that a board can parse with
+sscanf or plain offsets, without a JSON parser:
+
+    <watermark> <count>
+    <field> <field> ...        one line per reading
+
+Every field has a fixed width and fields are separated by one space, so a
+line is always the same length for a given fields=. Numbers are right
+aligned, a missing value is "-", a number that doesn't fit is all "#".
+Timestamps are epoch seconds and device_location is ASCII, cut or padded
+to its width.
+"""
+import json
+from datetime import datetime
+from typing import Sequence
+
+from app.schemas.weather_reading import (
+    DisplayFormat,
+    LatestReadings,
+    WeatherReadingWithLocation,
+)
+
+# Field -> (width, format spec) in the text encoding; also the fields allowed in fields=.
+TEXT_COLUMNS: dict[str, tuple[int, str]] = {
+    "device_id": (6, "d"),
+    "device_location": (16, "s"),
+    "temperature": (6, ".1f"),
+    "humidity": (5, ".1f"),
+    "pressure": (7, ".1f"),
+    "wind_speed": (6, ".1f"),
+    "rain_amount": (6, ".1f"),
+    "recorded_at": (10, "d"),
+    "id": (10, "d"),
+    "created_at": (10, "d"),
+}
+
+MEDIA_TYPES = {
+    DisplayFormat.json: "application/json",
+    DisplayFormat.text: "text/plain; charset=us-ascii",
+}
+
+
+def parse_fields(value: str | None) -> tuple[str, ...] | None:
+    """
+    Fields of a comma separated fields= parameter, in order and without
+    duplicates; None when every field should be sent.
+    """
+    if value is None or not value.strip():
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in TEXT_COLUMNS]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields {unknown}, expected any of {list(TEXT_COLUMNS)}"
+        )
+    return fields
+
+
+def _text_value(value: object, width: int, spec: str) -> str:
+    if value is None:
+        return "-".rjust(width)
+    if isinstance(value, datetime):
+        value = int(value.timestamp())
+    if spec == "s":
+        text = str(value).encode("ascii", "replace").decode()
+        return text[:width].ljust(width)
+    text = format(value, spec).rjust(width)
+    return text if len(text) == width else "#" * width
+
+
+def text_line(reading: WeatherReadingWithLocation, fields: Sequence[str]) -> str:
+    return " ".join(
+        _text_value(getattr(reading, f), *TEXT_COLUMNS[f]) for f in fields
+    )
+
+
+def render(
+    readings: Sequence[WeatherReadingWithLocation],
+    fields: tuple[str, ...] | None,
+    fmt: DisplayFormat,
+    watermark: int,
+    fetched_at: datetime,
+) -> bytes:
+    """Body of a latest readings response, projected to fields and encoded."""
+    if fmt is DisplayFormat.text:
+        lines = [f"{watermark} {len(readings)}"]
+        lines += [text_line(r, fields or tuple(TEXT_COLUMNS)) for r in readings]
+        return ("\n".join(lines) + "\n").encode("ascii")
+    body = LatestReadings(readings=readings, fetched_at=fetched_at, watermark=watermark)
+    if fields is None:
+        return body.model_dump_json().encode()
+    data = body.model_dump(mode="json")
+    data["readings"] = [{f: r[f] for f in fields} for r in data["readings"]]
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def render_one(
+    reading: WeatherReadingWithLocation,
+    fields: tuple[str, ...] | None,
+    fmt: DisplayFormat,
+) -> bytes:
+    """Body of a single reading response, projected to fields and encoded."""
+    if fmt is DisplayFormat.text:
+        return (text_line(reading, fields or tuple(TEXT_COLUMNS)) + "\n").encode("ascii")
+    if fields is None:
+        return reading.model_dump_json().encode()
+    data = reading.model_dump(mode="json")
+    return json.dumps({f: data[f] for f in fields}, separators=(",", ":")).encode()
@@ -0,0 +1,57 @@
+import hashlib
+import time
+from datetime import datetime
+from typing import Any
+
+from fastapi import Response, status
+
+from app.core.config import settings
+
+REVALIDATE = "private, no-cache"
+
+
+def etag(version: int, *parts: Any) -> str:
+    """
+    Weak ETag for a response built from data at `version`; parts are
+    everything else the body depends on (endpoint, resolved parameters).
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+
+def cache_control(end_time: datetime | None) -> str:
+    """
+    Windows that ended before the cache grace period can be kept by the
+    client for HTTP_HISTORY_MAX_AGE; anything else must be revalidated.
+
+    Responses are private: the endpoints are authenticated, so a shared
+    cache must not hand them to other clients.
+    """
+    # Naive datetimes count as local time here, as they do for asyncpg.
+    settled = time.time() - settings.AGG_CACHE_GRACE_SECONDS
+    if end_time is not None and end_time.timestamp() <= settled:
+        return f"private, max-age={settings.HTTP_HISTORY_MAX_AGE}"
+    return REVALIDATE
+
+
+def matches(if_none_match: str | None, tag: str) -> bool:
+    """If-None-Match check, with the weak comparison GET requests use."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = tag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == bare
+        for candidate in if_none_match.split(",")
+    )
+
+
+def headers(tag: str, cache_control_value: str = REVALIDATE) -> dict[str, str]:
+    return {"ETag": tag, "Cache-Control": cache_control_value}
+
+
+def not_modified(tag: str, cache_control_value: str = REVALIDATE) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers=headers(tag, cache_control_value)
+    )
@@ -0,0 +1,44 @@
+"""
+Largest-Triangle-Three-Buckets downsampling (Steinarsson, 2013).
+
+Keeps the first and last point and, from each of n - 2 equal-count buckets
+in between, the point forming the largest triangle with the point kept
+from the previous bucket and the average of the next bucket. Unlike
+averaging into coarser buckets this keeps spikes where they are, so a
+chart of the n points looks like a chart of all of them.
+"""
+import numpy as np
+import numpy.typing as npt
+
+
+def lttb(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], n: int) -> npt.NDArray[np.intp]:
+    """
+    Indices of the n points of (x, y) that LTTB keeps, ascending.
+
+    x must be sorted. All indices are returned when there are no more than
+    n points, or n is below 3.
+    """
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+
+    # n - 2 buckets over the points between the first and the last one.
+    edges = np.linspace(1, size - 1, n - 1).astype(np.intp)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:size - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:size - 1], edges[:-1] - 1) / counts
+    # The third corner for bucket i is the average of bucket i + 1, or the last point.
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n, dtype=np.intp)
+    selected[0], selected[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # Twice the triangle area; the factor doesn't change the argmax.
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
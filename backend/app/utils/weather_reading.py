@@ -1,20 +1,40 @@
-from datetime import datetime, timedelta
-from typing import Any
+from datetime import datetime, timedelta, timezone
+from typing import Any, Sequence
+from zoneinfo import ZoneInfo
 
-from click import DateTime
-from sqlalchemy import ColumnElement, func
+from sqlalchemy import ColumnElement, and_, literal_column, or_
+
+from app.core.config import settings
+from app.db.functions import LOCAL_BUCKET_ORIGIN, from_epoch, local_bucket
+from app.db.types import ScaledInteger
 
 from app.models.weather_reading import WeatherReading as WeatherReadingModel
 from app.schemas.weather_reading import (
+    DeviceSeries,
+    MetricStats,
+    MetricStatsSeries,
     WeatherGranularity,
+    WeatherSeriesMatrix,
     WeatherReadingAggregate,
     WeatherReading as WeatherReadingSchema,
     WeatherReadingWithLocation
 )
 
+METRICS = ("temperature", "humidity", "pressure", "wind_speed", "rain_amount")
+# Units of 1/scale the metrics are stored in (ScaledInteger).
+METRIC_SCALES = {
+    c.name: c.type.scale
+    for c in WeatherReadingModel.__table__.c
+    if isinstance(c.type, ScaledInteger)
+}
+# Per-bucket spread of each metric; aggregate columns are named f"{metric}_{stat}".
+STATS = ("min", "max", "p50", "p95")
+
 # ---- Aggregation controls (payload protection) ----
 MAX_SERIES_POINTS = 2000
 DEFAULT_AGG_LOOKBACK = timedelta(hours=24)
+# Summaries of other lengths than SUMMARY_WINDOWS_HOURS scan the readings.
+MAX_SUMMARY_SCAN_HOURS = 168
 
 _GRANULARITY_TO_SECONDS: dict[WeatherGranularity, int] = {
     WeatherGranularity.minute: 60,
@@ -25,6 +45,23 @@ _GRANULARITY_TO_SECONDS: dict[WeatherGranularity, int] = {
     WeatherGranularity.day: 24 * 60 * 60,
 }
 
+def granularity_seconds(granularity: WeatherGranularity) -> int:
+    return _GRANULARITY_TO_SECONDS[granularity]
+
+def as_aware(value: datetime) -> datetime:
+    """Naive datetimes are local time, the same way asyncpg binds them."""
+    return value if value.tzinfo is not None else value.astimezone()
+
+def raw_table_hours() -> int | None:
+    """
+    How many hours back weather_readings holds every reading (None: all
+    time); packed and archived readings are elsewhere.
+    """
+    days = [settings.CHUNK_AFTER_DAYS] if settings.CHUNK_AFTER_DAYS > 0 else []
+    if settings.ARCHIVE_DIR is not None:
+        days.append(settings.ARCHIVE_AFTER_DAYS)
+    return min(days) * 24 if days else None
+
 def to_response(reading: WeatherReadingModel) -> WeatherReadingSchema:
     """Convert DB model to response schema."""
     return WeatherReadingSchema(
@@ -114,16 +151,105 @@ def effective_granularity(
 
     return WeatherGranularity.hour, _GRANULARITY_TO_SECONDS[WeatherGranularity.hour]
 
-def bucket_expr(bucket_seconds: int) -> ColumnElement[DateTime]:
+# ---- Bucket alignment ----
+# Buckets longer than an hour (6hour, day) follow the local clock of
+# TIMEZONE_STR, so a day bucket is a local calendar day (23 or 25 hours
+# long across a DST change). Shorter buckets are the same in every
+# whole-hour zone and stay aligned to the epoch.
+LOCAL_TZ = ZoneInfo(settings.TIMEZONE_STR)
+
+def is_local_bucket(bucket_seconds: int) -> bool:
+    return bucket_seconds > 3600
+
+def _floor_wall(ts: float, bucket_seconds: int) -> datetime:
+    wall = datetime.fromtimestamp(ts, LOCAL_TZ).replace(tzinfo=None)
+    step = timedelta(seconds=bucket_seconds)
+    return LOCAL_BUCKET_ORIGIN + (wall - LOCAL_BUCKET_ORIGIN) // step * step
+
+def _from_wall(wall: datetime) -> float:
+    """
+    Epoch of a local wall time. Ambiguous and skipped times resolve to the
+    later instant, as PostgreSQL's AT TIME ZONE does.
+    """
+    return max(wall.replace(tzinfo=LOCAL_TZ, fold=fold).timestamp() for fold in (0, 1))
+
+def bucket_floor(ts: float, bucket_seconds: int) -> int:
+    """Start (epoch seconds) of the bucket containing ts, as bucket_expr computes it."""
+    if not is_local_bucket(bucket_seconds):
+        return int(ts // bucket_seconds) * bucket_seconds
+    return int(_from_wall(_floor_wall(ts, bucket_seconds)))
+
+def bucket_next(start: float, bucket_seconds: int) -> int:
+    """Start (epoch seconds) of the bucket after the one containing start."""
+    if not is_local_bucket(bucket_seconds):
+        return bucket_floor(start, bucket_seconds) + bucket_seconds
+    return int(_from_wall(_floor_wall(start, bucket_seconds) + timedelta(seconds=bucket_seconds)))
+
+def bucket_starts(first: float, last: float, bucket_seconds: int) -> list[int]:
+    """
+    Starts (epoch seconds) of the buckets from the one containing first to
+    the one containing last.
+    """
+    starts = [bucket_floor(first, bucket_seconds)]
+    while (start := bucket_next(starts[-1], bucket_seconds)) <= last:
+        starts.append(start)
+    return starts
+
+def bucket_end(start: datetime, bucket_seconds: int) -> datetime:
+    """End of the bucket that starts at start."""
+    return datetime.fromtimestamp(bucket_next(start.timestamp(), bucket_seconds), timezone.utc)
+
+def bucket_key(bucket_seconds: int) -> ColumnElement[Any]:
+    """
+    What aggregation groups and orders by. Epoch-aligned buckets use the
+    stored recorded_minute column (the first minute of the bucket), so
+    minute buckets can be aggregated in (device_id, recorded_minute) index
+    order. Local buckets use their start time.
+    """
+    if is_local_bucket(bucket_seconds):
+        return local_bucket(WeatherReadingModel.recorded_at, literal_column(str(bucket_seconds)))
+    minutes = WeatherReadingModel.recorded_minute.expression
+    step = bucket_seconds // 60
+    return minutes if step == 1 else minutes - minutes % step
+
+def bucket_start(key: ColumnElement[Any], bucket_seconds: int) -> ColumnElement[datetime]:
+    """Bucket start time of a bucket_key; computed once per group, not per row."""
+    if is_local_bucket(bucket_seconds):
+        return key
+    return from_epoch(key * 60)
+
+def bucket_expr(bucket_seconds: int) -> ColumnElement[datetime]:
     """
     Bucket expression.
     """
-    # Default (Postgres-compatible)
-    return func.to_timestamp(
-        func.floor(func.extract("epoch", WeatherReadingModel.recorded_at) / bucket_seconds)
-        * bucket_seconds
+    return bucket_start(bucket_key(bucket_seconds), bucket_seconds)
+
+def recorded_range(
+    start_time: datetime, end_time: datetime, end_inclusive: bool = True
+) -> ColumnElement[bool]:
+    """
+    recorded_at within start_time..end_time, written as a recorded_minute
+    range so an index on (device_id, recorded_minute) serves it in bucket
+    order. recorded_at is only compared in the first and the last minute.
+    """
+    minute = WeatherReadingModel.recorded_minute
+    recorded_at = WeatherReadingModel.recorded_at
+    first, last = int(start_time.timestamp() // 60), int(end_time.timestamp() // 60)
+    return and_(
+        minute.between(first, last),
+        or_(minute > first, recorded_at >= start_time),
+        or_(minute < last, recorded_at <= end_time if end_inclusive else recorded_at < end_time),
     )
 
+def has_stats(row: Any) -> bool:
+    return hasattr(row, "temperature_min")
+
+def row_stats(row: Any) -> dict[str, MetricStats]:
+    return {
+        name: MetricStats(**{stat: getattr(row, f"{name}_{stat}") for stat in STATS})
+        for name in METRICS
+    }
+
 def row_to_aggregate(row: Any, device_id: int | None = None) -> WeatherReadingAggregate:
     return WeatherReadingAggregate(
         device_id=device_id,
@@ -134,4 +260,55 @@ def row_to_aggregate(row: Any, device_id: int | None = None) -> WeatherReadingAg
         wind_speed=row.wind_speed,
         rain_amount=row.rain_amount,
         reading_count=row.reading_count,
-    )
\ No newline at end of file
+        stats=row_stats(row) if has_stats(row) else None,
+    )
+def rows_to_matrix(
+    rows: Sequence[Any],
+    device_ids: Sequence[int],
+    granularity: WeatherGranularity,
+    stats: bool = False,
+) -> WeatherSeriesMatrix:
+    """
+    Build a matrix from aggregate rows with a device_id, ordered by bucket;
+    stats when the rows have the per-metric stat columns.
+    """
+    timestamps: list[datetime] = []
+    cells: list[tuple[int, Any]] = []
+    for row in rows:
+        if not timestamps or timestamps[-1] != row.bucket:
+            timestamps.append(row.bucket)
+        cells.append((len(timestamps) - 1, row))
+
+    size = len(timestamps)
+    names = list(METRICS)
+    if stats:
+        names += [f"{name}_{stat}" for name in METRICS for stat in STATS]
+    columns = {
+        device_id: {name: [None] * size for name in names} | {"reading_count": [0] * size}
+        for device_id in device_ids
+    }
+    for index, row in cells:
+        column = columns.get(row.device_id)
+        if column is None:
+            continue
+        for name in names:
+            column[name][index] = getattr(row, name)
+        column["reading_count"][index] = row.reading_count
+
+    def series(device_id: int) -> DeviceSeries:
+        column = columns[device_id]
+        return DeviceSeries(
+            device_id=device_id,
+            reading_count=column["reading_count"],
+            stats={
+                name: MetricStatsSeries(**{stat: column[f"{name}_{stat}"] for stat in STATS})
+                for name in METRICS
+            } if stats else None,
+            **{name: column[name] for name in METRICS},
+        )
+
+    return WeatherSeriesMatrix(
+        granularity=granularity,
+        timestamps=timestamps,
+        devices=[series(d) for d in device_ids],
+    )
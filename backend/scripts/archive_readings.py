@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Move readings older than ARCHIVE_AFTER_DAYS into the Parquet archive.
+
+Every UTC day that ended more than ARCHIVE_AFTER_DAYS days ago is moved
+out of the database, raw rows and packed chunks alike, into one new part
+per device and month under ARCHIVE_DIR (see app.services.reading_archive),
+and the manifest is updated. Each device and month is committed on its
+own; if the commit fails its part is removed again and the manifest
+restored. Run it daily or monthly, e.g. from cron. Back up ARCHIVE_DIR:
+archived readings exist nowhere else.
+
+Examples:
+  ARCHIVE_DIR=/data/archive uv run -m scripts.archive_readings
+  ARCHIVE_DIR=/data/archive uv run -m scripts.archive_readings --days 180
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.services.reading_archive as archive_service
+import app.services.reading_chunk as chunk_service
+from app.core.config import Workload, WorkloadLimits, settings
+from app.db.session import create_engine_for
+
+
+async def archive(factory: async_sessionmaker[AsyncSession], days: int) -> None:
+    cutoff = chunk_service.window_start(datetime.now(timezone.utc) - timedelta(days=days))
+    async with factory() as db:
+        months = await archive_service.months_before(db, cutoff)
+    print(f"{len(months)} device months with readings before {cutoff:%Y-%m-%d}")
+
+    moved = 0
+    started = time.perf_counter()
+    for device_id, month in months:
+        async with factory() as db:
+            part = await archive_service.move_month(db, device_id, month, cutoff)
+            if part is None:
+                continue
+            previous = archive_service.read_manifest()
+            archived_before = max(cutoff, previous.archived_before or cutoff)
+            manifest = archive_service.Manifest(archived_before, (*previous.parts, part))
+            archive_service.write_manifest(manifest)
+            try:
+                await db.commit()
+            except BaseException:
+                archive_service.write_manifest(previous)
+                archive_service.remove_part(part)
+                raise
+            moved += part.rows
+            print(f"  device {device_id} {month:%Y-%m}: {part.rows:,} readings -> {part.path}")
+    print(f"archived {moved:,} readings in {time.perf_counter() - started:.1f} s")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--days", type=int, default=settings.ARCHIVE_AFTER_DAYS,
+        help="archive days that ended this many days ago (default: ARCHIVE_AFTER_DAYS)",
+    )
+    args = parser.parse_args()
+    if not archive_service.enabled():
+        parser.error("set ARCHIVE_DIR first: archived readings are only read while it is set")
+    if args.days <= 0:
+        parser.error("--days must be positive")
+
+    # A month of readings is moved in one statement; don't let the admin
+    # statement_timeout cut it off.
+    limits = WorkloadLimits(pool_size=1, pool_timeout=30, statement_timeout_ms=0)
+    engine = create_engine_for(Workload.admin, limits, settings.engine_profile)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        await archive(factory, args.days)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Compare bucketed aggregation grouped on the stored recorded_minute column
+(index-ordered, what the service runs) with the per-row expression over
+recorded_at it replaced, on a large synthetic table.
+
+Throwaway sensors get one reading per minute each, inserted server side
+with generate_series. Every query shape runs as EXPLAIN (ANALYZE, BUFFERS)
+for both variants; the plan's top nodes and the median execution time are
+printed. The sensors and their readings are deleted afterwards unless
+--keep is given (a later run with --reuse skips the insert).
+
+Examples:
+  # 10M readings over 20 sensors (about a year each)
+  uv run -m scripts.bench_bucket_index --rows 10000000 --devices 20
+
+  # quick run on a small table
+  uv run -m scripts.bench_bucket_index --rows 200000 --devices 4 --runs 3
+"""
+import argparse
+import asyncio
+import statistics
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import Select, and_, delete, func, make_url, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.services.weather_reading as weather_service
+import app.utils.weather_reading as util
+from app.core.config import Workload, WorkloadLimits, settings
+from app.db.session import create_engine_for
+from app.models.device import Device, DeviceFunction, DeviceType
+from app.models.weather_reading import WeatherReading
+
+LOCATION_PREFIX = "bench-bucket-"
+
+
+@dataclass(frozen=True)
+class Shape:
+    label: str
+    window: timedelta
+    bucket_seconds: int
+    devices: int | None  # None: across all devices; 1: one sensor; n > 1: matrix of n sensors
+
+
+SHAPES = (
+    Shape("1 sensor, 24h by minute", timedelta(hours=24), 60, 1),
+    Shape("1 sensor, 7d by 15min", timedelta(days=7), 900, 1),
+    Shape("1 sensor, 30d by hour", timedelta(days=30), 3600, 1),
+    Shape("10 sensors, 24h by minute", timedelta(hours=24), 60, 10),
+    Shape("all sensors, 24h by 5min", timedelta(hours=24), 300, None),
+)
+
+
+def expression_stmt(bucket_seconds: int, by_device: bool) -> Select[Any]:
+    """The aggregation as it was before recorded_minute: grouped per row on recorded_at."""
+    bucket = func.to_timestamp(
+        func.floor(func.extract("epoch", WeatherReading.recorded_at) / bucket_seconds)
+        * bucket_seconds
+    ).label("bucket")
+    stmt = (
+        select(
+            bucket,
+            func.avg(WeatherReading.temperature).label("temperature"),
+            func.avg(WeatherReading.humidity).label("humidity"),
+            func.avg(WeatherReading.pressure).label("pressure"),
+            func.avg(WeatherReading.wind_speed).label("wind_speed"),
+            func.coalesce(func.sum(WeatherReading.rain_amount), 0.0).label("rain_amount"),
+            func.count(WeatherReading.id).label("reading_count"),
+        )
+        .group_by(bucket)
+        .order_by(bucket.asc())
+    )
+    if by_device:
+        stmt = (
+            stmt.add_columns(WeatherReading.device_id)
+            .group_by(WeatherReading.device_id)
+            .order_by(WeatherReading.device_id)
+        )
+    return stmt
+
+
+def build(shape: Shape, device_ids: list[int], end: datetime, stored: bool) -> Select[Any]:
+    start = end - shape.window
+    by_device = shape.devices is not None and shape.devices > 1
+    if stored:
+        stmt = weather_service._aggregate_stmt(shape.bucket_seconds, by_device=by_device)
+    else:
+        stmt = expression_stmt(shape.bucket_seconds, by_device)
+    if stored and shape.devices:
+        stmt = stmt.where(util.recorded_range(start, end))
+    else:
+        stmt = stmt.where(
+            and_(WeatherReading.recorded_at >= start, WeatherReading.recorded_at <= end)
+        )
+    if shape.devices == 1:
+        stmt = stmt.where(WeatherReading.device_id == device_ids[0])
+    elif shape.devices:
+        stmt = stmt.where(WeatherReading.device_id.in_(device_ids[:shape.devices]))
+    return stmt
+
+
+async def explain(db: AsyncSession, stmt: Select[Any]) -> tuple[float, list[str]]:
+    sql = str(stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+    result = await db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"))
+    plan = result.scalar_one()[0]
+    nodes: list[str] = []
+
+    def walk(node: dict[str, Any], depth: int) -> None:
+        detail = node.get("Index Name") or node.get("Strategy") or ""
+        nodes.append(f"{'  ' * depth}{node['Node Type']} {detail}".rstrip())
+        for child in node.get("Plans", ()):
+            walk(child, depth + 1)
+
+    walk(plan["Plan"], 0)
+    return plan["Execution Time"], nodes
+
+
+async def seed(db: AsyncSession, rows: int, devices: int, end: datetime) -> list[int]:
+    per_device = rows // devices
+    ids = []
+    # Metrics are written in the stored fixed-point units (see WeatherReading).
+    for i in range(devices):
+        device = Device(
+            type=DeviceType.ESP32, location=f"{LOCATION_PREFIX}{i}", function=DeviceFunction.SENSOR
+        )
+        db.add(device)
+        await db.flush()
+        ids.append(device.id)
+        await db.execute(
+            text(
+                """
+                INSERT INTO weather_readings
+                    (device_id, temperature, humidity, pressure, wind_speed, rain_amount,
+                     recorded_at)
+                SELECT :device_id, 2000 + n % 60 * 10, (50 + n % 7) * 100, (1000 + n % 13) * 10,
+                       n % 5 * 50,
+                       CASE WHEN n % 50 = 0 THEN 20 ELSE 0 END,
+                       CAST(:end AS timestamptz) - make_interval(mins => n)
+                FROM generate_series(0, :count - 1) AS n
+                """
+            ),
+            {"device_id": device.id, "end": end, "count": per_device},
+        )
+        await db.commit()
+        print(f"  sensor {i + 1}/{devices}: {per_device} readings")
+    await db.execute(text("ANALYZE weather_readings"))
+    return ids
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument(
+        "--runs", type=int, default=5, help="EXPLAIN ANALYZE runs per query, median is reported",
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the sensors and readings afterwards",
+    )
+    parser.add_argument(
+        "--reuse", action="store_true", help="use sensors kept by an earlier --keep run",
+    )
+    args = parser.parse_args()
+
+    print(f"Database: {make_url(str(settings.DATABASE_URL)).host}")
+    end = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    # Seeding and cold plans take longer than any workload's statement_timeout.
+    limits = WorkloadLimits(pool_size=1, pool_timeout=30, statement_timeout_ms=0)
+    engine = create_engine_for(Workload.admin, limits, settings.engine_profile)
+    try:
+        async with async_sessionmaker(engine, class_=AsyncSession)() as db:
+            if args.reuse:
+                found = await db.execute(
+                    select(Device.id, func.max(WeatherReading.recorded_at))
+                    .join(WeatherReading)
+                    .where(Device.location.like(f"{LOCATION_PREFIX}%"))
+                    .group_by(Device.id)
+                    .order_by(Device.id)
+                )
+                kept = found.all()
+                device_ids = [row[0] for row in kept]
+                end = max(row[1] for row in kept)
+            else:
+                print(f"Inserting {args.rows} readings for {args.devices} sensors")
+                device_ids = await seed(db, args.rows, args.devices, end)
+
+            for shape in SHAPES:
+                print(f"\n{shape.label}")
+                for stored in (False, True):
+                    times = []
+                    for _ in range(args.runs):
+                        elapsed, nodes = await explain(db, build(shape, device_ids, end, stored))
+                        times.append(elapsed)
+                    variant = "recorded_minute" if stored else "expression"
+                    print(f"  {variant:<16} {statistics.median(times):>9.2f} ms")
+                    for node in nodes[:6]:
+                        print(f"    {node}")
+            await db.rollback()
+
+            if not args.keep:
+                await db.execute(delete(Device).where(Device.location.like(f"{LOCATION_PREFIX}%")))
+                await db.commit()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark the engine profiles (app.core.config.ENGINE_PROFILES) against a
+real database, for the two query shapes that matter most: single-row
+ingestion and bucketed aggregation.
+
+A throwaway sensor device is created for the run and deleted afterwards
+(its readings go with it through ON DELETE CASCADE).
+
+Examples:
+  # all profiles, defaults (2000 inserts, 200 aggregations, concurrency 16)
+  uv run -m scripts.bench_engine_profiles
+
+  # compare two profiles with more load
+  uv run -m scripts.bench_engine_profiles --profiles default throughput \
+      --inserts 10000 --concurrency 32
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+import app.services.weather_reading as weather_service
+from app.core.config import ENGINE_PROFILES, Workload, WorkloadLimits, settings
+from app.db.session import create_engine_for
+from app.models.device import Device, DeviceFunction, DeviceType
+from app.schemas.weather_reading import WeatherGranularity, WeatherReadingCreate
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_concurrently(
+    count: int,
+    concurrency: int,
+    op: Callable[[int], Awaitable[None]],
+) -> tuple[float, list[float]]:
+    """Run op(i) count times with at most `concurrency` in flight."""
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await op(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(count)))
+    return time.perf_counter() - started, latencies
+
+
+def report(profile: str, label: str, count: int, elapsed: float, latencies: list[float]) -> None:
+    print(
+        f"{profile:<12} {label:<12} {count / elapsed:>9.1f} ops/s  "
+        f"p50 {statistics.median(latencies):>7.2f} ms  "
+        f"p95 {percentile(latencies, 95):>7.2f} ms"
+    )
+
+
+async def bench_profile(name: str, args: argparse.Namespace) -> None:
+    limits = WorkloadLimits(
+        pool_size=args.concurrency,
+        max_overflow=0,
+        pool_timeout=30,
+        statement_timeout_ms=0,
+    )
+    engine: AsyncEngine = create_engine_for(Workload.admin, limits, ENGINE_PROFILES[name])
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with factory() as db:
+        device = Device(
+            type=DeviceType.ESP32,
+            location=f"bench-{name}",
+            function=DeviceFunction.SENSOR,
+        )
+        db.add(device)
+        await db.commit()
+        device_id = device.id
+
+    start = datetime.now(timezone.utc) - timedelta(minutes=args.inserts)
+
+    async def ingest(i: int) -> None:
+        async with factory() as db:
+            await weather_service.create(
+                db,
+                device_id,
+                WeatherReadingCreate(
+                    temperature=20 + (i % 10) / 10,
+                    humidity=50,
+                    pressure=1010,
+                    wind_speed=1.5,
+                    rain_amount=0,
+                    recorded_at=start + timedelta(minutes=i),
+                ),
+            )
+            await db.commit()
+
+    async def aggregate(i: int) -> None:
+        async with factory() as db:
+            if i % 2:
+                await weather_service.get_aggregated_by_device(
+                    db,
+                    device_id=device_id,
+                    start_time=start,
+                    end_time=start + timedelta(minutes=args.inserts),
+                    granularity=None,
+                    auto_granularity=True,
+                    limit=2000,
+                )
+            else:
+                await weather_service.get_aggregated_all(
+                    db,
+                    start_time=start,
+                    end_time=start + timedelta(minutes=args.inserts),
+                    granularity=WeatherGranularity.hour,
+                    auto_granularity=False,
+                    limit=2000,
+                )
+
+    try:
+        elapsed, latencies = await run_concurrently(args.inserts, args.concurrency, ingest)
+        report(name, "ingest", args.inserts, elapsed, latencies)
+        elapsed, latencies = await run_concurrently(args.aggregations, args.concurrency, aggregate)
+        report(name, "aggregate", args.aggregations, elapsed, latencies)
+    finally:
+        async with factory() as db:
+            device_row = await db.get(Device, device_id)
+            if device_row:
+                await db.delete(device_row)
+                await db.commit()
+        await engine.dispose()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--profiles", nargs="+", default=list(ENGINE_PROFILES), choices=list(ENGINE_PROFILES),
+    )
+    parser.add_argument("--inserts", type=int, default=2000)
+    parser.add_argument("--aggregations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"Database: {make_url(str(settings.DATABASE_URL)).host}")
+    for name in args.profiles:
+        if ENGINE_PROFILES[name].echo:
+            print(f"{name:<12} skipped (echo profile)")
+            continue
+        await bench_profile(name, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
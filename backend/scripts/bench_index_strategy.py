@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Compare index strategies for weather_readings at several table sizes.
+
+  btree           B-tree on recorded_at, plain (device_id, recorded_minute)
+  covering        B-tree on recorded_at, (device_id, recorded_minute)
+                  INCLUDE (recorded_at and the metrics): what the models define
+  brin+covering   as covering, with a BRIN index on recorded_at instead
+
+For every size, throwaway sensors get one reading per minute each,
+inserted in recorded_at order across sensors as live ingest writes them,
+then vacuumed so the visibility map allows index-only scans. Each
+strategy is built inside a transaction that is rolled back afterwards, so
+the schema is left as it was. The service's aggregation statements, the
+raw all-device page and its count run as EXPLAIN (ANALYZE, BUFFERS); the
+median execution time, heap fetches and top plan nodes are printed along
+with the size of each index.
+
+Run it against a scratch database: building an index variant locks the
+table, and other readings in it take part in every scan.
+
+Examples:
+  uv run -m scripts.bench_index_strategy --sizes 1000000 4000000 10000000
+  uv run -m scripts.bench_index_strategy --sizes 200000 --devices 4 --runs 3
+"""
+import argparse
+import asyncio
+import statistics
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from sqlalchemy import Select, and_, delete, desc, func, make_url, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+import app.services.weather_reading as weather_service
+import app.utils.weather_reading as util
+from app.core.config import Workload, WorkloadLimits, settings
+from app.db.session import create_engine_for
+from app.models.device import Device, DeviceFunction, DeviceType
+from app.models.weather_reading import WeatherReading
+
+LOCATION_PREFIX = "bench-index-"
+# Minutes of readings inserted per statement while seeding.
+SEED_CHUNK_MINUTES = 20_000
+
+COVERING_DEVICE_MINUTE = (
+    "CREATE INDEX ix_weather_readings_device_minute "
+    "ON weather_readings (device_id, recorded_minute) "
+    f"INCLUDE (recorded_at, {', '.join(util.METRICS)})"
+)
+VARIABLE_INDEXES = ("ix_weather_readings_recorded_at", "ix_weather_readings_device_minute")
+STRATEGIES = {
+    "btree": (
+        "CREATE INDEX ix_weather_readings_recorded_at ON weather_readings (recorded_at)",
+        "CREATE INDEX ix_weather_readings_device_minute "
+        "ON weather_readings (device_id, recorded_minute)",
+    ),
+    "covering": (
+        "CREATE INDEX ix_weather_readings_recorded_at ON weather_readings (recorded_at)",
+        COVERING_DEVICE_MINUTE,
+    ),
+    "brin+covering": (
+        "CREATE INDEX ix_weather_readings_recorded_at ON weather_readings "
+        "USING brin (recorded_at) WITH (autosummarize = on)",
+        COVERING_DEVICE_MINUTE,
+    ),
+}
+
+
+@dataclass(frozen=True)
+class Shape:
+    label: str
+    build: Callable[[list[int], datetime], Select[Any]]
+
+
+def aggregated_all(
+    window: timedelta, bucket_seconds: int
+) -> Callable[[list[int], datetime], Select[Any]]:
+    def build(device_ids: list[int], end: datetime) -> Select[Any]:
+        return weather_service._aggregate_stmt(bucket_seconds).where(
+            and_(WeatherReading.recorded_at >= end - window, WeatherReading.recorded_at <= end)
+        )
+    return build
+
+
+def aggregated_devices(
+    window: timedelta, bucket_seconds: int, devices: int
+) -> Callable[[list[int], datetime], Select[Any]]:
+    def build(device_ids: list[int], end: datetime) -> Select[Any]:
+        stmt = weather_service._aggregate_stmt(bucket_seconds, by_device=devices > 1)
+        return stmt.where(
+            WeatherReading.device_id.in_(device_ids[:devices]),
+            util.recorded_range(end - window, end),
+        )
+    return build
+
+
+def raw_page(device_ids: list[int], end: datetime) -> Select[Any]:
+    """weather_service.get_all without filters: the newest page across all devices."""
+    return select(WeatherReading).order_by(desc(WeatherReading.recorded_at)).limit(100)
+
+
+def raw_count(device_ids: list[int], end: datetime) -> Select[Any]:
+    """weather_service.count of all devices over the last day."""
+    return select(func.count()).select_from(WeatherReading).where(
+        WeatherReading.recorded_at >= end - timedelta(days=1), WeatherReading.recorded_at <= end
+    )
+
+
+SHAPES = (
+    Shape("all sensors, 24h by 5min", aggregated_all(timedelta(hours=24), 300)),
+    Shape("all sensors, 7d by hour", aggregated_all(timedelta(days=7), 3600)),
+    Shape("1 sensor, 24h by minute", aggregated_devices(timedelta(hours=24), 60, 1)),
+    Shape("1 sensor, 30d by hour", aggregated_devices(timedelta(days=30), 3600, 1)),
+    Shape("1 sensor, 30d by day (local)", aggregated_devices(timedelta(days=30), 86400, 1)),
+    Shape("10 sensors, 24h by 15min", aggregated_devices(timedelta(hours=24), 900, 10)),
+    Shape("raw page, all sensors", raw_page),
+    Shape("raw count, all sensors, 24h", raw_count),
+)
+
+
+async def explain(db: AsyncSession, stmt: Select[Any]) -> tuple[float, int, list[str]]:
+    sql = str(stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+    result = await db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"))
+    plan = result.scalar_one()[0]
+    nodes: list[str] = []
+    heap_fetches = 0
+
+    def walk(node: dict[str, Any], depth: int) -> None:
+        nonlocal heap_fetches
+        heap_fetches += node.get("Heap Fetches", 0)
+        detail = node.get("Index Name") or node.get("Strategy") or ""
+        nodes.append(f"{'  ' * depth}{node['Node Type']} {detail}".rstrip())
+        for child in node.get("Plans", ()):
+            walk(child, depth + 1)
+
+    walk(plan["Plan"], 0)
+    return plan["Execution Time"], heap_fetches, nodes
+
+
+async def seed(db: AsyncSession, rows: int, devices: int, end: datetime) -> list[int]:
+    ids = []
+    for i in range(devices):
+        device = Device(
+            type=DeviceType.ESP32, location=f"{LOCATION_PREFIX}{i}", function=DeviceFunction.SENSOR
+        )
+        db.add(device)
+        await db.flush()
+        ids.append(device.id)
+
+    minutes = rows // devices
+    # Oldest first and every sensor's reading for a minute together, so the
+    # heap is in recorded_at order. Metrics are in stored fixed-point units.
+    for first in range(0, minutes, SEED_CHUNK_MINUTES):
+        await db.execute(
+            text(
+                """
+                INSERT INTO weather_readings
+                    (device_id, temperature, humidity, pressure, wind_speed, rain_amount,
+                     recorded_at)
+                SELECT d.id, 2000 + m % 60 * 10, (50 + m % 7) * 100, (1000 + m % 13) * 10,
+                       m % 5 * 50, CASE WHEN m % 50 = 0 THEN 20 ELSE 0 END,
+                       CAST(:end AS timestamptz)
+                           - make_interval(mins => CAST(:minutes AS integer) - 1 - m)
+                FROM generate_series(CAST(:first AS integer), CAST(:last AS integer)) AS m
+                CROSS JOIN unnest(CAST(:ids AS integer[])) AS d(id)
+                ORDER BY m, d.id
+                """
+            ),
+            {
+                "end": end,
+                "minutes": minutes,
+                "first": first,
+                "last": min(first + SEED_CHUNK_MINUTES, minutes) - 1,
+                "ids": ids,
+            },
+        )
+    await db.commit()
+    return ids
+
+
+async def vacuum(engine: AsyncEngine) -> None:
+    """VACUUM ANALYZE, which cannot run inside a transaction."""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE weather_readings"))
+
+
+async def index_sizes(db: AsyncSession) -> dict[str, int]:
+    result = await db.execute(
+        text("SELECT relname, pg_relation_size(oid) FROM pg_class WHERE relname = ANY(:names)"),
+        {"names": list(VARIABLE_INDEXES)},
+    )
+    return dict(result.all())
+
+
+async def run_size(
+    engine: AsyncEngine,
+    factory: async_sessionmaker[AsyncSession],
+    rows: int,
+    devices: int,
+    runs: int,
+) -> None:
+    end = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    try:
+        async with factory() as db:
+            device_ids = await seed(db, rows, devices, end)
+        await vacuum(engine)
+        print(f"\n=== {rows:,} readings, {devices} sensors")
+
+        for strategy, ddl in STRATEGIES.items():
+            async with factory() as db:
+                for name in VARIABLE_INDEXES:
+                    await db.execute(text(f"DROP INDEX IF EXISTS {name}"))
+                for statement in ddl:
+                    await db.execute(text(statement))
+                sizes = await index_sizes(db)
+                listed = ", ".join(f"{n} {s / 1024 / 1024:,.1f} MiB" for n, s in sizes.items())
+                print(f"\n{strategy}: {listed}")
+                for shape in SHAPES:
+                    times = []
+                    for _ in range(runs):
+                        stmt = shape.build(device_ids, end)
+                        elapsed, heap_fetches, nodes = await explain(db, stmt)
+                        times.append(elapsed)
+                    median = statistics.median(times)
+                    print(f"  {shape.label:<30} {median:>9.2f} ms  heap fetches {heap_fetches}")
+                    for node in nodes[:4]:
+                        print(f"    {node}")
+                await db.rollback()
+    finally:
+        async with factory() as db:
+            await db.execute(delete(Device).where(Device.location.like(f"{LOCATION_PREFIX}%")))
+            await db.commit()
+        await vacuum(engine)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 4_000_000, 10_000_000])
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument(
+        "--runs", type=int, default=5, help="EXPLAIN ANALYZE runs per query, median is reported",
+    )
+    args = parser.parse_args()
+
+    print(f"Database: {make_url(str(settings.DATABASE_URL)).host}")
+    # Seeding and index builds take longer than any workload's statement_timeout.
+    limits = WorkloadLimits(pool_size=1, pool_timeout=30, statement_timeout_ms=0)
+    engine = create_engine_for(Workload.admin, limits, settings.engine_profile)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        for rows in args.sizes:
+            await run_size(engine, factory, rows, args.devices, args.runs)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the production serve mode at several worker counts.
+
+For each worker count a uvicorn server is started with the same flags as
+`entrypoint.sh serve`, then sensor POSTs (/esp32/readings) and display GETs
+(/esp32/display/latest) are fired at it from a pool of keep-alive
+connections. Needs a migrated database (DATABASE_URL from .env); the
+devices and keys created for the run are deleted afterwards.
+
+Examples:
+  uv run -m scripts.bench_serve_workers
+  uv run -m scripts.bench_serve_workers --workers 1 2 4 8 --duration 20 --connections 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+import app.services.api_key as api_key_service
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, dispose_engines
+from app.models.device import Device, DeviceFunction, DeviceType
+from app.schemas.api_key import ApiKeyCreate
+
+ESP32_BASE = f"{settings.API_V1_STR}/esp32"
+
+
+async def create_device_with_key(function: DeviceFunction) -> tuple[int, str]:
+    async with AsyncSessionLocal() as db:
+        device = Device(
+            type=DeviceType.ESP32, location=f"bench-{function.value}", function=function
+        )
+        db.add(device)
+        await db.flush()
+        key = await api_key_service.create(db, ApiKeyCreate(name="bench", device_id=device.id))
+        await db.commit()
+        return device.id, key.key
+
+
+async def delete_devices(device_ids: list[int]) -> None:
+    async with AsyncSessionLocal() as db:
+        for device_id in device_ids:
+            device = await db.get(Device, device_id)
+            if device:
+                await db.delete(device)
+        await db.commit()
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen[bytes]:
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning",
+        "--workers", str(workers),
+        "--loop", "uvloop", "--http", "httptools",
+        "--timeout-keep-alive", "75",
+    ]
+    return subprocess.Popen(cmd, env=os.environ.copy())
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/health/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+async def hammer(
+    base_url: str,
+    method: str,
+    path: str,
+    api_key: str,
+    connections: int,
+    duration: float,
+) -> tuple[int, int, list[float]]:
+    """Send requests on `connections` keep-alive connections for `duration` seconds."""
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker() -> None:
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                if method == "POST":
+                    res = await client.post(
+                        path,
+                        headers={"X-API-Key": api_key},
+                        json={"temperature": 21.5, "humidity": 55, "pressure": 1012},
+                    )
+                else:
+                    res = await client.get(path, headers={"X-API-Key": api_key})
+                latencies.append((time.perf_counter() - started) * 1000)
+                if res.status_code >= 400:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(connections)))
+    return len(latencies), errors, latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    sensor_id, sensor_key = await create_device_with_key(DeviceFunction.SENSOR)
+    display_id, display_key = await create_device_with_key(DeviceFunction.DISPLAY)
+    base_url = f"http://127.0.0.1:{args.port}"
+    scenarios = [
+        ("ingest", "POST", f"{ESP32_BASE}/readings", sensor_key),
+        ("display", "GET", f"{ESP32_BASE}/display/latest", display_key),
+    ]
+
+    try:
+        for workers in args.workers:
+            server = start_server(workers, args.port)
+            try:
+                await wait_until_ready(base_url)
+                for label, method, path, key in scenarios:
+                    count, errors, latencies = await hammer(
+                        base_url, method, path, key, args.connections, args.duration
+                    )
+                    ordered = sorted(latencies)
+                    print(
+                        f"workers={workers:<2} {label:<8} {count / args.duration:>8.1f} req/s  "
+                        f"p50 {statistics.median(ordered):>7.2f} ms  "
+                        f"p95 {ordered[int(0.95 * (len(ordered) - 1))]:>7.2f} ms  "
+                        f"errors {errors}"
+                    )
+            finally:
+                server.terminate()
+                server.wait(timeout=60)
+    finally:
+        await delete_devices([sensor_id, display_id])
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Pack the readings of closed days into compressed per-device chunks.
+
+Every UTC day that ended more than CHUNK_AFTER_DAYS days ago and still
+has raw readings is folded into its device's chunk for that day (see
+app.services.reading_chunk); readings that arrived late for an already
+packed day are merged into the existing chunk. Each day is committed on
+its own, so the run can be interrupted and repeated. Run it daily, e.g.
+from cron after midnight UTC.
+
+--unpack writes every chunk back as raw readings, which is required
+before setting CHUNK_AFTER_DAYS back to 0 or downgrading past the
+reading_chunks migration.
+
+Examples:
+  CHUNK_AFTER_DAYS=30 uv run -m scripts.compact_readings
+  CHUNK_AFTER_DAYS=30 uv run -m scripts.compact_readings --days 7
+  uv run -m scripts.compact_readings --unpack
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.services.reading_chunk as chunk_service
+from app.core.config import Workload, WorkloadLimits, settings
+from app.db.session import create_engine_for
+from app.models.reading_chunk import ReadingChunk
+
+
+async def compact(factory: async_sessionmaker[AsyncSession], days: int) -> None:
+    before = datetime.now(timezone.utc) - timedelta(days=days)
+    async with factory() as db:
+        windows = await chunk_service.closed_windows(db, before)
+    until = chunk_service.window_start(before)
+    print(f"{len(windows)} device days with raw readings before {until:%Y-%m-%d}")
+
+    moved = 0
+    started = time.perf_counter()
+    for device_id, start in windows:
+        async with factory() as db:
+            moved += await chunk_service.compact(db, device_id, start)
+            await db.commit()
+    print(f"packed {moved:,} readings in {time.perf_counter() - started:.1f} s")
+
+    async with factory() as db:
+        chunks, readings, size = (await db.execute(select(
+            func.count(), func.coalesce(func.sum(ReadingChunk.reading_count), 0),
+            func.coalesce(func.sum(func.length(ReadingChunk.data)), 0),
+        ))).one()
+    per_reading = size / readings if readings else 0
+    print(
+        f"{chunks:,} chunks hold {readings:,} readings in {size / 1024 / 1024:,.1f} MiB "
+        f"({per_reading:.1f} B/reading)"
+    )
+
+
+async def unpack(factory: async_sessionmaker[AsyncSession]) -> None:
+    async with factory() as db:
+        ids = (await db.execute(select(ReadingChunk.id).order_by(ReadingChunk.id))).scalars().all()
+    restored = 0
+    for chunk_id in ids:
+        async with factory() as db:
+            chunk = await db.get(ReadingChunk, chunk_id)
+            if chunk is not None:
+                restored += await chunk_service.expand(db, chunk)
+                await db.commit()
+    print(f"unpacked {len(ids):,} chunks into {restored:,} readings")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--days", type=int, default=settings.CHUNK_AFTER_DAYS,
+        help="pack days that ended this many days ago (default: CHUNK_AFTER_DAYS)",
+    )
+    parser.add_argument("--unpack", action="store_true", help="restore every chunk as raw readings")
+    args = parser.parse_args()
+    if not args.unpack and (settings.CHUNK_AFTER_DAYS <= 0 or args.days <= 0):
+        parser.error("set CHUNK_AFTER_DAYS first: packed readings are only read while it is set")
+
+    # A day of readings is moved in one statement; don't let the admin
+    # statement_timeout cut it off.
+    limits = WorkloadLimits(pool_size=1, pool_timeout=30, statement_timeout_ms=0)
+    engine = create_engine_for(Workload.admin, limits, settings.engine_profile)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        if args.unpack:
+            await unpack(factory)
+        else:
+            await compact(factory, args.days)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
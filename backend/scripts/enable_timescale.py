@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Turn weather_readings into a TimescaleDB hypertable with compression and
+continuous aggregates (see app.db.timescale).
+
+Needs PostgreSQL with the timescaledb extension available (loaded through
+shared_preload_libraries, e.g. the timescale/timescaledb image). Steps
+already done are skipped, so it is safe to run again, e.g. after changing
+TIMEZONE_STR, which recreates the aggregates of local buckets:
+
+  1. CREATE EXTENSION timescaledb
+  2. primary key (id) -> (id, recorded_at): every unique key of a
+     hypertable includes its time column
+  3. create_hypertable with migrate_data: copies every reading into
+     chunks of --chunk-days while holding a lock on the table, so run it
+     in a maintenance window
+  4. native compression per device after --compress-after-days (0: none)
+  5. a continuous aggregate per granularity but minute, with a refresh
+     policy, materialized once
+
+Restart the API afterwards: workers look for the aggregates at startup.
+There is no way back short of restoring a dump, so take one first.
+
+Examples:
+  uv run -m scripts.enable_timescale
+  uv run -m scripts.enable_timescale --chunk-days 1 --compress-after-days 30
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import app.utils.weather_reading as util
+from app.core.config import Workload, WorkloadLimits, settings
+from app.db import timescale
+from app.db.session import create_engine_for
+
+
+async def enable(engine: AsyncEngine, chunk_days: int, compress_after_days: int) -> None:
+    async with engine.begin() as conn:
+        try:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb"))
+        except DBAPIError as exc:
+            raise SystemExit(f"TimescaleDB is not available on this server: {exc.orig}")
+
+        hypertable = (await conn.execute(text(
+            "SELECT compression_enabled FROM timescaledb_information.hypertables "
+            "WHERE hypertable_name = 'weather_readings'"
+        ))).first()
+        if hypertable is None:
+            started = time.perf_counter()
+            await conn.execute(text(
+                "ALTER TABLE weather_readings DROP CONSTRAINT weather_readings_pkey, "
+                "ADD CONSTRAINT weather_readings_pkey PRIMARY KEY (id, recorded_at)"
+            ))
+            # ix_weather_readings_recorded_at already is the time index.
+            await conn.execute(
+                text(
+                    "SELECT create_hypertable('weather_readings', 'recorded_at', "
+                    "chunk_time_interval => make_interval(days => :days), "
+                    "migrate_data => true, create_default_indexes => false)"
+                ),
+                {"days": chunk_days},
+            )
+            print(f"weather_readings is a hypertable ({time.perf_counter() - started:.1f} s)")
+
+        if compress_after_days and not (hypertable and hypertable.compression_enabled):
+            await conn.execute(text(
+                "ALTER TABLE weather_readings SET (timescaledb.compress, "
+                "timescaledb.compress_segmentby = 'device_id', "
+                "timescaledb.compress_orderby = 'recorded_at DESC, id')"
+            ))
+            await conn.execute(
+                text(
+                    "SELECT add_compression_policy('weather_readings', "
+                    "make_interval(days => :days), if_not_exists => true)"
+                ),
+                {"days": compress_after_days},
+            )
+            print(f"compressing chunks older than {compress_after_days} days")
+
+        existing = await timescale.find_rollups(conn)
+        created = []
+        for granularity in timescale.ROLLUP_GRANULARITIES:
+            name = timescale.view_name(granularity)
+            if name in existing:
+                if existing[name] == timescale.spec(util.granularity_seconds(granularity)):
+                    continue
+                await conn.execute(text(f"DROP MATERIALIZED VIEW {name}"))
+            for statement in timescale.create_rollup_sql(granularity):
+                await conn.execute(text(statement))
+            created.append(name)
+
+    # Materializing can't run inside a transaction.
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for name in created:
+            started = time.perf_counter()
+            await conn.execute(text(f"CALL refresh_continuous_aggregate('{name}', NULL, NULL)"))
+            print(f"created {name} ({time.perf_counter() - started:.1f} s)")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--chunk-days", type=int, default=7, help="time range of a hypertable chunk (default: 7)",
+    )
+    parser.add_argument(
+        "--compress-after-days", type=int, default=7,
+        help="compress chunks older than this, 0 disables compression (default: 7)",
+    )
+    args = parser.parse_args()
+    if settings.is_sqlite:
+        parser.error("TimescaleDB needs PostgreSQL")
+    if args.chunk_days <= 0 or args.compress_after_days < 0:
+        parser.error("--chunk-days must be positive and --compress-after-days not negative")
+
+    # Migrating the table takes as long as copying it.
+    limits = WorkloadLimits(pool_size=1, pool_timeout=30, statement_timeout_ms=0)
+    engine = create_engine_for(Workload.admin, limits, settings.engine_profile)
+    try:
+        await enable(engine, args.chunk_days, args.compress_after_days)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
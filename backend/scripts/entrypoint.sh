@@ -5,7 +5,39 @@ case "$1" in
   migrate)
     alembic upgrade head
     ;;
+  compact)
+    # Pack readings older than CHUNK_AFTER_DAYS; schedule it daily.
+    exec python -m scripts.compact_readings
+    ;;
+  archive)
+    # Move readings older than ARCHIVE_AFTER_DAYS to Parquet in ARCHIVE_DIR.
+    exec python -m scripts.archive_readings
+    ;;
+  timescale)
+    # One-off: hypertable, compression and continuous aggregates (TimescaleDB servers only).
+    exec python -m scripts.enable_timescale
+    ;;
+  analytics-sync)
+    # Keep the DuckDB export in ANALYTICS_DIR current, every 5 minutes.
+    exec python -m scripts.sync_analytics --every "${ANALYTICS_SYNC_SECONDS:-300}"
+    ;;
   serve)
+    # Production: two worker processes (override with WEB_CONCURRENCY),
+    # uvloop + httptools, long keep-alive so ESP32 boards can reuse their
+    # connection between readings, and time to drain in-flight requests on
+    # SIGTERM (keep the container stop grace period above it).
+    # DB_WORKLOADS pool sizes apply per worker: with the defaults each one
+    # may open 42 connections plus its ingest listener, so size the worker
+    # count (or the pools) to the server's max_connections, see README.
+    exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --log-level warning \
+      --proxy-headers --forwarded-allow-ips='*' \
+      --workers "${WEB_CONCURRENCY:-2}" \
+      --loop uvloop --http httptools \
+      --timeout-keep-alive "${KEEP_ALIVE_TIMEOUT:-75}" \
+      --timeout-graceful-shutdown "${GRACEFUL_SHUTDOWN_TIMEOUT:-25}" \
+      --backlog "${LISTEN_BACKLOG:-4096}"
+    ;;
+  serve-dev)
     exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --log-level warning --proxy-headers --forwarded-allow-ips='*'
     ;;
   *)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Report the on-disk footprint of weather_readings and the ingest rate.
+
+Storage: heap bytes per row (table size / live rows, so it includes page
+and tuple headers, alignment padding and free space), the average tuple
+size of a sample, and the size of every index. Ingest: readings per
+second through weather_service.create, the path a sensor POST takes,
+with INGEST_NOTIFY off and then on (the ingest listener running, as in
+a worker), so the cost of notifying the other workers shows.
+
+Run it before and after a storage migration to compare; the throwaway
+ingest sensor is deleted afterwards.
+
+Examples:
+  uv run -m scripts.measure_storage
+  uv run -m scripts.measure_storage --inserts 5000 --concurrency 16
+  uv run -m scripts.measure_storage --no-ingest
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.services.weather_reading as weather_service
+from app.core.config import Workload, WorkloadLimits, settings
+from app.core.events import ingest_bus
+from app.db.session import create_engine_for
+from app.models.device import Device, DeviceFunction, DeviceType
+from app.schemas.weather_reading import WeatherReadingCreate
+
+TABLE = "weather_readings"
+
+
+def mib(size: int) -> str:
+    return f"{size / 1024 / 1024:,.1f} MiB"
+
+
+async def report_storage(db: AsyncSession, sample: int) -> None:
+    await db.execute(text(f"ANALYZE {TABLE}"))
+    rows = (await db.execute(text(f"SELECT count(*) FROM {TABLE}"))).scalar_one()
+    heap = (await db.execute(text(f"SELECT pg_relation_size('{TABLE}')"))).scalar_one()
+    total = (await db.execute(text(f"SELECT pg_total_relation_size('{TABLE}')"))).scalar_one()
+    tuple_size = (await db.execute(text(
+        f"SELECT avg(pg_column_size(t.*)) FROM (SELECT * FROM {TABLE} LIMIT :sample) t"
+    ), {"sample": sample})).scalar_one()
+    indexes = (await db.execute(text(
+        "SELECT indexrelname, pg_relation_size(indexrelid) FROM pg_stat_user_indexes "
+        "WHERE relname = :table ORDER BY pg_relation_size(indexrelid) DESC"
+    ), {"table": TABLE})).all()
+
+    per_row = heap / rows if rows else 0
+    print(f"rows              {rows:>14,}")
+    print(f"heap              {mib(heap):>14}   {per_row:6.1f} B/row")
+    print(f"tuple (sampled)   {float(tuple_size or 0):>11.1f} B")
+    index_total = 0
+    for name, size in indexes:
+        index_total += size
+        print(f"  {name:<40} {mib(size):>12}   {size / rows if rows else 0:6.1f} B/row")
+    per_row = index_total / rows if rows else 0
+    print(f"indexes           {mib(index_total):>14}   {per_row:6.1f} B/row")
+    print(f"total             {mib(total):>14}   {total / rows if rows else 0:6.1f} B/row")
+
+
+async def report_ingest(
+    factory: async_sessionmaker[AsyncSession], inserts: int, concurrency: int
+) -> None:
+    async with factory() as db:
+        device = Device(
+            type=DeviceType.ESP32, location="bench-storage", function=DeviceFunction.SENSOR
+        )
+        db.add(device)
+        await db.commit()
+        device_id = device.id
+
+    start = datetime.now(timezone.utc) - timedelta(minutes=2 * inserts)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ingest(i: int) -> None:
+        async with semaphore, factory() as db:
+            await weather_service.create(
+                db,
+                device_id,
+                WeatherReadingCreate(
+                    temperature=20 + (i % 100) / 10,
+                    humidity=55.5,
+                    pressure=1013.2,
+                    wind_speed=(i % 7) / 2,
+                    rain_amount=0.2 if i % 50 == 0 else 0,
+                    recorded_at=start + timedelta(minutes=i),
+                ),
+            )
+            await db.commit()
+
+    async def run(first: int) -> float:
+        started = time.perf_counter()
+        await asyncio.gather(*(ingest(i) for i in range(first, first + inserts)))
+        return inserts / (time.perf_counter() - started)
+
+    notify = settings.INGEST_NOTIFY
+    try:
+        settings.INGEST_NOTIFY = False
+        rate = await run(0)
+        print(
+            f"ingest            {rate:>11,.0f} readings/s "
+            f"({inserts} at concurrency {concurrency}, INGEST_NOTIFY off)"
+        )
+        settings.INGEST_NOTIFY = True
+        listener = asyncio.create_task(ingest_bus.listen())
+        try:
+            while not ingest_bus.listening:
+                await asyncio.sleep(0.05)
+            rate = await run(inserts)
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+        print(
+            f"ingest            {rate:>11,.0f} readings/s "
+            f"({inserts} at concurrency {concurrency}, INGEST_NOTIFY on)"
+        )
+    finally:
+        settings.INGEST_NOTIFY = notify
+        async with factory() as db:
+            device_row = await db.get(Device, device_id)
+            if device_row:
+                await db.delete(device_row)
+                await db.commit()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sample", type=int, default=100_000, help="rows sampled for the average tuple size",
+    )
+    parser.add_argument("--inserts", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--no-ingest", action="store_true", help="only report storage")
+    args = parser.parse_args()
+
+    limits = WorkloadLimits(pool_size=args.concurrency, pool_timeout=30, statement_timeout_ms=0)
+    engine = create_engine_for(Workload.admin, limits, settings.engine_profile)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with factory() as db:
+            await report_storage(db, args.sample)
+        if not args.no_ingest:
+            await report_ingest(factory, args.inserts, args.concurrency)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
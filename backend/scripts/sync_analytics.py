@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Export new readings to the DuckDB analytics files in ANALYTICS_DIR.
+
+Each run appends the readings written since the previous one (see
+app.services.analytics) and merges small files into larger ones; the first
+run exports everything, packed and archived readings included. Long
+all-device aggregations see readings once a run has exported them, so run
+it every few minutes, e.g. with --every. ANALYTICS_DIR can be deleted at
+any time and rebuilt by the next run.
+
+Examples:
+  ANALYTICS_DIR=/data/analytics uv run -m scripts.sync_analytics
+  ANALYTICS_DIR=/data/analytics uv run -m scripts.sync_analytics --every 300
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.services.analytics as analytics_service
+from app.core.config import Workload, WorkloadLimits, settings
+from app.db.session import create_engine_for
+
+
+async def sync(factory: async_sessionmaker[AsyncSession]) -> None:
+    started = time.perf_counter()
+    async with factory() as db:
+        exported = await analytics_service.sync(db)
+    state = analytics_service.read_state()
+    print(
+        f"exported {exported:,} readings in {time.perf_counter() - started:.1f} s, "
+        f"{len(state.files)} files up to id {state.synced_id}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--every", type=int, metavar="SECONDS",
+        help="keep running, syncing every SECONDS (default: sync once)",
+    )
+    args = parser.parse_args()
+    if not analytics_service.enabled():
+        parser.error("set ANALYTICS_DIR first")
+    if args.every is not None and args.every <= 0:
+        parser.error("--every must be positive")
+
+    # The first run reads every reading; don't let the admin statement_timeout cut it off.
+    limits = WorkloadLimits(pool_size=1, pool_timeout=30, statement_timeout_ms=0)
+    engine = create_engine_for(Workload.admin, limits, settings.engine_profile)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        while True:
+            await sync(factory)
+            if args.every is None:
+                break
+            await asyncio.sleep(args.every)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,33 @@
+import asyncio
 import pytest
 import pytest_asyncio
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncGenerator, Awaitable, Callable
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from app.main import app
 from app.db.base import Base
-from app.db.session import get_db
+from app.core.config import settings
+from app.db.session import (
+    configure_sqlite_engine,
+    get_db,
+    get_read_db,
+    get_read_session_factory,
+    get_session_factory,
+)
+from app.api.deps.jwt_auth import get_current_user
+from app.models.device import Device, DeviceFunction, DeviceType
+from app.models.user import User, UserRole
+from app.models.weather_reading import WeatherReading
+from app.schemas.weather_reading import WeatherGranularity
+import app.services.aggregate_cache as aggregate_cache
+import app.services.api_key as api_key_service
+import app.services.data_version as data_version
+import app.services.downsample as downsample_service
+import app.services.auth as auth_service
+import app.services.weather_cache as weather_cache
+import app.services.weather_reading as weather_service
 
 # Use in-memory SQLite for tests
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -14,6 +36,7 @@ engine = create_async_engine(
     TEST_DATABASE_URL,
     #echo=True,
 )
+configure_sqlite_engine(engine, settings.SQLITE_PRAGMAS)
 
 TestingSessionLocal = async_sessionmaker(
     engine,
@@ -37,11 +60,33 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
 
 @pytest_asyncio.fixture
 async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
-    """Create test client."""
+    """Create test client authenticated as an admin user."""
     async def override_get_db():
         yield db_session
     
+    admin = User(
+        email="admin@example.com",
+        hashed_password="not-used",
+        role=UserRole.ADMIN,
+        is_active=True,
+    )
+    db_session.add(admin)
+    await db_session.flush()
+
+    app.dependency_overrides[get_current_user] = lambda: admin
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    # Sub-queries meant to run concurrently, and short writes meant to commit
+    # on their own, share the test session, one at a time.
+    lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def shared_session():
+        async with lock:
+            yield db_session
+
+    app.dependency_overrides[get_read_session_factory] = lambda: shared_session
+    app.dependency_overrides[get_session_factory] = lambda: shared_session
     
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -50,6 +95,84 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield ac
     
     app.dependency_overrides.clear()
+    api_key_service.clear()
+    auth_service.clear()
+    aggregate_cache.bucket_cache.clear()
+    data_version.clear()
+    weather_cache.display_bodies.clear()
+
+Seed = Callable[[datetime], Awaitable[int]]
+Snapshot = Callable[[int, datetime], Awaitable[dict[str, Any]]]
+
+
+def rounded(value: Any) -> Any:
+    """value with floats rounded and models dumped, for comparing query results."""
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {k: rounded(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [rounded(v) for v in value]
+    if hasattr(value, "model_dump"):
+        return rounded(value.model_dump())
+    return value
+
+
+async def add_readings(db: AsyncSession, now: datetime) -> int:
+    """Add a sensor with readings every 10 minutes over the 3 days before `now`; returns its id."""
+    device = Device(type=DeviceType.ESP32, location="Roof", function=DeviceFunction.SENSOR)
+    db.add(device)
+    await db.flush()
+    start = now.replace(second=0, microsecond=0) - timedelta(days=3)
+    for i in range(3 * 24 * 6):
+        db.add(WeatherReading(
+            device_id=device.id,
+            temperature=None if i % 37 == 0 else round(15 + (i % 50) / 7, 2),
+            humidity=55.5,
+            pressure=1013.2 + (i % 9) / 10,
+            wind_speed=(i % 7) / 2,
+            rain_amount=0.2 if i % 11 == 0 else 0,
+            recorded_at=start + timedelta(minutes=10 * i, seconds=7),
+        ))
+    await db.commit()
+    return device.id
+
+
+@pytest.fixture
+def seed(db_session: AsyncSession) -> Seed:
+    """add_readings on the test session."""
+    return lambda now: add_readings(db_session, now)
+
+
+@pytest.fixture
+def snapshot(db_session: AsyncSession) -> Snapshot:
+    """Everything the read paths answer about a seeded device, rounded for comparison."""
+    async def take(device_id: int, now: datetime) -> dict[str, Any]:
+        db = db_session
+        start, end = now - timedelta(days=4), now
+        return rounded({
+            "hourly": await weather_service.get_aggregated_by_device(
+                db, device_id, start, end, WeatherGranularity.hour, False, limit=2000, stats=True
+            ),
+            "daily": await weather_service.get_aggregated_by_device(
+                db, device_id, start, end, WeatherGranularity.day, False, skip=1, limit=3
+            ),
+            "all": await weather_service.get_aggregated_all(
+                db, start, end, WeatherGranularity.six_hour, False, limit=2000
+            ),
+            "matrix": await weather_service.get_aggregated_matrix(
+                db, [device_id], start, end, WeatherGranularity.fifteen_min, False, stats=True
+            ),
+            "page": await weather_service.get_by_device(db, device_id, skip=150, limit=200),
+            "count": await weather_service.count(
+                db, device_id=device_id, start_time=now - timedelta(hours=50)
+            ),
+            "summary": await weather_service.get_summary_by_device(db, device_id, hours=60),
+            "downsampled": await downsample_service.get_downsampled(db, device_id, start, end, 50),
+        })
+
+    return take
+
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
 async def _dispose_engine_after_tests():
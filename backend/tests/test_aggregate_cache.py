@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import ColumnElement, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.aggregate_cache as aggregate_cache
+import app.services.weather_reading as weather_service
+import app.utils.weather_reading as util
+from app.core.events import ingest_bus
+from app.models.device import Device, DeviceFunction, DeviceType
+from app.models.weather_reading import WeatherReading
+from app.schemas.weather_reading import WeatherReadingCreate
+from app.services.aggregate_cache import BucketCache, closed_bucket_span, query_ranges
+
+HOUR = 3600
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+E0 = int(T0.timestamp())
+
+
+@pytest.fixture(autouse=True)
+def listening(monkeypatch: pytest.MonkeyPatch) -> None:
+    # The cache is only used while other workers' ingest events arrive.
+    monkeypatch.setattr(ingest_bus, "listening", True)
+
+
+def test_closed_span_skips_partial_head_and_open_tail() -> None:
+    start = T0 + timedelta(minutes=30)
+    end = T0 + timedelta(hours=10)
+    closed_before = (T0 + timedelta(hours=6, minutes=20)).timestamp()
+
+    first, stop = closed_bucket_span(start, end, HOUR, closed_before)
+
+    assert first == E0 + HOUR
+    assert stop == E0 + 6 * HOUR
+
+
+def test_query_ranges_merge_adjacent_gaps() -> None:
+    start = T0 + timedelta(minutes=30)
+    end = T0 + timedelta(hours=10)
+    first, stop = E0 + HOUR, E0 + 6 * HOUR
+
+    ranges = query_ranges(start, end, first, stop, HOUR, missing=[E0 + HOUR, E0 + 4 * HOUR])
+
+    assert ranges == [
+        (start, T0 + timedelta(hours=2)),
+        (T0 + timedelta(hours=4), T0 + timedelta(hours=5)),
+        (T0 + timedelta(hours=6), end + timedelta(microseconds=1)),
+    ]
+
+
+def test_warm_window_queries_only_the_edges() -> None:
+    start = T0 + timedelta(minutes=30)
+    end = T0 + timedelta(hours=10)
+
+    ranges = query_ranges(start, end, E0 + HOUR, E0 + 6 * HOUR, HOUR, missing=[])
+
+    assert ranges == [
+        (start, T0 + timedelta(hours=1)),
+        (T0 + timedelta(hours=6), end + timedelta(microseconds=1)),
+    ]
+
+
+def test_day_buckets_follow_local_days_across_dst(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(util, "LOCAL_TZ", ZoneInfo("America/New_York"))
+    day = 24 * HOUR
+
+    def utc(*args: int) -> float:
+        return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+    # 2024-03-10 is 23 hours long in New York, 2024-11-03 is 25.
+    start = util.bucket_floor(utc(2024, 3, 10, 12), day)
+    assert start == utc(2024, 3, 10, 5)
+    assert util.bucket_next(start, day) == utc(2024, 3, 11, 4)
+    start = util.bucket_floor(utc(2024, 11, 3, 12), day)
+    assert start == utc(2024, 11, 3, 4)
+    assert util.bucket_next(start, day) == utc(2024, 11, 4, 5)
+    # Hour buckets stay on the epoch grid.
+    assert util.bucket_floor(utc(2024, 11, 3, 5, 59), HOUR) == utc(2024, 11, 3, 5)
+
+
+def test_lru_eviction_keeps_within_budget() -> None:
+    cache = BucketCache(max_bytes=2000)
+    for i in range(50):
+        cache.put(1, HOUR, E0 + i * HOUR, (20.0, 50.0, 1000.0, 1.0, 0.0, 60), cache.generation(1))
+
+    stats = cache.stats()
+    assert 0 < stats["entries"] < 50
+    assert stats["bytes"] <= 2000
+    assert stats["evictions"] == 50 - stats["entries"]
+    assert cache.get(1, HOUR, E0 + 49 * HOUR) is not None
+    assert cache.get(1, HOUR, E0) is None
+
+
+def test_nothing_is_cached_without_the_listener(monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = BucketCache(max_bytes=1 << 20)
+    monkeypatch.setattr(ingest_bus, "listening", False)
+    cache.put(1, HOUR, E0, (20.0, 50.0, 1000.0, 1.0, 0.0, 60), cache.generation(1))
+
+    assert not cache.enabled
+    assert cache.stats()["entries"] == 0
+
+
+def test_late_reading_evicts_its_buckets_only() -> None:
+    cache = BucketCache(max_bytes=1 << 20)
+    for device_id in (1, 2, None):
+        for i in range(3):
+            bucket = (20.0, 50.0, 1000.0, 1.0, 0.0, 60)
+            cache.put(device_id, HOUR, E0 + i * HOUR, bucket, cache.generation(device_id))
+
+    cache.invalidate(1, T0 + timedelta(hours=1, minutes=15))
+
+    assert cache.get(1, HOUR, E0 + HOUR) is None
+    assert cache.get(None, HOUR, E0 + HOUR) is None
+    assert cache.get(2, HOUR, E0 + HOUR) is not None
+    assert cache.get(1, HOUR, E0) is not None
+
+
+def test_result_read_before_invalidation_is_not_stored() -> None:
+    cache = BucketCache(max_bytes=1 << 20)
+    generation = cache.generation(1)
+
+    cache.invalidate(1, T0)
+    cache.put(1, HOUR, E0, (20.0, 50.0, 1000.0, 1.0, 0.0, 60), generation)
+
+    assert cache.get(1, HOUR, E0) is None
+
+
+def test_bucket_without_stats_misses_for_stats_request() -> None:
+    cache = BucketCache(max_bytes=1 << 20)
+    base = (20.0, 50.0, 1000.0, 1.0, 0.0, 60)
+    cache.put(1, HOUR, E0, base, cache.generation(1))
+    cache.put(1, HOUR, E0 + HOUR, (), cache.generation(1))
+
+    assert cache.get(1, HOUR, E0, stats=True) is None
+    assert cache.get(1, HOUR, E0 + HOUR, stats=True) == ()
+
+    with_stats = base + (0.0,) * 20
+    cache.put(1, HOUR, E0, with_stats, cache.generation(1))
+    assert cache.get(1, HOUR, E0, stats=True) == with_stats
+    assert cache.get(1, HOUR, E0) == with_stats
+
+
+@pytest.mark.asyncio
+async def test_committed_reading_invalidates_cached_bucket(db_session: AsyncSession) -> None:
+    device = Device(type=DeviceType.ESP32, location="Roof", function=DeviceFunction.SENSOR)
+    db_session.add(device)
+    await db_session.commit()
+    device_id = device.id
+    cache = aggregate_cache.bucket_cache
+    cache.put(device_id, HOUR, E0, (20.0, 50.0, 1000.0, 1.0, 0.0, 60), cache.generation(device_id))
+
+    late = WeatherReadingCreate(temperature=18.0, recorded_at=T0 + timedelta(minutes=10))
+    await weather_service.create(db_session, device_id, late)
+    await db_session.rollback()
+    assert cache.get(device_id, HOUR, E0) is not None
+
+    await weather_service.create(db_session, device_id, late)
+    await db_session.commit()
+    assert cache.get(device_id, HOUR, E0) is None
+    cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_recorded_range_is_exact_within_edge_minutes(db_session: AsyncSession) -> None:
+    device = Device(type=DeviceType.ESP32, location="Roof", function=DeviceFunction.SENSOR)
+    db_session.add(device)
+    await db_session.flush()
+    for seconds in (10, 50, 70, 130):
+        recorded_at = T0 + timedelta(seconds=seconds)
+        reading = WeatherReadingCreate(temperature=20.0, recorded_at=recorded_at)
+        await weather_service.create(db_session, device.id, reading)
+
+    minutes = await db_session.scalars(
+        select(WeatherReading.recorded_minute).order_by(WeatherReading.id)
+    )
+    assert list(minutes) == [E0 // 60, E0 // 60, E0 // 60 + 1, E0 // 60 + 2]
+
+    async def count(condition: ColumnElement[bool]) -> int:
+        stmt = select(func.count()).select_from(WeatherReading).where(condition)
+        return await db_session.scalar(stmt)
+
+    start, end = T0 + timedelta(seconds=30), T0 + timedelta(seconds=70)
+    assert await count(util.recorded_range(start, end)) == 2
+    assert await count(util.recorded_range(start, end, end_inclusive=False)) == 1
+    await db_session.rollback()
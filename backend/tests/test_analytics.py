@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.analytics as analytics_service
+import app.services.weather_reading as weather_service
+from app.core.config import settings
+from app.models.device import Device
+from app.models.weather_reading import WeatherReading
+from app.schemas.weather_reading import WeatherGranularity
+from tests.conftest import Seed, rounded
+
+pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+
+
+async def _aggregates(db: AsyncSession, now: datetime) -> dict[str, Any]:
+    start, end = now - timedelta(days=4), now
+    return rounded({
+        granularity.value: (await weather_service.get_aggregated_all(
+            db, start, end, granularity, False, limit=2000, stats=True
+        ))[0]
+        for granularity in (WeatherGranularity.hour, WeatherGranularity.day)
+    } | {
+        "ranges": await weather_service.get_aggregated_ranges(
+            db, 3600, [(start, now - timedelta(days=2)), (now - timedelta(days=1), end)]
+        ),
+    })
+
+
+@pytest.fixture
+def analytics(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    monkeypatch.setattr(settings, "ANALYTICS_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "ANALYTICS_MIN_RANGE_DAYS", 1)
+    monkeypatch.setattr(settings, "DELTA_WATERMARK_LAG_SECONDS", 0)
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_long_aggregations_read_the_export(
+    db_session: AsyncSession, seed: Seed, analytics: Path
+) -> None:
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now)
+    before = await _aggregates(db_session, now)
+
+    assert await analytics_service.sync(db_session) == 3 * 24 * 6
+    assert await analytics_service.sync(db_session) == 0
+    assert await _aggregates(db_session, now) == before
+
+    # Synced readings come from the export, not the table...
+    await db_session.execute(
+        delete(WeatherReading).where(WeatherReading.recorded_at < now - timedelta(days=2, hours=1))
+    )
+    await db_session.commit()
+    assert await _aggregates(db_session, now) == before
+
+    # ...and readings of deleted devices are left out.
+    await db_session.delete(await db_session.get(Device, device_id))
+    await db_session.commit()
+    assert (await weather_service.get_aggregated_all(
+        db_session, now - timedelta(days=4), now, WeatherGranularity.hour, False, limit=2000
+    ))[0] == []
+
+
+@pytest.mark.asyncio
+async def test_sync_merges_small_files(
+    db_session: AsyncSession, seed: Seed, analytics: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(analytics_service, "SYNC_BATCH", 100)
+    monkeypatch.setattr(analytics_service, "MERGE_FANIN", 2)
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now)
+    before = await _aggregates(db_session, now)
+
+    await analytics_service.sync(db_session)
+    state = analytics_service.read_state()
+    # 432 readings in 5 files, merged into one of the next level.
+    assert [name[:2] for name in state.files] == ["L1"]
+    assert len(state.retired) == 5
+    assert all((analytics / name).exists() for name in state.retired)
+    assert await _aggregates(db_session, now) == before
+
+    # New readings land in a new file; the merged-away ones are deleted now.
+    db_session.add(
+        WeatherReading(device_id=device_id, temperature=20, recorded_at=now - timedelta(minutes=1))
+    )
+    await db_session.commit()
+    assert await analytics_service.sync(db_session) == 1
+    assert sorted(name[:2] for name in analytics_service.read_state().files) == ["L0", "L1"]
+    assert not any((analytics / name).exists() for name in state.retired)
@@ -1,8 +1,15 @@
+import asyncio
+import time
 import pytest
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
+from typing import AsyncIterator
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.events import AuthEvent, ingest_bus
+from app.db.session import get_db, get_session_factory
+from app.main import app
 from app.models.device import Device, DeviceType, DeviceFunction
 from app.models.api_key import ApiKey
 
@@ -286,4 +293,372 @@ async def test_display_sensor_latest_success(client: AsyncClient) -> None:
     data = res.json()
     assert data["device_id"] == sensor_id
     assert data["temperature"] == 23.5
-    assert data["device_location"] == "Patio"
\ No newline at end of file
+    assert data["device_location"] == "Patio"
+
+
+@pytest.mark.asyncio
+async def test_readings_are_stored_at_fixed_resolution(client: AsyncClient) -> None:
+    sensor_id = await create_device(client, function=DeviceFunction.SENSOR, location="Mast")
+    sensor_key = await create_api_key_for_device(client, device_id=sensor_id)
+
+    # Beyond what a smallint column can hold.
+    res = await client.post(
+        f"{ESP32_BASE}/readings",
+        headers=auth_headers(sensor_key["secret"]),
+        json={"temperature": 400},
+    )
+    assert res.status_code == 422
+    # Wind and rain were never capped: they get 4-byte columns, bounded by those alone.
+    res = await client.post(
+        f"{ESP32_BASE}/readings",
+        headers=auth_headers(sensor_key["secret"]),
+        json={"wind_speed": 22_000_000},
+    )
+    assert res.status_code == 422
+    res = await client.post(
+        f"{ESP32_BASE}/readings",
+        headers=auth_headers(sensor_key["secret"]),
+        json={"wind_speed": 400, "rain_amount": 1250.5},
+    )
+    assert res.status_code == 201
+    assert (res.json()["wind_speed"], res.json()["rain_amount"]) == (400, 1250.5)
+
+    res = await client.post(
+        f"{ESP32_BASE}/readings",
+        headers=auth_headers(sensor_key["secret"]),
+        json={"temperature": -12.346, "humidity": 61.237, "pressure": 1013.27, "wind_speed": 3.5},
+    )
+    assert res.status_code == 201
+
+    display_id = await create_device(client, function=DeviceFunction.DISPLAY, location="Display")
+    display_key = await create_api_key_for_device(client, device_id=display_id)
+    res = await client.get(
+        f"{ESP32_BASE}/display/sensor/{sensor_id}/latest",
+        headers=auth_headers(display_key["secret"]),
+    )
+    data = res.json()
+    assert (data["temperature"], data["humidity"], data["pressure"], data["wind_speed"]) == (
+        -12.35, 61.24, 1013.3, 3.5
+    )
+    assert data["rain_amount"] is None
+
+@pytest.mark.asyncio
+async def test_repeat_display_poll_is_served_from_auth_cache(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ingest_bus, "listening", True)
+    display_id = await create_device(client, function=DeviceFunction.DISPLAY, location="Display")
+    display_key = await create_api_key_for_device(client, device_id=display_id)
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/time",
+        headers=auth_headers(display_key["secret"]),
+    )
+    assert res.status_code == 200
+    device = await db_session.get(Device, display_id)
+    assert device is not None
+    assert device.last_seen is not None
+    first_seen = as_utc(device.last_seen)
+
+    # Second poll within the cache TTL does not rewrite last_seen
+    res = await client.get(
+        f"{ESP32_BASE}/display/time",
+        headers=auth_headers(display_key["secret"]),
+    )
+    assert res.status_code == 200
+    await db_session.refresh(device)
+    assert device.last_seen is not None
+    assert as_utc(device.last_seen) == first_seen
+
+
+@pytest.mark.asyncio
+async def test_auth_writes_usage_on_its_own_session(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    display_id = await create_device(client, function=DeviceFunction.DISPLAY, location="Display")
+    display_key = await create_api_key_for_device(client, device_id=display_id)
+    commits = []
+
+    @asynccontextmanager
+    async def usage_session() -> AsyncIterator[AsyncSession]:
+        yield db_session
+        commits.append(not db_session.in_transaction())
+
+    async def request_session() -> AsyncIterator[AsyncSession]:
+        raise AssertionError("authentication used the request's session")
+        yield db_session
+
+    app.dependency_overrides[get_session_factory] = lambda: usage_session
+    app.dependency_overrides[get_db] = request_session
+    res = await client.get(
+        f"{ESP32_BASE}/display/time",
+        headers=auth_headers(display_key["secret"]),
+    )
+    assert res.status_code == 200
+    assert commits == [True]
+    device = await db_session.get(Device, display_id)
+    assert device is not None and device.last_seen is not None
+
+
+@pytest.mark.asyncio
+async def test_revoked_key_is_dropped_from_auth_cache(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ingest_bus, "listening", True)
+    display_id = await create_device(client, function=DeviceFunction.DISPLAY, location="Display")
+    display_key = await create_api_key_for_device(client, device_id=display_id)
+    headers = auth_headers(display_key["secret"])
+
+    assert (await client.get(f"{ESP32_BASE}/display/time", headers=headers)).status_code == 200
+
+    revoke_res = await client.post(f"/api/v1/api-keys/{display_key['id']}/revoke")
+    assert revoke_res.status_code == 200
+    # Evicted once the revocation commits (get_db commits; the test override does not)
+    assert (await client.get(f"{ESP32_BASE}/display/time", headers=headers)).status_code == 200
+    await db_session.commit()
+
+    res = await client.get(f"{ESP32_BASE}/display/time", headers=headers)
+    assert res.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_other_workers_evictions_reach_the_auth_cache(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ingest_bus, "listening", True)
+    display_id = await create_device(client, function=DeviceFunction.DISPLAY, location="Display")
+    display_key = await create_api_key_for_device(client, device_id=display_id)
+    headers = auth_headers(display_key["secret"])
+    assert (await client.get(f"{ESP32_BASE}/display/time", headers=headers)).status_code == 200
+
+    # Revoked by another worker, which notifies this one
+    api_key = await db_session.get(ApiKey, display_key["id"])
+    assert api_key is not None
+    api_key.is_active = False
+    await db_session.commit()
+    assert (await client.get(f"{ESP32_BASE}/display/time", headers=headers)).status_code == 200
+    ingest_bus.dispatch_auth(AuthEvent(device_id=display_id))
+
+    res = await client.get(f"{ESP32_BASE}/display/time", headers=headers)
+    assert res.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_display_latest_is_not_modified_until_next_reading(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    sensor_id = await create_device(client, function=DeviceFunction.SENSOR, location="Roof")
+    sensor_key = await create_api_key_for_device(client, device_id=sensor_id)
+    display_id = await create_device(client, function=DeviceFunction.DISPLAY, location="Display")
+    display_key = await create_api_key_for_device(client, device_id=display_id)
+    await client.post(
+        f"{ESP32_BASE}/readings",
+        headers=auth_headers(sensor_key["secret"]),
+        json={"temperature": 20.0},
+    )
+    # get_db commits after the response; the test override does not
+    await db_session.commit()
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/latest", headers=auth_headers(display_key["secret"])
+    )
+    assert res.status_code == 200
+    etag = res.headers["ETag"]
+    assert res.headers["Cache-Control"] == "private, no-cache"
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/latest",
+        headers={**auth_headers(display_key["secret"]), "If-None-Match": etag},
+    )
+    assert res.status_code == 304
+    assert res.content == b""
+
+    await client.post(
+        f"{ESP32_BASE}/readings",
+        headers=auth_headers(sensor_key["secret"]),
+        json={"temperature": 21.0},
+    )
+    await db_session.commit()
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/latest",
+        headers={**auth_headers(display_key["secret"]), "If-None-Match": etag},
+    )
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert res.json()["readings"][0]["temperature"] == 21.0
+
+
+@pytest.mark.asyncio
+async def test_display_latest_changes_when_a_device_moves(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ingest_bus, "listening", True)
+    sensor_id = await create_device(client, function=DeviceFunction.SENSOR, location="Roof")
+    sensor_key = await create_api_key_for_device(client, device_id=sensor_id)
+    display_id = await create_device(client, function=DeviceFunction.DISPLAY, location="Display")
+    display_key = await create_api_key_for_device(client, device_id=display_id)
+    display_headers = auth_headers(display_key["secret"])
+    await client.post(
+        f"{ESP32_BASE}/readings",
+        headers=auth_headers(sensor_key["secret"]),
+        json={"temperature": 20.0},
+    )
+    await db_session.commit()
+    res = await client.get(f"{ESP32_BASE}/display/latest", headers=display_headers)
+    etag = res.headers["ETag"]
+
+    res = await client.put(f"/api/v1/devices/{sensor_id}", json={"location": "Garden"})
+    assert res.status_code == 200
+    await db_session.commit()
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/latest", headers={**display_headers, "If-None-Match": etag}
+    )
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert res.json()["readings"][0]["device_location"] == "Garden"
+
+
+@pytest.mark.asyncio
+async def test_display_latest_since_returns_only_changed_sensors(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    keys = {}
+    for location in ("North", "South"):
+        sensor_id = await create_device(client, function=DeviceFunction.SENSOR, location=location)
+        keys[location] = (await create_api_key_for_device(client, device_id=sensor_id))["secret"]
+        await client.post(
+            f"{ESP32_BASE}/readings",
+            headers=auth_headers(keys[location]),
+            json={"temperature": 20.0},
+        )
+    await db_session.commit()
+    display_id = await create_device(client, function=DeviceFunction.DISPLAY, location="Display")
+    display_key = await create_api_key_for_device(client, device_id=display_id)
+    display_headers = auth_headers(display_key["secret"])
+
+    res = await client.get(f"{ESP32_BASE}/display/latest", headers=display_headers)
+    assert len(res.json()["readings"]) == 2
+    watermark = res.json()["watermark"]
+    assert watermark > 0
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/latest", params={"since": watermark}, headers=display_headers
+    )
+    assert res.json()["readings"] == []
+
+    await client.post(
+        f"{ESP32_BASE}/readings", headers=auth_headers(keys["South"]), json={"temperature": 25.0}
+    )
+    await db_session.commit()
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/latest", params={"since": watermark}, headers=display_headers
+    )
+    data = res.json()
+    assert [r["device_location"] for r in data["readings"]] == ["South"]
+    assert data["readings"][0]["temperature"] == 25.0
+    assert data["watermark"] > watermark
+
+
+@pytest.mark.asyncio
+async def test_display_latest_long_poll_answers_on_new_reading(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    sensor_id = await create_device(client, function=DeviceFunction.SENSOR, location="Roof")
+    sensor_key = await create_api_key_for_device(client, device_id=sensor_id)
+    sensor_headers = auth_headers(sensor_key["secret"])
+    display_id = await create_device(client, function=DeviceFunction.DISPLAY, location="Display")
+    display_key = await create_api_key_for_device(client, device_id=display_id)
+    display_headers = auth_headers(display_key["secret"])
+    await client.post(f"{ESP32_BASE}/readings", headers=sensor_headers, json={"temperature": 20.0})
+    await db_session.commit()
+    res = await client.get(f"{ESP32_BASE}/display/latest", headers=display_headers)
+    watermark = res.json()["watermark"]
+
+    # Nothing new: returns empty once wait runs out
+    started = time.monotonic()
+    res = await client.get(
+        f"{ESP32_BASE}/display/latest",
+        params={"since": watermark, "wait": 1},
+        headers=display_headers,
+    )
+    assert time.monotonic() - started >= 1
+    assert res.json()["readings"] == []
+
+    poll = asyncio.create_task(client.get(
+        f"{ESP32_BASE}/display/latest",
+        params={"since": watermark, "wait": 30},
+        headers=display_headers,
+    ))
+    await asyncio.sleep(0.1)
+    assert not poll.done()
+    started = time.monotonic()
+    await client.post(f"{ESP32_BASE}/readings", headers=sensor_headers, json={"temperature": 24.0})
+    await db_session.commit()
+
+    res = await asyncio.wait_for(poll, 5)
+    assert time.monotonic() - started < 5
+    assert [r["temperature"] for r in res.json()["readings"]] == [24.0]
+    assert res.json()["watermark"] > watermark
+
+
+@pytest.mark.asyncio
+async def test_display_latest_fields_and_text_format(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    sensor_id = await create_device(
+        client, function=DeviceFunction.SENSOR, location="Garden shed by the pond"
+    )
+    sensor_key = await create_api_key_for_device(client, device_id=sensor_id)
+    sensor_headers = auth_headers(sensor_key["secret"])
+    display_id = await create_device(client, function=DeviceFunction.DISPLAY, location="Display")
+    display_key = await create_api_key_for_device(client, device_id=display_id)
+    display_headers = auth_headers(display_key["secret"])
+    await client.post(
+        f"{ESP32_BASE}/readings",
+        headers=sensor_headers,
+        json={"temperature": 21.25, "humidity": 55},
+    )
+    await db_session.commit()
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/latest",
+        params={"fields": "temperature,device_id"},
+        headers=display_headers,
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert data["readings"] == [{"temperature": 21.25, "device_id": sensor_id}]
+    assert data["watermark"] > 0
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/latest",
+        params={"fields": "device_id,device_location,temperature,pressure", "format": "text"},
+        headers=display_headers,
+    )
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    header, line = res.text.splitlines()
+    assert header == f"{data['watermark']} 1"
+    assert line == f"{sensor_id:>6} Garden shed by t   21.2       -"
+
+    # Same version, other encoding: separate ETags
+    assert res.headers["ETag"] != (
+        await client.get(f"{ESP32_BASE}/display/latest", headers=display_headers)
+    ).headers["ETag"]
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/sensor/{sensor_id}/latest",
+        params={"fields": "humidity", "format": "text"},
+        headers=display_headers,
+    )
+    assert res.text == " 55.0\n"
+
+    res = await client.get(
+        f"{ESP32_BASE}/display/latest",
+        params={"fields": "temperature,secret"},
+        headers=display_headers,
+    )
+    assert res.status_code == 422
@@ -0,0 +1,41 @@
+from typing import Any
+
+import pytest
+
+from app.core.events import IngestBus
+
+
+class FakeConnection:
+    def __init__(self, fail: BaseException | None = None) -> None:
+        self.fail = fail
+        self.sent: list[list[tuple[str, str]]] = []
+
+    async def execute(self, _query: str, channels: list[str], payloads: list[str]) -> Any:
+        if self.fail is not None:
+            raise self.fail
+        self.sent.append(list(zip(channels, payloads)))
+
+
+@pytest.mark.asyncio
+async def test_committed_notifications_go_out_in_one_statement() -> None:
+    bus = IngestBus()
+    bus.send_later([("weather_ingest", "a"), ("auth_changes", "b")])
+    bus.send_later([("weather_ingest", "c")])
+
+    conn = FakeConnection()
+    await bus._send_pending(conn)
+
+    assert conn.sent == [[("weather_ingest", "a"), ("auth_changes", "b"), ("weather_ingest", "c")]]
+
+
+@pytest.mark.asyncio
+async def test_notifications_are_kept_when_the_connection_drops() -> None:
+    bus = IngestBus()
+    bus.send_later([("weather_ingest", "a"), ("weather_ingest", "b")])
+
+    with pytest.raises(ConnectionError):
+        await bus._send_pending(FakeConnection(ConnectionError()))
+
+    conn = FakeConnection()
+    await bus._send_pending(conn)
+    assert conn.sent == [[("weather_ingest", "a"), ("weather_ingest", "b")]]
@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+
+import app.utils.http_cache as http_cache
+from app.core.config import settings
+
+
+def test_etag_depends_on_version_and_parameters() -> None:
+    tag = http_cache.etag(7, "history", 1, None)
+    assert tag == http_cache.etag(7, "history", 1, None)
+    assert tag != http_cache.etag(8, "history", 1, None)
+    assert tag != http_cache.etag(7, "history", 2, None)
+
+
+def test_if_none_match_uses_weak_comparison() -> None:
+    tag = http_cache.etag(7, "latest")
+    assert http_cache.matches(tag, tag)
+    assert http_cache.matches(f'"other", {tag.removeprefix("W/")}', tag)
+    assert http_cache.matches("*", tag)
+    assert not http_cache.matches(None, tag)
+    assert not http_cache.matches(http_cache.etag(8, "latest"), tag)
+
+
+def test_only_past_windows_get_max_age() -> None:
+    now = datetime.now(timezone.utc)
+    assert http_cache.cache_control(now - timedelta(days=1)) == (
+        f"private, max-age={settings.HTTP_HISTORY_MAX_AGE}"
+    )
+    assert http_cache.cache_control(now) == http_cache.REVALIDATE
+    assert http_cache.cache_control(None) == http_cache.REVALIDATE
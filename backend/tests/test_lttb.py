@@ -0,0 +1,28 @@
+import numpy as np
+
+from app.utils.lttb import lttb
+
+
+def test_keeps_exactly_n_points_including_ends() -> None:
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 300)
+
+    keep = lttb(x, y, 200)
+
+    assert len(keep) == 200
+    assert keep[0] == 0 and keep[-1] == 9_999
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_keeps_single_point_spike() -> None:
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.zeros_like(x)
+    y[4_321] = 50.0
+
+    assert 4_321 in lttb(x, y, 100)
+
+
+def test_short_series_is_returned_whole() -> None:
+    x = np.arange(5, dtype=np.float64)
+
+    assert lttb(x, x, 10).tolist() == [0, 1, 2, 3, 4]
@@ -0,0 +1,62 @@
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, text
+
+VERSIONS = Path(__file__).parent.parent / "alembic" / "versions"
+
+
+def load_migration(name: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(name, VERSIONS / f"{name}.py")
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def upgrade_unpacked(rows: list[dict[str, float]]) -> list[tuple[float, ...]]:
+    """Runs the metric packing migration over weather_readings as it was before it."""
+    migration = load_migration("3c1e8f2a9d47_pack_weather_readings_metrics")
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE weather_readings (id INTEGER PRIMARY KEY, device_id INTEGER, "
+            "temperature REAL, humidity REAL, pressure REAL, wind_speed REAL, rain_amount REAL)"
+        ))
+        conn.execute(text("CREATE INDEX ix_weather_readings_id ON weather_readings (id)"))
+        conn.execute(text(
+            "CREATE INDEX ix_weather_readings_device_id ON weather_readings (device_id)"
+        ))
+        for row in rows:
+            conn.execute(
+                text(
+                    "INSERT INTO weather_readings (device_id, temperature, wind_speed, "
+                    "rain_amount) VALUES (1, :temperature, :wind_speed, :rain_amount)"
+                ),
+                row,
+            )
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+        return [tuple(r) for r in conn.execute(text(
+            "SELECT temperature, wind_speed, rain_amount FROM weather_readings ORDER BY id"
+        ))]
+
+
+def test_packing_keeps_wind_and_rain_beyond_smallint() -> None:
+    stored = upgrade_unpacked([
+        {"temperature": 21.456, "wind_speed": 400.0, "rain_amount": 1250.5},
+    ])
+    assert stored == [(2146, 40000, 125050)]
+
+
+def test_packing_stops_on_values_it_cannot_hold() -> None:
+    with pytest.raises(RuntimeError, match="temperature: 2 rows"):
+        upgrade_unpacked([
+            {"temperature": 400.0, "wind_speed": 1.0, "rain_amount": 0.0},
+            {"temperature": -400.0, "wind_speed": 1.0, "rain_amount": 0.0},
+            {"temperature": 20.0, "wind_speed": 1.0, "rain_amount": 0.0},
+        ])
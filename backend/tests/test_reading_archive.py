@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.reading_archive as archive_service
+import app.services.reading_chunk as chunk_service
+import app.services.weather_reading as weather_service
+from app.core.config import settings
+from app.models.reading_chunk import ReadingChunk
+from app.models.weather_reading import WeatherReading
+from tests.conftest import Seed, Snapshot
+
+pytest.importorskip("pyarrow")
+
+
+async def _archive(db: AsyncSession, cutoff: datetime) -> int:
+    """What scripts.archive_readings does, in the test session."""
+    moved = 0
+    for device_id, month in await archive_service.months_before(db, cutoff):
+        part = await archive_service.move_month(db, device_id, month, cutoff)
+        if part is None:
+            continue
+        previous = archive_service.read_manifest()
+        archive_service.write_manifest(archive_service.Manifest(cutoff, (*previous.parts, part)))
+        await db.commit()
+        moved += part.rows
+    return moved
+
+
+@pytest.mark.asyncio
+async def test_archived_readings_read_back_like_raw_rows(
+    db_session: AsyncSession,
+    seed: Seed,
+    snapshot: Snapshot,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now)
+    before = await snapshot(device_id, now)
+    total = await weather_service.count(db_session, device_id=device_id)
+
+    # The older days go to the archive, the day after them into a chunk.
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "CHUNK_AFTER_DAYS", 1)
+    cutoff = chunk_service.window_start(now - timedelta(days=2))
+    windows = await chunk_service.closed_windows(db_session, now - timedelta(days=1))
+    for window_device, start in windows:
+        await chunk_service.compact(db_session, window_device, start)
+    await db_session.commit()
+    moved = await _archive(db_session, cutoff)
+
+    assert moved > 0
+    assert list(tmp_path.glob(f"device_id={device_id}/month=*/*.parquet"))
+    assert (await db_session.execute(
+        select(func.count()).select_from(WeatherReading).where(WeatherReading.recorded_at < cutoff)
+    )).scalar_one() == 0
+    assert (await db_session.execute(
+        select(func.count()).select_from(ReadingChunk).where(ReadingChunk.start_at < cutoff)
+    )).scalar_one() == 0
+    assert await snapshot(device_id, now) == before
+
+    # A late reading for an archived day is read from the table until the next run.
+    late_at = cutoff - timedelta(hours=3, seconds=10)
+    db_session.add(WeatherReading(device_id=device_id, temperature=12.5, recorded_at=late_at))
+    await db_session.commit()
+    with_late = await snapshot(device_id, now)
+    assert with_late != before
+    assert await weather_service.count(db_session, device_id=device_id) == total + 1
+
+    assert await _archive(db_session, cutoff) == 1
+    assert await snapshot(device_id, now) == with_late
+
+
+@pytest.mark.asyncio
+async def test_latest_reading_falls_back_to_archive(
+    db_session: AsyncSession, seed: Seed, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now - timedelta(days=5))
+    latest = await weather_service.get_latest_by_device(db_session, device_id)
+
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    await _archive(db_session, chunk_service.window_start(now))
+
+    raw_rows = select(func.count()).select_from(WeatherReading)
+    assert (await db_session.execute(raw_rows)).scalar_one() == 0
+    assert await weather_service.get_latest_by_device(db_session, device_id) == latest
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Iterator
+
+import pytest
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.device as device_service
+import app.services.reading_buffer as buffer_service
+import app.services.weather_reading as weather_service
+import app.utils.weather_reading as util
+from app.core.config import settings
+from app.core.events import IngestEvent, ingest_bus
+from app.models.weather_reading import WeatherReading
+from app.schemas.weather_reading import WeatherGranularity, WeatherReadingCreate
+from app.services.reading_chunk import Readings, from_micros
+from tests.conftest import Seed, rounded
+
+
+async def _answers(db: AsyncSession, device_id: int, now: datetime) -> dict[str, Any]:
+    start, end = now - timedelta(days=2, minutes=17), now
+    return rounded({
+        "latest": await weather_service.get_latest_by_device(db, device_id),
+        "summary": await weather_service.get_summary_by_device(db, device_id, hours=30),
+        "device": (await weather_service.get_aggregated_by_device(
+            db, device_id, start, end, WeatherGranularity.hour, False,
+            skip=2, limit=2000, stats=True,
+        ))[0],
+        "ranges": await weather_service.get_aggregated_ranges(
+            db,
+            3600,
+            [(start, now - timedelta(days=1)), (now - timedelta(hours=20), end)],
+            device_id=device_id,
+        ),
+        "matrix": await weather_service.get_aggregated_matrix(
+            db, [device_id], start, end, WeatherGranularity.day, False
+        ),
+    })
+
+
+@pytest.fixture
+def buffered(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(settings, "RECENT_BUFFER_HOURS", 3 * 24)
+    monkeypatch.setattr(ingest_bus, "listening", True)
+    buffer_service.clear()
+    yield
+    buffer_service.clear()
+
+
+@pytest.mark.asyncio
+async def test_recent_reads_come_from_the_buffer(
+    db_session: AsyncSession, seed: Seed, buffered: None
+) -> None:
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now)
+    with pytest.MonkeyPatch.context() as off:
+        off.setattr(settings, "RECENT_BUFFER_HOURS", 0)
+        before = await _answers(db_session, device_id, now)
+
+    loads = buffer_service.stats()["loads"]
+    assert await _answers(db_session, device_id, now) == before
+    assert buffer_service.stats()["loads"] == loads + 1
+
+    # Rows gone behind the buffer's back (no event) are still answered from memory.
+    await db_session.execute(
+        delete(WeatherReading).where(WeatherReading.recorded_at < now - timedelta(hours=1))
+    )
+    await db_session.commit()
+    assert await _answers(db_session, device_id, now) == before
+
+    # Readings written through this worker are appended on commit.
+    created = await weather_service.create(
+        db_session, device_id, WeatherReadingCreate(temperature=31.5, recorded_at=now)
+    )
+    assert (await weather_service.get_latest_by_device(db_session, device_id)).id != created.id
+    await db_session.commit()
+    assert (await weather_service.get_latest_by_device(db_session, device_id)).id == created.id
+
+    # Older ranges read the database.
+    summary = await weather_service.get_summary_by_device(db_session, device_id, hours=100)
+    assert summary.reading_count == await weather_service.count(db_session, device_id) < 30
+
+
+@pytest.mark.asyncio
+async def test_events_from_other_workers(
+    db_session: AsyncSession, seed: Seed, buffered: None
+) -> None:
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now)
+    await buffer_service.warm(lambda: db_session)  # type: ignore[arg-type, return-value]
+    assert buffer_service.stats()["devices"] == 1
+    fetched = buffer_service.stats()["fetched"]
+
+    # Written by another worker: fetched by id on the next read.
+    result = await db_session.execute(
+        insert(WeatherReading)
+        .values(device_id=device_id, temperature=12.0, recorded_at=now)
+        .returning(WeatherReading.id)
+    )
+    reading_id = result.scalar_one()
+    await db_session.commit()
+    ingest_bus.dispatch(IngestEvent(device_id, reading_id, now))
+    latest = await weather_service.get_latest_by_device(db_session, device_id)
+    assert (latest.id, latest.temperature) == (reading_id, 12.0)
+    assert buffer_service.stats()["fetched"] == fetched + 1
+
+    # Removals drop the device's buffer.
+    await device_service.delete(db_session, device_id)
+    await db_session.commit()
+    assert buffer_service.stats()["devices"] == 0
+
+
+def test_ring_wraps_and_expires() -> None:
+    def readings(ids: range) -> Readings:
+        return Readings.from_rows([
+            SimpleNamespace(
+                id=i,
+                device_id=1,
+                recorded_at=from_micros(i * 1000),
+                created_at=from_micros(i * 1000),
+                **{name: None for name in util.METRICS} | {"temperature": i / 10},
+            )
+            for i in ids
+        ])
+
+    ring = buffer_service.Ring(1, 0, readings(range(50)))
+    ring.expire(40_000)
+    ring.extend(readings(range(45, 80)))  # wraps around the 64 slots, 45..49 held already
+    assert ring.readings().id.tolist() == list(range(40, 80))
+    assert ring.readings().metrics["temperature"].tolist() == [i / 10 for i in range(40, 80)]
+    ring.extend(readings(range(80, 200)))
+    ring.expire(150_000)
+    assert ring.readings().id.tolist() == list(range(150, 200))
+    assert ring.latest().id == 199
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.reading_chunk as chunk_service
+import app.services.weather_reading as weather_service
+from app.core.config import settings
+from app.models.reading_chunk import ReadingChunk
+from app.models.weather_reading import WeatherReading
+from app.utils import chunk_codec
+from tests.conftest import Seed, Snapshot
+
+
+def roundtrip(values: list[int] | np.ndarray, order: int) -> list[int]:
+    values = np.asarray(values, dtype=np.int64)
+    data = chunk_codec.encode(values, order) + b"tail"
+    decoded, offset = chunk_codec.decode(memoryview(data), 0, len(values), order)
+    assert data[offset:] == b"tail"
+    return decoded.tolist()
+
+
+def test_codec_roundtrips_columns() -> None:
+    steady = np.arange(1_700_000_000_000_000, 1_700_000_000_000_000 + 1440 * 60_000_000, 60_000_000)
+    jittered = steady.copy()
+    jittered[700] += 3_600_000_000  # one late reading becomes an exception
+
+    assert roundtrip(steady, 2) == steady.tolist()
+    assert roundtrip(jittered, 2) == jittered.tolist()
+    assert roundtrip([-32768, 32767, 0, -1, 5], 1) == [-32768, 32767, 0, -1, 5]
+    assert roundtrip([], 2) == []
+    assert roundtrip([42], 2) == [42]
+    assert len(chunk_codec.encode(steady, 2)) < 40
+
+
+def test_pack_keeps_every_column_and_missing_metrics() -> None:
+    count = 200
+    recorded_at = 1_700_000_000_000_000 + np.arange(count) * 60_000_000
+    temperature = np.round(20 + np.sin(np.arange(count) / 10), 2)
+    temperature[[3, 50]] = np.nan
+    readings = chunk_service.Readings(
+        device_id=np.full(count, 7),
+        id=np.arange(1000, 1000 + count),
+        recorded_at=recorded_at,
+        created_at=recorded_at + 1_500_000,
+        metrics={
+            "temperature": temperature,
+            "humidity": np.full(count, 61.24),
+            "pressure": np.full(count, np.nan),
+            "wind_speed": np.linspace(0, 20, count).round(2),
+            "rain_amount": np.zeros(count),
+        },
+    )
+
+    unpacked = chunk_service.unpack(7, chunk_service.pack(readings))
+
+    assert unpacked.to_dicts() == readings.to_dicts()
+
+
+@pytest.mark.asyncio
+async def test_packed_readings_read_back_like_raw_rows(
+    db_session: AsyncSession, seed: Seed, snapshot: Snapshot, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now)
+    before = await snapshot(device_id, now)
+
+    monkeypatch.setattr(settings, "CHUNK_AFTER_DAYS", 1)
+    windows = await chunk_service.closed_windows(db_session, now - timedelta(days=1))
+    for window_device, start in windows:
+        await chunk_service.compact(db_session, window_device, start)
+    await db_session.commit()
+
+    chunks = (await db_session.execute(select(func.count()).select_from(ReadingChunk))).scalar_one()
+    assert chunks >= 2
+    assert await snapshot(device_id, now) == before
+
+    # A late reading for a packed day stays raw until the next compaction.
+    day_start = chunk_service.window_start(now - timedelta(days=1))
+    late_at = day_start - timedelta(minutes=59, seconds=30)
+    db_session.add(WeatherReading(device_id=device_id, temperature=49.0, recorded_at=late_at))
+    await db_session.commit()
+    with_late = await snapshot(device_id, now)
+    assert with_late["count"] == before["count"] + 1
+
+    moved = await chunk_service.compact(db_session, device_id, chunk_service.window_start(late_at))
+    await db_session.commit()
+    assert moved == 1
+    assert await snapshot(device_id, now) == with_late
+
+
+@pytest.mark.asyncio
+async def test_latest_reading_falls_back_to_chunks(
+    db_session: AsyncSession, seed: Seed, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now - timedelta(days=5))
+    latest = await weather_service.get_latest_by_device(db_session, device_id)
+
+    monkeypatch.setattr(settings, "CHUNK_AFTER_DAYS", 1)
+    for window_device, start in await chunk_service.closed_windows(db_session, now):
+        await chunk_service.compact(db_session, window_device, start)
+    await db_session.commit()
+    raw_rows = select(func.count()).select_from(WeatherReading)
+    assert (await db_session.execute(raw_rows)).scalar_one() == 0
+
+    assert await weather_service.get_latest_by_device(db_session, device_id) == latest
+
+    for chunk in (await db_session.execute(select(ReadingChunk))).scalars().all():
+        await chunk_service.expand(db_session, chunk)
+    await db_session.commit()
+    monkeypatch.setattr(settings, "CHUNK_AFTER_DAYS", 0)
+    assert await weather_service.get_latest_by_device(db_session, device_id) == latest
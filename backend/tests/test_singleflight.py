@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution() -> None:
+    flight: SingleFlight[int] = SingleFlight("test")
+    calls = 0
+
+    async def load() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(flight.do("k", load) for _ in range(10)))
+    assert results == [42] * 10
+    assert calls == 1
+    assert flight.stats() == {"requests": 10, "executed": 1, "coalesced": 9, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_coalesced() -> None:
+    flight: SingleFlight[str] = SingleFlight("test")
+
+    async def load(value: str) -> str:
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: load("a")), flight.do("b", lambda: load("b"))
+    )
+    assert results == ["a", "b"]
+    assert flight.executed == 2
+
+
+@pytest.mark.asyncio
+async def test_waiters_receive_leader_exception() -> None:
+    flight: SingleFlight[int] = SingleFlight("test")
+
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(flight.do("k", fail) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.executed == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_takes_over_when_leader_is_cancelled() -> None:
+    flight: SingleFlight[int] = SingleFlight("test")
+    started = asyncio.Event()
+
+    async def load() -> int:
+        started.set()
+        await asyncio.sleep(0.05)
+        return 7
+
+    leader = asyncio.create_task(flight.do("k", load))
+    await started.wait()
+    started.clear()
+    waiter = asyncio.create_task(flight.do("k", load))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == 7
+    assert flight.executed == 2
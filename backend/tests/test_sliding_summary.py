@@ -0,0 +1,198 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.sliding_summary as summary_service
+import app.services.weather_reading as weather_service
+from app.core.config import settings
+from app.core.events import IngestEvent, ingest_bus
+from app.models.weather_reading import WeatherReading
+from app.schemas.weather_reading import WeatherReadingCreate
+from tests.conftest import Seed, rounded
+from tests.test_web_weather import WEATHER_BASE
+
+HOUR = 3600 * 1_000_000
+
+
+def test_windows_match_a_full_scan() -> None:
+    rng = random.Random(7)
+    summaries = summary_service.Summaries([1, 3])
+    readings = []
+    now = 0
+    for _ in range(2000):
+        now += rng.randrange(0, 120) * 1_000_000
+        # Some arrive late, up to 90 minutes behind.
+        at = now - rng.randrange(0, 5400) * 1_000_000 if rng.random() < 0.2 else now
+        temperature = None if rng.random() < 0.1 else rng.randrange(-500, 500) / 100
+        readings.append((at, temperature))
+        values = {"temperature": temperature, "humidity": 50.0, "pressure": None}
+        assert summaries.add(at, values)
+        if rng.random() < 0.2:
+            summaries.expire(now)
+            for hours in (1, 3):
+                window = [t for at, t in readings if at >= now - hours * HOUR]
+                present = [t for t in window if t is not None]
+                summary = summaries.summary(hours)
+                assert summary.reading_count == len(window)
+                assert summary.min_temperature == min(present, default=None)
+                assert summary.max_temperature == max(present, default=None)
+                mean = pytest.approx(sum(present) / len(present)) if present else None
+                assert summary.avg_temperature == mean
+                assert summary.avg_pressure is None
+    # Readings that left every window were freed.
+    assert len(summaries.recorded_at) < 2 * summaries.summary(3).reading_count
+
+
+def test_too_late_a_reading_is_refused() -> None:
+    summaries = summary_service.Summaries([1])
+    values = {"temperature": 1.0, "humidity": None, "pressure": None}
+    for at in range(summary_service._MAX_LATE + 1):
+        assert summaries.add(at, values)
+    assert summaries.add(1, values)
+    assert not summaries.add(0, values)
+
+
+@pytest.fixture
+def windows(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(settings, "SUMMARY_WINDOWS_HOURS", [1, 24, 48])
+    monkeypatch.setattr(settings, "RECENT_BUFFER_HOURS", 0)
+    monkeypatch.setattr(ingest_bus, "listening", True)
+    summary_service.clear()
+    yield
+    summary_service.clear()
+
+
+async def _summaries(db: AsyncSession, device_id: int) -> list[object]:
+    return rounded([
+        await weather_service.get_summary_by_device(db, device_id, hours) for hours in (24, 48)
+    ])
+
+
+@pytest.mark.asyncio
+async def test_summaries_follow_ingest(
+    db_session: AsyncSession, seed: Seed, windows: None
+) -> None:
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now)
+    with pytest.MonkeyPatch.context() as off:
+        off.setattr(settings, "SUMMARY_WINDOWS_HOURS", [])
+        before = await _summaries(db_session, device_id)
+    loads = summary_service.stats()["loads"]
+    assert await _summaries(db_session, device_id) == before
+    assert summary_service.stats()["loads"] == loads + 1
+
+    # This worker's readings are added on commit, other workers' fetched by id.
+    await weather_service.create(
+        db_session, device_id, WeatherReadingCreate(temperature=59.0, recorded_at=now)
+    )
+    await db_session.commit()
+    result = await db_session.execute(
+        insert(WeatherReading)
+        .values(device_id=device_id, temperature=-19.0, recorded_at=now + timedelta(seconds=1))
+        .returning(WeatherReading.id)
+    )
+    reading_id = result.scalar_one()
+    await db_session.commit()
+    ingest_bus.dispatch(IngestEvent(device_id, reading_id, now + timedelta(seconds=1)))
+    summary = await weather_service.get_summary_by_device(db_session, device_id, 24)
+    assert (summary.reading_count, summary.max_temperature, summary.min_temperature) == (
+        before[0]["reading_count"] + 2, 59.0, -19.0
+    )
+    assert summary_service.stats()["loads"] == loads + 1
+
+    # A local reading committed while an earlier remote one is unfetched
+    # goes in first; the remote one is inserted before it when fetched.
+    result = await db_session.execute(
+        insert(WeatherReading)
+        .values(device_id=device_id, temperature=-19.5, recorded_at=now + timedelta(seconds=2))
+        .returning(WeatherReading.id)
+    )
+    reading_id = result.scalar_one()
+    await db_session.commit()
+    ingest_bus.dispatch(IngestEvent(device_id, reading_id, now + timedelta(seconds=2)))
+    await weather_service.create(
+        db_session,
+        device_id,
+        WeatherReadingCreate(temperature=-19.8, recorded_at=now + timedelta(seconds=3)),
+    )
+    await db_session.commit()
+    summary = await weather_service.get_summary_by_device(db_session, device_id, 24)
+    assert (summary.reading_count, summary.max_temperature, summary.min_temperature) == (
+        before[0]["reading_count"] + 4, 59.0, -19.8
+    )
+    assert summary_service.stats()["loads"] == loads + 1
+
+    # A reading older than the newest one is inserted in place.
+    await weather_service.create(
+        db_session,
+        device_id,
+        WeatherReadingCreate(temperature=20.0, recorded_at=now - timedelta(hours=2)),
+    )
+    await db_session.commit()
+    with pytest.MonkeyPatch.context() as off:
+        off.setattr(settings, "SUMMARY_WINDOWS_HOURS", [])
+        expected = await _summaries(db_session, device_id)
+    assert await _summaries(db_session, device_id) == expected
+    assert summary_service.stats()["loads"] == loads + 1
+
+
+@pytest.mark.asyncio
+async def test_a_clock_running_ahead_does_not_rebuild_the_state(
+    db_session: AsyncSession, seed: Seed, windows: None
+) -> None:
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now)
+    await _summaries(db_session, device_id)
+    loads = summary_service.stats()["loads"]
+
+    # One reading an hour ahead, then the readings of a corrected clock
+    # keep arriving behind it.
+    ahead = WeatherReadingCreate(temperature=45.0, recorded_at=now + timedelta(hours=1))
+    await weather_service.create(db_session, device_id, ahead)
+    await db_session.commit()
+    for minute in range(1, 6):
+        await weather_service.create(
+            db_session,
+            device_id,
+            WeatherReadingCreate(temperature=-15.0, recorded_at=now + timedelta(minutes=minute)),
+        )
+        await db_session.commit()
+        summary = await weather_service.get_summary_by_device(db_session, device_id, 24)
+        assert (summary.max_temperature, summary.min_temperature) == (45.0, -15.0)
+
+    with pytest.MonkeyPatch.context() as off:
+        off.setattr(settings, "SUMMARY_WINDOWS_HOURS", [])
+        expected = await _summaries(db_session, device_id)
+    assert await _summaries(db_session, device_id) == expected
+    assert summary_service.stats()["loads"] == loads
+
+
+@pytest.mark.asyncio
+async def test_summary_hours_beyond_a_week_need_a_window(
+    client: AsyncClient,
+    db_session: AsyncSession,
+    seed: Seed,
+    windows: None,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "SUMMARY_WINDOWS_HOURS", [24, 720])
+    device_id = await seed(datetime.now(timezone.utc))
+    url = f"{WEATHER_BASE}/display/sensor/{device_id}/summary"
+
+    res = await client.get(url, params={"hours": 720})
+    assert res.status_code == 200
+    assert res.json()["reading_count"] == 3 * 24 * 6
+    res = await client.get(url, params={"hours": 500})
+    assert res.status_code == 422
+    assert "720" in res.json()["detail"]
+
+    # Without the listener they would scan the table: refused as well.
+    monkeypatch.setattr(ingest_bus, "listening", False)
+    res = await client.get(url, params={"hours": 720})
+    assert res.status_code == 422
+    assert "720" not in res.json()["detail"]
@@ -0,0 +1,133 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from pydantic import AnyUrl
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.services.weather_reading as weather_service
+import app.utils.weather_reading as util
+from app.core.config import Workload, WorkloadLimits, settings
+from app.db import timescale
+from app.db.base import Base
+from app.db.session import create_engine_for
+from app.schemas.weather_reading import WeatherGranularity
+from scripts.enable_timescale import enable
+from tests.conftest import Seed, add_readings, engine, rounded
+
+# A scratch database on a TimescaleDB server, e.g. the timescale/timescaledb image
+# (see README); its tables are dropped and recreated.
+TIMESCALE_TEST_URL = os.environ.get("TIMESCALE_TEST_URL")
+
+
+async def _aggregates(db: AsyncSession, device_id: int, now: datetime) -> dict[str, Any]:
+    # Starts and ends mid-bucket, so edge buckets come from the table.
+    start, end = now - timedelta(days=3, minutes=17), now
+    result: dict[str, Any] = {}
+    for granularity in (WeatherGranularity.hour, WeatherGranularity.day):
+        result[granularity.value] = {
+            "device": (await weather_service.get_aggregated_by_device(
+                db, device_id, start, end, granularity, False, skip=2, limit=2000
+            ))[0],
+            "all": (await weather_service.get_aggregated_all(
+                db, start, end, granularity, False, limit=2000
+            ))[0],
+            "matrix": await weather_service.get_aggregated_matrix(
+                db, [device_id], start, end, granularity, False
+            ),
+            "ranges": await weather_service.get_aggregated_ranges(
+                db,
+                util.granularity_seconds(granularity),
+                [(start, now - timedelta(days=2)), (now - timedelta(hours=30), end)],
+                device_id=device_id,
+            ),
+        }
+    return rounded(result)
+
+
+@pytest.mark.asyncio
+async def test_whole_buckets_read_from_rollups(
+    db_session: AsyncSession, seed: Seed, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = datetime.now(timezone.utc)
+    device_id = await seed(now)
+    before = await _aggregates(db_session, device_id, now)
+
+    # Stand-ins for the continuous aggregates: tables with the same rows.
+    for granularity in (WeatherGranularity.hour, WeatherGranularity.day):
+        bucket_seconds = util.granularity_seconds(granularity)
+        name = timescale.view_name(granularity)
+        query = timescale.rollup_query(util.bucket_expr(bucket_seconds)).compile(
+            engine, compile_kwargs={"literal_binds": True}
+        )
+        await db_session.execute(text(f"CREATE TABLE {name} AS {query}"))
+        # In the form SQLAlchemy stores and binds SQLite datetimes.
+        await db_session.execute(text(f"UPDATE {name} SET bucket = bucket || '.000000'"))
+        monkeypatch.setitem(timescale._rollups, bucket_seconds, timescale.rollup_table(name))
+
+    assert await _aggregates(db_session, device_id, now) == before
+    # Stats need percentiles, which the aggregates don't have.
+    stmt = weather_service._aggregate_between(3600, [(now - timedelta(days=2), now)], stats=True)
+    assert "weather_readings_hour" not in str(stmt.compile(engine))
+    stmt = weather_service._aggregate_between(3600, [(now - timedelta(days=2), now)])
+    assert "weather_readings_hour" in str(stmt.compile(engine))
+
+
+@pytest.mark.asyncio
+async def test_detect_without_timescale_finds_nothing() -> None:
+    await timescale.detect(engine)
+
+    assert timescale.rollup_for(3600) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(TIMESCALE_TEST_URL is None, reason="needs TIMESCALE_TEST_URL")
+async def test_enable_timescale_on_a_server(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert TIMESCALE_TEST_URL is not None
+    monkeypatch.setattr(settings, "DATABASE_URL", AnyUrl(TIMESCALE_TEST_URL))
+    limits = WorkloadLimits(pool_size=1, pool_timeout=30, statement_timeout_ms=0)
+    ts_engine = create_engine_for(
+        Workload.admin, limits, settings.engine_profile, TIMESCALE_TEST_URL
+    )
+
+    async def reset() -> None:
+        async with ts_engine.begin() as conn:
+            for granularity in timescale.ROLLUP_GRANULARITIES:
+                name = timescale.view_name(granularity)
+                await conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {name}"))
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    await reset()
+    try:
+        now = datetime.now(timezone.utc)
+        async with async_sessionmaker(ts_engine, expire_on_commit=False)() as db:
+            device_id = await add_readings(db, now)
+            before = await _aggregates(db, device_id, now)
+
+        await enable(ts_engine, chunk_days=1, compress_after_days=1)
+        # Safe to run again: nothing left to do.
+        await enable(ts_engine, chunk_days=1, compress_after_days=1)
+        async with ts_engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(
+                "SELECT compress_chunk(c) "
+                "FROM show_chunks('weather_readings', older_than => INTERVAL '1 day') c"
+            ))
+        await timescale.detect(ts_engine)
+        assert timescale.rollup_for(3600) is not None and timescale.rollup_for(86400) is not None
+
+        async with async_sessionmaker(ts_engine, expire_on_commit=False)() as db:
+            assert await _aggregates(db, device_id, now) == before
+            # Readings after the refresh are aggregated at query time.
+            later = now + timedelta(days=2)
+            device_id = await add_readings(db, later)
+            with_rollups = await _aggregates(db, device_id, later)
+            timescale._rollups.clear()
+            assert await _aggregates(db, device_id, later) == with_rollups
+    finally:
+        timescale._rollups.clear()
+        await reset()
+        await ts_engine.dispose()
@@ -0,0 +1,199 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.weather_reading as weather_service
+from app.core.events import ingest_bus
+from app.models.device import DeviceFunction
+from app.schemas.weather_reading import WeatherGranularity
+from app.utils.weather_reading import rows_to_matrix
+from tests.test_esp32_weather import (
+    ESP32_BASE,
+    auth_headers,
+    create_api_key_for_device,
+    create_device,
+)
+
+WEATHER_BASE = "/api/v1/weather"
+
+
+@pytest.mark.asyncio
+async def test_raw_sensor_history_returns_page_and_total(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    sensor_id = await create_device(client, function=DeviceFunction.SENSOR, location="Roof")
+    api_key = await create_api_key_for_device(client, device_id=sensor_id)
+    sensor_headers = auth_headers(api_key["secret"])
+    for temperature in (20.0, 21.0, 22.0):
+        await client.post(
+            f"{ESP32_BASE}/readings", headers=sensor_headers, json={"temperature": temperature}
+        )
+    await db_session.commit()
+
+    res = await client.get(
+        f"{WEATHER_BASE}/display/sensor/{sensor_id}/history",
+        params={"auto_granularity": False, "limit": 2},
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert len(data["readings"]) == 2
+    assert data["total"] == 3
+    assert data["aggregated"] is False
+
+
+@pytest.mark.asyncio
+async def test_readings_change_after_a_purge(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ingest_bus, "listening", True)
+    sensor_id = await create_device(client, function=DeviceFunction.SENSOR, location="Roof")
+    api_key = await create_api_key_for_device(client, device_id=sensor_id)
+    old = datetime.now(timezone.utc) - timedelta(days=60)
+    # The old reading is sent first, so the newest id survives the purge.
+    for recorded_at in (old, datetime.now(timezone.utc)):
+        await client.post(
+            f"{ESP32_BASE}/readings",
+            headers=auth_headers(api_key["secret"]),
+            json={"temperature": 20.0, "recorded_at": recorded_at.isoformat()},
+        )
+    await db_session.commit()
+    res = await client.get(f"{WEATHER_BASE}/readings")
+    assert res.json()["total"] == 2
+    etag = res.headers["ETag"]
+
+    assert await weather_service.delete_old_readings(db_session, days=30) == 1
+    await db_session.commit()
+
+    res = await client.get(f"{WEATHER_BASE}/readings", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert res.json()["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dashboard_rejects_empty_window(client: AsyncClient) -> None:
+    res = await client.get(
+        f"{WEATHER_BASE}/dashboard",
+        params={"start_time": "2024-01-02T00:00:00Z", "end_time": "2024-01-01T00:00:00Z"},
+    )
+    assert res.status_code == 422
+
+
+def test_rows_to_matrix_aligns_devices_on_shared_axis() -> None:
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    t1 = t0 + timedelta(hours=1)
+
+    def row(bucket: datetime, device_id: int, temperature: float) -> SimpleNamespace:
+        return SimpleNamespace(
+            bucket=bucket, device_id=device_id, temperature=temperature, humidity=None,
+            pressure=None, wind_speed=None, rain_amount=0.0, reading_count=60,
+        )
+
+    matrix = rows_to_matrix(
+        [row(t0, 1, 20.0), row(t0, 2, 18.0), row(t1, 2, 19.0)],
+        device_ids=[2, 1, 3],
+        granularity=WeatherGranularity.hour,
+    )
+
+    assert matrix.timestamps == [t0, t1]
+    assert [d.device_id for d in matrix.devices] == [2, 1, 3]
+    assert matrix.devices[0].temperature == [18.0, 19.0]
+    assert matrix.devices[1].temperature == [20.0, None]
+    assert matrix.devices[1].reading_count == [60, 0]
+    assert matrix.devices[2].temperature == [None, None]
+
+
+@pytest.mark.asyncio
+async def test_sensor_history_lttb_downsamples_each_metric(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    sensor_id = await create_device(client, function=DeviceFunction.SENSOR, location="Roof")
+    api_key = await create_api_key_for_device(client, device_id=sensor_id)
+    sensor_headers = auth_headers(api_key["secret"])
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for minute in range(30):
+        await client.post(
+            f"{ESP32_BASE}/readings",
+            headers=sensor_headers,
+            json={
+                "temperature": 40.0 if minute == 17 else 20.0,
+                "recorded_at": (start + timedelta(minutes=minute)).isoformat(),
+            },
+        )
+    await db_session.commit()
+
+    res = await client.get(
+        f"{WEATHER_BASE}/display/sensor/{sensor_id}/history",
+        params={
+            "downsample": "lttb",
+            "points": 5,
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+        },
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert data["source"] is None
+    temperature = data["series"]["temperature"]
+    assert len(temperature["values"]) == 5
+    assert 40.0 in temperature["values"]
+    assert data["series"]["humidity"] == {"timestamps": [], "values": []}
+
+
+@pytest.mark.asyncio
+async def test_sensor_history_lttb_validates_window(client: AsyncClient) -> None:
+    sensor_id = await create_device(client, function=DeviceFunction.SENSOR, location="Roof")
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    url = f"{WEATHER_BASE}/display/sensor/{sensor_id}/history"
+
+    res = await client.get(url, params={"downsample": "lttb", "start_time": start.isoformat()})
+    assert res.status_code == 422
+
+    res = await client.get(
+        url,
+        params={
+            "downsample": "lttb",
+            "start_time": start.isoformat(),
+            "end_time": start.isoformat(),
+        },
+    )
+    assert res.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_aggregated_history_with_stats_runs_on_sqlite(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    sensor_id = await create_device(client, function=DeviceFunction.SENSOR, location="Roof")
+    api_key = await create_api_key_for_device(client, device_id=sensor_id)
+    sensor_headers = auth_headers(api_key["secret"])
+    # 22:00 on Dec 31 and 02:00, 03:00 on Jan 1 in Sao Paulo (UTC-3).
+    for hour, temperature in ((1, 10.0), (5, 20.0), (6, 30.0)):
+        await client.post(
+            f"{ESP32_BASE}/readings",
+            headers=sensor_headers,
+            json={"temperature": temperature, "recorded_at": f"2024-01-01T0{hour}:00:00Z"},
+        )
+    await db_session.commit()
+
+    res = await client.get(
+        f"{WEATHER_BASE}/display/sensor/{sensor_id}/history",
+        params={
+            "granularity": "day",
+            "auto_granularity": False,
+            "stats": True,
+            "start_time": "2023-12-31T00:00:00Z",
+            "end_time": "2024-01-02T00:00:00Z",
+        },
+    )
+    assert res.status_code == 200
+    readings = res.json()["readings"]
+    assert [r["recorded_at"] for r in readings] == ["2023-12-31T03:00:00Z", "2024-01-01T03:00:00Z"]
+    assert [r["reading_count"] for r in readings] == [1, 2]
+    assert readings[1]["temperature"] == 25.0
+    assert readings[1]["stats"]["temperature"] == {
+        "min": 20.0, "max": 30.0, "p50": 25.0, "p95": 29.5
+    }
@@ -0,0 +1,122 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi import Request
+from httpx import AsyncClient
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.config import DEFAULT_WORKLOAD_LIMITS, Settings, Workload
+from app.db.session import create_engines, get_db, get_read_db, request_workload, run_concurrently
+from app.main import app
+
+
+def test_partial_workload_override_keeps_other_defaults() -> None:
+    s = Settings(
+        DB_WORKLOADS={"ingest": {"pool_size": 30, "pool_timeout": 1, "statement_timeout_ms": 500}},
+    )
+    assert s.DB_WORKLOADS[Workload.ingest].pool_size == 30
+    assert s.DB_WORKLOADS[Workload.dashboard] == DEFAULT_WORKLOAD_LIMITS[Workload.dashboard]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_memory", [True, False])
+async def test_sqlite_workloads_share_one_engine(in_memory: bool, tmp_path: Path) -> None:
+    s = Settings()
+    path = ":memory:" if in_memory else tmp_path / "weather.db"
+    engines = create_engines(s.DB_WORKLOADS, s.engine_profile, f"sqlite+aiosqlite:///{path}")
+    assert set(engines) == set(Workload) and len(set(engines.values())) == 1
+    await engines[Workload.admin].dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("method", "path", "expected"),
+    [
+        ("POST", "/api/v1/esp32/readings", Workload.ingest),
+        ("GET", "/api/v1/esp32/display/latest", Workload.display),
+        ("GET", "/api/v1/weather/display/latest", Workload.dashboard),
+        ("GET", "/api/v1/weather/readings", Workload.export),
+        ("GET", "/api/v1/devices/", Workload.admin),
+    ],
+)
+async def test_routes_are_tagged_with_workload(
+    client: AsyncClient, method: str, path: str, expected: Workload
+) -> None:
+    seen: list[Workload] = []
+    db_override = app.dependency_overrides[get_db]
+
+    async def capture_workload(request: Request):
+        seen.append(request_workload(request))
+        async for session in db_override():
+            yield session
+
+    app.dependency_overrides[get_db] = capture_workload
+    app.dependency_overrides[get_read_db] = capture_workload
+    await client.request(method, path)
+    assert seen and set(seen) == {expected}
+
+
+@pytest.mark.asyncio
+async def test_pool_timeout_returns_503(client: AsyncClient) -> None:
+    async def exhausted_pool():
+        raise PoolTimeoutError("QueuePool limit reached")
+        yield
+
+    app.dependency_overrides[get_db] = exhausted_pool
+    app.dependency_overrides[get_read_db] = exhausted_pool
+    res = await client.get("/health/")
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_run_concurrently_bounds_connections_and_keeps_order() -> None:
+    running = peak = 0
+
+    class FakeSession:
+        async def __aenter__(self):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            return self
+
+        async def __aexit__(self, *exc):
+            nonlocal running
+            running -= 1
+
+    def job(i: int):
+        async def run(_session):
+            await asyncio.sleep(0.01 * (5 - i % 5))
+            return i
+        return run
+
+    results = await run_concurrently(FakeSession, [job(i) for i in range(10)], limit=3)
+
+    assert results == list(range(10))
+    assert peak == 3
+    assert running == 0
+
+
+@pytest.mark.asyncio
+async def test_run_concurrently_cancels_the_rest_on_error() -> None:
+    finished: list[str] = []
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            pass
+
+    async def slow(_session):
+        await asyncio.sleep(1)
+        finished.append("slow")
+
+    async def failing(_session):
+        raise LookupError("gone")
+
+    with pytest.raises(LookupError):
+        await run_concurrently(FakeSession, [slow, failing])
+    await asyncio.sleep(0)
+    assert finished == []